@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查各 skill 之间共用模块的副本是否一致
+
+每个 skill 独立安装、只依赖自己的 scripts/ 目录，共用的模块因此在多个 skill 中各有一份。
+修改其中任何一份后运行本脚本；有副本不一致时列出差异并以状态码 1 退出。
+
+用法:
+    python check_shared_copies.py
+"""
+
+import difflib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+# 模块名 -> 持有副本的 skill
+SHARED_MODULES = {
+    'stage_metrics.py': ['city-cultural-events', 'x-video-downloader',
+                         'xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'audio_fingerprint.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'whisper_profile.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'pcm_decode.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'lazy_imports.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'windowed_transcribe.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'audio_hash.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+    'pcm_cache.py': ['xiaoyuzhou-podcast-transcriber', 'youtube-tutorial-notes'],
+}
+
+
+def check_module(name: str, skills: list) -> bool:
+    """以第一个 skill 的副本为准逐一比较，返回是否全部一致"""
+    paths = [ROOT / skill / 'scripts' / name for skill in skills]
+    missing = [path for path in paths if not path.exists()]
+    if missing:
+        for path in missing:
+            print(f"✗ 缺少副本: {path.relative_to(ROOT)}")
+        return False
+
+    reference = paths[0].read_text(encoding='utf-8')
+    consistent = True
+    for path in paths[1:]:
+        content = path.read_text(encoding='utf-8')
+        if content != reference:
+            consistent = False
+            print(f"✗ {path.relative_to(ROOT)} 与 {paths[0].relative_to(ROOT)} 不同:")
+            sys.stdout.writelines(difflib.unified_diff(
+                reference.splitlines(keepends=True), content.splitlines(keepends=True),
+                str(paths[0].relative_to(ROOT)), str(path.relative_to(ROOT))))
+    if consistent:
+        print(f"✓ {name}（{len(paths)} 份）")
+    return consistent
+
+
+def main():
+    results = [check_module(name, skills) for name, skills in SHARED_MODULES.items()]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,11 @@
 通过大麦网移动端 mtop API + DOM 解析 + 活动行 获取活动信息，输出 JSON 或 Markdown 表格格式
 
 用法: python3 scrape_events.py <城市> [活动类型] [数量] [--format json|markdown]
+                              [--metrics-file 文件] [--metrics-prom 文件]
 示例: python3 scrape_events.py 北京
       python3 scrape_events.py 上海 展览 20
       python3 scrape_events.py 广州 --format markdown
+      python3 scrape_events.py 北京 --metrics-file metrics.jsonl   # 记录各平台抓取耗时
 """
 
 import asyncio
@@ -14,8 +16,13 @@ import json
 import re
 import sys
 from datetime import datetime
+from pathlib import Path
 from playwright.async_api import async_playwright
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stage_metrics import configure as configure_metrics, span
+
 
 async def scrape_damai(city, event_type="全部", max_items=20):
     """
@@ -449,6 +456,16 @@ async def scrape_douban(city, event_type="全部", max_items=15):
     return results
 
 
+async def timed_scrape(platform, coroutine):
+    """
+    记录单个平台的抓取耗时和条数（三个平台并发抓取，CPU 时间为整个进程的）
+    """
+    with span("scrape", platform=platform) as record:
+        events = await coroutine
+        record["items"] = len(events)
+    return events
+
+
 def extract_item_id(url):
     """从链接 URL 中提取 itemId"""
     if not url:
@@ -567,13 +584,14 @@ async def main():
     event_type = positional[1] if len(positional) > 1 else "全部"
     max_items = int(positional[2]) if len(positional) > 2 else 20
     output_format = flags.get("format", "json")
+    configure_metrics("scrape_events", flags.get("metrics-file"), flags.get("metrics-prom"))
 
     print(f"正在抓取 {city} 的{event_type}活动数据...", file=sys.stderr)
 
     # 并行抓取大麦、豆瓣和活动行
-    damai_task = scrape_damai(city, event_type=event_type, max_items=max_items)
-    douban_task = scrape_douban(city, event_type=event_type, max_items=max_items // 2)
-    hdx_task = scrape_huodongxing(city, event_type=event_type, max_items=max_items // 2)
+    damai_task = timed_scrape("大麦", scrape_damai(city, event_type=event_type, max_items=max_items))
+    douban_task = timed_scrape("豆瓣同城", scrape_douban(city, event_type=event_type, max_items=max_items // 2))
+    hdx_task = timed_scrape("活动行", scrape_huodongxing(city, event_type=event_type, max_items=max_items // 2))
     damai_events, douban_events, hdx_events = await asyncio.gather(
         damai_task, douban_task, hdx_task, return_exceptions=True
     )
@@ -587,7 +605,9 @@ async def main():
 
     events = damai_events + douban_events + hdx_events
 
-    categorized = categorize_events(events)
+    with span("categorize", city=city) as record:
+        categorized = categorize_events(events)
+        record["items"] = len(events)
 
     output = {
         "city": city,
@@ -597,10 +617,13 @@ async def main():
         "categories": categorized,
     }
 
-    if output_format == "markdown":
-        print(format_as_markdown(output))
-    else:
-        print(json.dumps(output, ensure_ascii=False, indent=2))
+    with span("output", format=output_format) as record:
+        if output_format == "markdown":
+            text = format_as_markdown(output)
+        else:
+            text = json.dumps(output, ensure_ascii=False, indent=2)
+        print(text)
+        record["bytes"] = len(text.encode("utf-8"))
 
 
 if __name__ == "__main__":
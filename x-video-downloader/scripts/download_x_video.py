@@ -10,11 +10,17 @@ X (Twitter) 视频下载脚本（支持断点续传）
 - 自动重试机制（最多10次）
 - 显示视频信息和下载进度
 - 自动下载字幕（如果有）
+- 设置环境变量 SKILL_METRICS_FILE / SKILL_METRICS_PROM 时记录获取信息和下载阶段的耗时与字节数
 """
 
 import sys
 import yt_dlp
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stage_metrics import configure as configure_metrics, span
 
 
 def download_x_video(url, output_dir='.', quality='best'):
@@ -26,6 +32,13 @@ def download_x_video(url, output_dir='.', quality='best'):
         output_dir: 保存目录
         quality: 视频质量 (best/worst/specific format)
     """
+    # 记录下载完成的文件大小（视频和字幕各一次）
+    downloaded = []
+
+    def on_progress(status):
+        if status.get('status') == 'finished':
+            downloaded.append(status.get('total_bytes') or status.get('downloaded_bytes') or 0)
+
     # 配置下载选项
     ydl_opts = {
         'outtmpl': output_dir + '/%(title)s_%(id)s.%(ext)s',
@@ -44,12 +57,14 @@ def download_x_video(url, output_dir='.', quality='best'):
         'skip_unavailable_fragments': True,  # 跳过不可用片段
         'retries': 10,  # 整体重试次数
         'file_access_retries': 5,  # 文件访问重试次数
+        'progress_hooks': [on_progress],
     }
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             # 获取视频信息
-            info = ydl.extract_info(url, download=False)
+            with span('metadata'):
+                info = ydl.extract_info(url, download=False)
 
             print("\n" + "="*60)
             print(f"标题: {info.get('title', 'N/A')}")
@@ -60,7 +75,9 @@ def download_x_video(url, output_dir='.', quality='best'):
 
             # 开始下载
             print("开始下载...")
-            ydl.download([url])
+            with span('download', video=info.get('id')) as record:
+                ydl.download([url])
+                record['bytes'] = sum(downloaded)
 
             print("\n✅ 下载完成！")
             return True
@@ -84,6 +101,7 @@ def main():
         sys.exit(1)
 
     url = sys.argv[1]
+    configure_metrics('download_x_video')
 
     # 验证是否是X/Twitter链接
     if not ('x.com/' in url or 'twitter.com/' in url):
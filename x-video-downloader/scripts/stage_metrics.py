@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+分阶段耗时与资源记录
+把获取信息、下载、解码、推理、后处理、输出等阶段记为 span，每个 span 记录墙钟耗时、
+CPU 时间（进程级，包含推理后端的原生线程）和处理的字节数，结束时：
+  - 追加一行 JSON 到 --metrics-file 或环境变量 SKILL_METRICS_FILE 指定的文件；
+  - 指定了 --metrics-prom 或 SKILL_METRICS_PROM 时，按 (脚本, 阶段) 汇总写成
+    Prometheus node_exporter 的 textfile 格式（原子替换，可直接被 textfile collector 采集）；
+    多进程时每个子进程以 worker 编号调用 configure()，写入各自的 <文件名>.worker<编号>.prom 并带 worker 标签，
+    不会覆盖主进程或其他子进程的累计值。
+两者都没有配置时 span 只计时不输出，开销可以忽略。
+
+用法:
+    from stage_metrics import configure, span
+
+    configure('transcribe_podcast', args.metrics_file, args.metrics_prom)
+    with span('download', episode=episode_id) as record:
+        path = download(...)
+        if path is None:
+            record.fail('下载失败')  # 没有抛出异常的失败
+            return None
+        record['bytes'] = os.path.getsize(path)
+
+各 skill 的 scripts/ 目录下各有一份相同的本文件，修改后用仓库根目录的 check_shared_copies.py 检查各份一致。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE_ENV = 'SKILL_METRICS_FILE'
+METRICS_PROM_ENV = 'SKILL_METRICS_PROM'
+
+
+class SpanRecord(dict):
+    """span 内可补充的字段"""
+
+    def fail(self, error: str = None):
+        """把阶段记为失败（用于返回 None / False 而不抛出异常的失败），error 为失败原因"""
+        self['status'] = 'error'
+        if error:
+            self['error'] = error
+
+
+class StageMetrics:
+    """span 记录器，可在多个线程中同时使用"""
+
+    def __init__(self, script: str, jsonl_path: str = None, prom_path: str = None, worker=None):
+        self.script = script
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.worker = worker
+        if prom_path and worker is not None:
+            root, ext = os.path.splitext(prom_path)
+            self.prom_path = f"{root}.worker{worker}{ext}"
+        self._lock = threading.Lock()
+        self._totals = {}  # 阶段 -> {'count', 'errors', 'duration', 'cpu', 'bytes'}
+
+    def record(self, entry: dict):
+        """输出一个已结束的 span"""
+        with self._lock:
+            if self.jsonl_path:
+                line = json.dumps(entry, ensure_ascii=False) + '\n'
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            if self.prom_path:
+                totals = self._totals.setdefault(entry['stage'], {'count': 0, 'errors': 0, 'duration': 0.0,
+                                                                  'cpu': 0.0, 'bytes': 0})
+                totals['count'] += 1
+                totals['errors'] += entry['status'] != 'ok'
+                totals['duration'] += entry['duration']
+                totals['cpu'] += entry['cpu']
+                totals['bytes'] += entry.get('bytes') or 0
+                self._write_prometheus()
+
+    def _write_prometheus(self):
+        """把累计值写成 textfile（调用方持有锁）"""
+        metrics = [
+            ('skill_stage_runs_total', 'counter', '阶段执行次数', 'count'),
+            ('skill_stage_errors_total', 'counter', '阶段失败次数', 'errors'),
+            ('skill_stage_duration_seconds_total', 'counter', '阶段累计墙钟耗时', 'duration'),
+            ('skill_stage_cpu_seconds_total', 'counter', '阶段累计进程 CPU 时间', 'cpu'),
+            ('skill_stage_bytes_total', 'counter', '阶段累计处理字节数', 'bytes'),
+        ]
+        worker = f',worker="{self.worker}"' if self.worker is not None else ''
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, totals in sorted(self._totals.items()):
+                lines.append(f'{name}{{script="{self.script}",stage="{stage}"{worker}}} {totals[key]:g}')
+
+        directory = os.path.dirname(os.path.abspath(self.prom_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prom_path)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """
+        记录一个阶段
+
+        产出的 SpanRecord 可在阶段内补充字段（如 record['bytes'] = 下载字节数），结束时一并输出；
+        阶段内抛出异常时 status 为 error（error 为异常信息），异常照常向外抛出；
+        没有异常但阶段失败（如函数返回 None）时调用 record.fail()。
+        """
+        record = SpanRecord(bytes=None)
+        started = time.time()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        status = 'ok'
+        try:
+            yield record
+        except BaseException as e:
+            status = 'error'
+            record.setdefault('error', f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            if self.jsonl_path or self.prom_path:
+                self.record({
+                    'ts': round(started, 3),
+                    'script': self.script,
+                    'stage': stage,
+                    'status': status,
+                    'duration': round(time.perf_counter() - wall, 4),
+                    'cpu': round(time.process_time() - cpu, 4),
+                    'pid': os.getpid(),
+                    **({'worker': self.worker} if self.worker is not None else {}),
+                    **labels,
+                    **record,
+                })
+
+
+_metrics = StageMetrics('unknown')
+
+
+def configure(script: str, jsonl_path: str = None, prom_path: str = None, worker=None) -> StageMetrics:
+    """
+    设置本进程的记录器
+
+    Args:
+        script: 脚本名，写入每条记录和 Prometheus 标签
+        jsonl_path: JSON lines 输出文件，None 时读取环境变量 SKILL_METRICS_FILE
+        prom_path: Prometheus textfile 路径，None 时读取环境变量 SKILL_METRICS_PROM
+        worker: 多进程中子进程的编号，Prometheus 累计值写入该子进程自己的文件，None 表示主进程
+    """
+    global _metrics
+    _metrics = StageMetrics(script, jsonl_path or os.environ.get(METRICS_FILE_ENV),
+                            prom_path or os.environ.get(METRICS_PROM_ENV), worker)
+    return _metrics
+
+
+def span(stage: str, **labels):
+    """用本进程的记录器记录一个阶段，见 StageMetrics.span()"""
+    return _metrics.span(stage, **labels)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+音频指纹去重
+同一内容常以不同编码出现（播客重新上传、YouTube 教程的音轨），文件哈希不同，会被重复转录。
+这里按 Haitsma-Kalker 的方法从解码后的 PCM 计算紧凑的指纹：降采样到约 5.3 kHz，
+每 48 ms 取一帧（帧长 384 ms），在 300-2000 Hz 内划分 33 个对数频带，
+相邻频带能量差在相邻帧之间的变化符号构成一个 32 位子指纹（1 小时约 300 KB）。
+重新编码、音量变化基本不改变这些符号，不同内容的位差错率（BER）则接近 0.5。
+
+指纹与转录片段一起存入 ~/.cache/whisper-fingerprints/，两个 skill 共用同一索引：
+  <音频哈希>-<参数摘要>.u32   小端 uint32 子指纹序列
+  <音频哈希>-<参数摘要>.json  {'source', 'model_size', 'params', 'info', 'segments'}
+转录前先查索引：音频哈希完全相同直接命中；否则用完全相同的子指纹投票估计对齐偏移，
+时长相近且对齐后 BER 低于阈值的条目视为同一内容，复用其片段。
+params 为影响转录文字的参数（语言和解码参数，由 fingerprint_params() 统一生成），只复用参数相同的条目，
+例如以 zh 转录过的内容不会被 en 转录复用；不同参数的转录各存一个条目，互不覆盖。
+VAD、分块、窗口、批大小只改变音频的切分位置，不计入参数，两个 skill 的转录因此可以互相复用。
+
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from pcm_decode import SAMPLE_RATE, iter_pcm_chunks
+
+DEFAULT_INDEX_DIR = Path.home() / ".cache" / "whisper-fingerprints"
+DEFAULT_MAX_MB = 200
+
+# 16 kHz 每 3 个采样点取平均，降到约 5.3 kHz
+_DECIMATION = 3
+FINGERPRINT_RATE = SAMPLE_RATE / _DECIMATION
+FRAME_SAMPLES = 2048
+HOP_SAMPLES = 256
+_BAND_COUNT = 33
+_MIN_HZ, _MAX_HZ = 300, 2000
+
+# 数组输入时每次处理的采样点数（约 1 分钟）
+_BLOCK_SAMPLES = SAMPLE_RATE * 60
+
+# 对齐后 BER 不超过该值、重叠部分覆盖两段音频各自的该比例时视为同一内容
+DEFAULT_MAX_BER = 0.3
+DEFAULT_MIN_COVERAGE = 0.95
+
+# 参与投票的查询子指纹间隔
+_VOTE_STRIDE = 4
+
+# 精度由低到高，索引中条目的模型不低于请求的模型时才复用
+MODEL_RANK = {'tiny': 0, 'base': 1, 'small': 2, 'medium': 3, 'large': 4, 'large-v2': 5, 'large-v3': 6}
+
+FINGERPRINT_DTYPE = np.dtype('<u4')
+
+# 影响转录文字的解码参数及其在 faster-whisper 中的默认值，取默认值的参数不写入条目
+TEXT_DECODE_DEFAULTS = {
+    'beam_size': 5,
+    'best_of': 5,
+    'patience': 1,
+    'length_penalty': 1,
+    'repetition_penalty': 1,
+    'no_repeat_ngram_size': 0,
+    'condition_on_previous_text': True,
+    'initial_prompt': None,
+    'hotwords': None,
+}
+
+
+def _iter_decimated(source):
+    """逐块产出降采样后的 PCM，source 为 16kHz PCM 数组或音频文件路径"""
+    if isinstance(source, np.ndarray):
+        chunks = (source[i:i + _BLOCK_SAMPLES] for i in range(0, len(source), _BLOCK_SAMPLES))
+    else:
+        chunks = iter_pcm_chunks(source)
+
+    rest = np.zeros(0, dtype=np.float32)
+    for chunk in chunks:
+        data = np.concatenate([rest, chunk])
+        usable = len(data) // _DECIMATION * _DECIMATION
+        yield data[:usable].reshape(-1, _DECIMATION).mean(axis=1, dtype=np.float32)
+        rest = data[usable:]
+
+
+def _band_edges() -> np.ndarray:
+    """各频带在 rfft 结果中的起止下标（共 _BAND_COUNT + 1 个边界）"""
+    hz = np.geomspace(_MIN_HZ, _MAX_HZ, _BAND_COUNT + 1)
+    return np.round(hz / FINGERPRINT_RATE * FRAME_SAMPLES).astype(int)
+
+
+def compute_fingerprint(source) -> np.ndarray:
+    """
+    计算音频指纹，内存占用与音频时长无关（指纹本身除外）
+
+    Args:
+        source: 16kHz PCM 数组（如 PcmCache.load() 返回的内存映射）或音频文件路径
+
+    Returns:
+        uint32 子指纹数组，每 HOP_SAMPLES / FINGERPRINT_RATE 秒一个
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    window = np.hanning(FRAME_SAMPLES).astype(np.float32)
+    edges = _band_edges()
+    energies = []
+    buffer = np.zeros(0, dtype=np.float32)
+    for block in _iter_decimated(source):
+        buffer = np.concatenate([buffer, block])
+        count = (len(buffer) - FRAME_SAMPLES) // HOP_SAMPLES + 1
+        if count <= 0:
+            continue
+        frames = sliding_window_view(buffer, FRAME_SAMPLES)[::HOP_SAMPLES][:count]
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        energies.append(np.add.reduceat(power[:, edges[0]:edges[-1]], edges[:-1] - edges[0], axis=1))
+        buffer = buffer[count * HOP_SAMPLES:]
+
+    if not energies:
+        return np.zeros(0, dtype=FINGERPRINT_DTYPE)
+    energy = np.concatenate(energies)
+    diff = energy[:, :-1] - energy[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder='little').view(FINGERPRINT_DTYPE).ravel()
+
+
+def fingerprint_seconds(frames: int) -> float:
+    """指纹长度对应的音频时长（秒）"""
+    return frames * HOP_SAMPLES / FINGERPRINT_RATE
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    """两段等长指纹的位差错率"""
+    if len(a) == 0:
+        return 1.0
+    return float(np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).mean())
+
+
+def align(query: np.ndarray, reference: np.ndarray) -> tuple:
+    """
+    估计 query 相对 reference 的偏移并计算重叠部分的 BER
+
+    完全相同的子指纹给各自的位置差投票，得票最多的偏移（和偏移 0）中取 BER 最低者。
+
+    Returns:
+        (偏移帧数, BER, 重叠帧数)；偏移为正表示 query 的开头对应 reference 的第 offset 帧
+    """
+    offsets = {0}
+    order = np.argsort(reference, kind='stable')
+    ordered = reference[order]
+    positions = np.arange(0, len(query), _VOTE_STRIDE)
+    left = np.searchsorted(ordered, query[positions], side='left')
+    right = np.searchsorted(ordered, query[positions], side='right')
+    votes = [order[l:r] - p for p, l, r in zip(positions, left, right) if r - l <= 8]
+    if votes:
+        values, counts = np.unique(np.concatenate(votes), return_counts=True)
+        offsets.update(int(v) for v in values[np.argsort(counts)[-3:]])
+
+    best = (0, 1.0, 0)
+    for offset in offsets:
+        q_start, r_start = max(0, -offset), max(0, offset)
+        overlap = min(len(query) - q_start, len(reference) - r_start)
+        if overlap <= 0:
+            continue
+        ber = bit_error_rate(query[q_start:q_start + overlap], reference[r_start:r_start + overlap])
+        if ber < best[1]:
+            best = (offset, ber, overlap)
+    return best
+
+
+def segments_text(segments: list) -> str:
+    """把片段拼成纯文本，两侧都是拉丁字母或数字时补一个空格"""
+    parts = []
+    for seg in segments:
+        text = seg['text']
+        if parts and text and not text[0].isspace() and not parts[-1][-1:].isspace() \
+                and parts[-1][-1:].isascii() and parts[-1][-1:].isalnum() and text[0].isascii():
+            text = ' ' + text
+        parts.append(text)
+    return ''.join(parts)
+
+
+def fingerprint_params(language: str = None, decode_options: dict = None, detected_language: str = None) -> dict:
+    """
+    指纹条目的转录参数：语言和影响文字的解码参数（去掉取默认值的项）
+
+    Args:
+        language: 请求的语言，None 或 auto 表示自动检测
+        decode_options: 传给 transcribe() 的解码参数，VAD、批大小等不影响文字的项被忽略
+        detected_language: 转录检测到的语言，language 为自动检测时使用（写入条目时传入）
+
+    Returns:
+        参数字典；没有确定的语言时不含 language，查找时匹配任意语言的条目
+    """
+    params = {}
+    language = language if language not in (None, 'auto') else detected_language
+    if language:
+        params['language'] = language
+    for key, default in TEXT_DECODE_DEFAULTS.items():
+        value = (decode_options or {}).get(key)
+        if value is not None and value != default:
+            params[key] = value
+    return params
+
+
+def _params_match(stored: dict, params: dict) -> bool:
+    """条目参数是否符合查找参数，查找参数不含 language 时不比较语言"""
+    if stored is None:
+        return False
+    if 'language' not in params:
+        stored = {key: value for key, value in stored.items() if key != 'language'}
+    return stored == params
+
+
+class FingerprintIndex:
+    """本地指纹索引，.u32 文件的修改时间即最近使用时间"""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, max_mb: float = DEFAULT_MAX_MB,
+                 max_ber: float = DEFAULT_MAX_BER, min_coverage: float = DEFAULT_MIN_COVERAGE):
+        self.index_dir = Path(index_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_ber = max_ber
+        self.min_coverage = min_coverage
+
+    def _paths(self, audio_hash: str, params: dict = None) -> tuple:
+        name = audio_hash
+        if params is not None:
+            digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+            name = f"{audio_hash}-{digest}"
+        return self.index_dir / f"{name}.u32", self.index_dir / f"{name}.json"
+
+    def _read_entry(self, name: str, model_size: str = None, params: dict = None):
+        """读取条目（name 为文件名主干），模型低于 model_size、参数与 params 不同或文件损坏时返回 None"""
+        fingerprint_path, entry_path = self.index_dir / f"{name}.u32", self.index_dir / f"{name}.json"
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(fingerprint_path)  # 更新最近使用时间
+        except (OSError, ValueError):
+            return None
+        if model_size is not None and \
+                MODEL_RANK.get(entry.get('model_size'), -1) < MODEL_RANK.get(model_size, 0):
+            return None
+        if params is not None and not _params_match(entry.get('params'), params):
+            return None
+        return entry
+
+    def lookup(self, audio, audio_hash: str, model_size: str = None, params: dict = None) -> tuple:
+        """
+        查找同一内容已有的转录
+
+        Args:
+            audio: 16kHz PCM 数组或音频文件路径（音频哈希未命中时用于计算指纹）
+            audio_hash: 音频内容哈希
+            model_size: 只接受不低于该模型的条目，None 表示不限
+            params: fingerprint_params() 生成的转录参数，只接受参数相符的条目，None 表示不限
+
+        Returns:
+            (指纹, 条目)；音频哈希直接命中时指纹为 None，没有找到时条目为 None。
+            条目为 {'source', 'model_size', 'params', 'info', 'segments', 'ber'}
+        """
+        # 同一音频哈希的各个条目（<音频哈希>-<参数摘要>）
+        for path in self.index_dir.glob(f"{audio_hash}*.json"):
+            entry = self._read_entry(path.stem, model_size, params)
+            if entry is not None:
+                return None, {**entry, 'ber': 0.0}
+
+        fingerprint = compute_fingerprint(audio)
+        if len(fingerprint) == 0:
+            return fingerprint, None
+
+        candidates = []
+        for path in self.index_dir.glob('*.u32'):
+            try:
+                frames = path.stat().st_size // FINGERPRINT_DTYPE.itemsize
+            except OSError:
+                continue
+            # 时长相差超过允许范围的条目不可能满足覆盖率，不必读取
+            if min(frames, len(fingerprint)) < self.min_coverage * max(frames, len(fingerprint)):
+                continue
+            try:
+                reference = np.fromfile(path, dtype=FINGERPRINT_DTYPE)
+            except OSError:
+                continue
+            offset, ber, overlap = align(fingerprint, reference)
+            if ber <= self.max_ber and overlap >= self.min_coverage * max(len(fingerprint), len(reference)):
+                candidates.append((ber, path.stem, offset))
+
+        # 同一内容可能有多个条目（不同语言、参数），取 BER 最低且参数相符的一个
+        for ber, stem, offset in sorted(candidates):
+            entry = self._read_entry(stem, model_size, params)
+            if entry is not None:
+                return fingerprint, {**entry, 'ber': round(ber, 4),
+                                     'offset': round(fingerprint_seconds(offset), 3)}
+        return fingerprint, None
+
+    def add(self, audio_hash: str, fingerprint: np.ndarray, segments: list, info: dict,
+            model_size: str, source: str = None, params: dict = None):
+        """写入条目（原子替换），随后按大小上限淘汰旧条目；params 为本次转录的参数（应含检测到的语言，见 fingerprint_params）"""
+        if fingerprint is None or len(fingerprint) == 0:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        fingerprint_path, entry_path = self._paths(audio_hash, params)
+        entry = {
+            'source': source,
+            'model_size': model_size,
+            'params': params,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'info': info,
+            'segments': [{'start': seg['start'], 'end': seg['end'], 'text': seg['text']} for seg in segments],
+        }
+        # 先写片段再写指纹：检索只遍历 .u32，指纹可见时片段一定已完整
+        self._write(entry_path, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        self._write(fingerprint_path, fingerprint.astype(FINGERPRINT_DTYPE).tobytes())
+        self.evict()
+
+    def _write(self, path: Path, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        entries = []
+        for path in self.index_dir.glob('*.u32'):
+            entry_path = path.with_suffix('.json')
+            try:
+                stat = path.stat()
+                size = stat.st_size + (entry_path.stat().st_size if entry_path.exists() else 0)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                path.with_suffix('.json').unlink(missing_ok=True)
+                total -= size
+            except OSError:
+                pass
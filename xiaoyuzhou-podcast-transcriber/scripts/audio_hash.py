@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+音频内容哈希
+PCM 缓存、转录缓存、断点续转日志和音频指纹索引都以它为键；两个 skill 共用 ~/.cache 下的缓存目录，
+哈希必须完全一致，否则同一音频会在共用的缓存中出现两份互不相认的条目。
+
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+import hashlib
+
+
+def hash_audio(path) -> str:
+    """计算音频文件内容的 SHA-256，path 也可以是内存中的音频（可 seek 的二进制文件对象）"""
+    digest = hashlib.sha256()
+    if hasattr(path, 'read'):
+        path.seek(0)
+        for block in iter(lambda: path.read(1024 * 1024), b''):
+            digest.update(block)
+        path.seek(0)
+        return digest.hexdigest()
+
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
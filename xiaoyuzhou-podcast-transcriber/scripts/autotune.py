@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Whisper 计算参数自动调优
+检测本机硬件（AVX2/AVX-512、核数、可用内存、CUDA），用一段合成音频做短时校准，
+依次选出吞吐最高的 compute_type、(num_workers, cpu_threads) 组合和批量大小，
+结果按机器保存到 ~/.cache/whisper-autotune/<主机名>.json。
+
+transcribe_podcast.py 和 youtube-tutorial-notes 的 FasterWhisperTranscriber 启动时读取该文件，
+在未显式指定时使用其中的参数；硬件变化（核数或指令集不同）后档案自动失效，需要重新校准。
+
+用法:
+  python3 autotune.py                 # 用 base 模型校准并保存
+  python3 autotune.py -m small --seconds 60
+  python3 autotune.py --show          # 查看当前档案
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from whisper_profile import cpu_flags, load_profile, profile_path
+
+# 各模型 int8 权重的大致内存占用（MB），用于跳过明显放不下的组合
+_MODEL_MB = {'tiny': 75, 'base': 150, 'small': 500, 'medium': 1500,
+             'large': 3000, 'large-v2': 3000, 'large-v3': 3000}
+
+# 每路并发解码（每个 worker 或批中的每条）的大致额外内存（MB）
+_STREAM_MB = 300
+
+
+def memory_gb() -> tuple:
+    """返回 (物理内存, 可用内存)，单位 GB；无法读取时为 None"""
+    total = available = None
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3
+    except (ValueError, OSError, AttributeError):
+        pass
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) / 1024 ** 2
+    except OSError:
+        available = total
+    return total, available
+
+
+def detect_hardware() -> dict:
+    """检测影响推理速度的硬件信息"""
+    flags = cpu_flags()
+    total, available = memory_gb()
+    try:
+        import ctranslate2
+        cuda_devices = ctranslate2.get_cuda_device_count()
+    except ImportError:
+        cuda_devices = 0
+    return {
+        'cores': os.cpu_count() or 1,
+        'avx2': 'avx2' in flags,
+        'avx512': 'avx512f' in flags,
+        'memory_gb': round(total, 1) if total else None,
+        'available_memory_gb': round(available, 1) if available else None,
+        'cuda_devices': cuda_devices,
+    }
+
+
+def save_profile(profile: dict) -> Path:
+    """原子写入本机档案"""
+    path = profile_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def candidate_compute_types(device: str) -> list:
+    """本机支持的候选计算类型"""
+    import ctranslate2
+
+    preferred = ['float16', 'int8_float16', 'int8'] if device == 'cuda' else ['int8', 'int8_float32', 'float32']
+    supported = ctranslate2.get_supported_compute_types(device)
+    return [compute_type for compute_type in preferred if compute_type in supported]
+
+
+def candidate_splits(device: str, cores: int) -> list:
+    """候选 (num_workers, cpu_threads) 组合：把全部核心分给 1/2/4/8 路并发"""
+    if device == 'cuda':
+        return [(1, 0), (2, 0)]
+    splits = []
+    for workers in (1, 2, 4, 8):
+        if workers <= cores:
+            splits.append((workers, cores // workers))
+    return splits
+
+
+def fits_in_memory(model_size: str, compute_type: str, streams: int, available_gb) -> bool:
+    """粗略估算内存是否够用"""
+    if available_gb is None:
+        return True
+    weights = _MODEL_MB.get(model_size, 1500) * (1 if compute_type.startswith('int8') else 2)
+    return (weights + streams * _STREAM_MB) / 1024 < available_gb * 0.8
+
+
+def measure(model_size: str, device: str, compute_type: str, cpu_threads: int,
+            num_workers: int, batch_size: int, audio, language: str) -> float:
+    """
+    测量一组参数的吞吐（每秒墙钟时间处理的音频秒数）
+
+    num_workers 路线程同时转录同一段音频；batch_size > 1 时改用批量推理，
+    音频重复拼接到至少 batch_size 个 30 秒窗口。
+    """
+    import numpy as np
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+    from pcm_decode import SAMPLE_RATE
+
+    model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads, num_workers=num_workers)
+
+    if batch_size > 1:
+        window = 30 * SAMPLE_RATE
+        audio = np.tile(audio, math.ceil(batch_size * window / len(audio)))[:batch_size * window]
+        clips = [{'start': start, 'end': min(start + window, len(audio))}
+                 for start in range(0, len(audio), window)]
+        pipeline = BatchedInferencePipeline(model)
+
+        def run():
+            segments, _ = pipeline.transcribe(audio, language=language, beam_size=5, vad_filter=False,
+                                              clip_timestamps=clips, batch_size=batch_size)
+            return list(segments)
+    else:
+        def run():
+            segments, _ = model.transcribe(audio, language=language, beam_size=5)
+            return list(segments)
+
+    # 预热：首次调用包含一次性初始化
+    list(model.transcribe(audio[:5 * SAMPLE_RATE], language=language, beam_size=1)[0])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        list(pool.map(lambda _: run(), range(num_workers)))
+    elapsed = time.perf_counter() - started
+    return num_workers * (len(audio) / SAMPLE_RATE) / elapsed
+
+
+def autotune(model_size: str = "base", language: str = "zh", seconds: int = 60) -> dict:
+    """
+    运行校准并返回档案
+
+    依次调优：计算类型（单路）→ 并发路数与线程数 → 批量大小，每步保留吞吐最高者。
+    """
+    from benchmark_transcription import make_synthetic_fixture
+    from pcm_decode import decode_pcm
+
+    hardware = detect_hardware()
+    device = 'cuda' if hardware['cuda_devices'] > 0 else 'cpu'
+    print(f"硬件: {hardware['cores']} 核, AVX2={'是' if hardware['avx2'] else '否'}, "
+          f"AVX-512={'是' if hardware['avx512'] else '否'}, "
+          f"可用内存 {hardware['available_memory_gb']} GB, 设备 {device}")
+
+    audio = decode_pcm(str(make_synthetic_fixture(seconds)))
+    available = hardware['available_memory_gb']
+    default_threads = 0 if device == 'cuda' else hardware['cores']
+    trials = []
+
+    def trial(compute_type, num_workers, cpu_threads, batch_size):
+        config = {'compute_type': compute_type, 'num_workers': num_workers,
+                  'cpu_threads': cpu_threads, 'batch_size': batch_size}
+        label = ', '.join(f"{k}={v}" for k, v in config.items())
+        if not fits_in_memory(model_size, compute_type, num_workers * batch_size, available):
+            print(f"  - 跳过（内存不足）: {label}")
+            return 0.0
+        try:
+            throughput = measure(model_size, device, compute_type, cpu_threads, num_workers,
+                                 batch_size, audio, language)
+        except Exception as e:
+            print(f"  ✗ {label}: {e}")
+            return 0.0
+        print(f"  ✓ {label}: {throughput:.2f}x 实时")
+        trials.append({**config, 'throughput': round(throughput, 3)})
+        return throughput
+
+    print("\n[1/3] 计算类型")
+    scores = {ct: trial(ct, 1, default_threads, 1) for ct in candidate_compute_types(device)}
+    compute_type = max(scores, key=scores.get)
+
+    print("\n[2/3] 并发路数与线程数")
+    scores = {split: trial(compute_type, split[0], split[1], 1)
+              for split in candidate_splits(device, hardware['cores'])}
+    num_workers, cpu_threads = max(scores, key=scores.get)
+
+    print("\n[3/3] 批量大小")
+    scores = {1: scores[(num_workers, cpu_threads)]}
+    for batch_size in (4, 8):
+        scores[batch_size] = trial(compute_type, num_workers, cpu_threads, batch_size)
+    batch_size = max(scores, key=scores.get)
+
+    if not trials:
+        raise RuntimeError("所有校准组合均失败，请确认模型已下载")
+
+    return {
+        'host': platform.node(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'hardware': hardware,
+        'calibration_model': model_size,
+        'device': device,
+        'compute_type': compute_type,
+        'cpu_threads': cpu_threads,
+        'num_workers': num_workers,
+        'batch_size': batch_size,
+        'throughput': round(scores[batch_size], 3),
+        'trials': trials,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Whisper 计算参数自动调优",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('用法:')[1]
+    )
+    parser.add_argument("-m", "--model", help="校准使用的模型 (默认: base)", default="base")
+    parser.add_argument("-l", "--language", help="语言代码 (默认: zh)", default="zh")
+    parser.add_argument("--seconds", help="校准音频时长，单位秒 (默认: 60)", type=int, default=60)
+    parser.add_argument("--show", help="只显示当前档案", action="store_true")
+    args = parser.parse_args()
+
+    if args.show:
+        profile = load_profile()
+        if profile is None:
+            print(f"✗ 没有可用的档案: {profile_path()}")
+            sys.exit(1)
+        print(json.dumps({k: v for k, v in profile.items() if k != 'trials'}, ensure_ascii=False, indent=2))
+        return
+
+    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    try:
+        profile = autotune(args.model, args.language, args.seconds)
+    except Exception as e:
+        print(f"✗ 校准失败: {e}")
+        sys.exit(1)
+
+    path = save_profile(profile)
+    print(f"\n✓ 最佳参数: compute_type={profile['compute_type']}, num_workers={profile['num_workers']}, "
+          f"cpu_threads={profile['cpu_threads']}, batch_size={profile['batch_size']} "
+          f"({profile['throughput']:.2f}x 实时)")
+    print(f"✓ 档案已保存: {path}")
+
+
+if __name__ == "__main__":
+    main()
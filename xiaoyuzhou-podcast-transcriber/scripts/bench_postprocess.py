@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+后处理性能测试
+生成大量合成片段（含重复片段、繁体字、填充词、标点和不同停顿），
+对比原来的三遍处理（clean_repeated_text → 逐片段 convert_to_simplified_chinese → smart_paragraph_split，
+实现保留在本文件中作为基准）与单遍的 TranscriptPostProcessor，先校验两者输出完全一致，再比较耗时。
+两者共用缓存的 OpenCC 转换器时，单遍处理只快约 1.1-1.3 倍（随机器和负载波动，以本机实测为准）；
+原来主要的开销是每个片段都新建一次 OpenCC 转换器。
+
+用法:
+  python3 bench_postprocess.py                      # 默认 2 万个片段
+  python3 bench_postprocess.py -n 100000 --rounds 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transcribe_podcast import TranscriptPostProcessor, get_t2s_converter
+
+_CHARS = '我们今天来聊一下这个话题大家好经济市场投资时候觉得這個們說話時間對問題開發'
+_FILLERS = ['嗯', '对吧', '然后', '那个', '就是说', '好的']
+_ENDINGS = ['', '', '', '。', '，', '？', '!', ',', '」']
+
+
+# ---- 原来的三遍处理（只作为基准和一致性校验，转录流程使用 TranscriptPostProcessor） ----
+
+def smart_paragraph_split(segments: list, min_gap: float = 0.5) -> str:
+    """
+    根据语音停顿和标点分割段落，自动添加中文标点
+
+    Args:
+        segments: 带时间戳的片段列表
+        min_gap: 触发段落分割的最小停顿时间（秒）
+
+    Returns:
+        分段后的文本
+    """
+    if not segments:
+        return ""
+
+    # 过滤掉无意义的短停顿和填充词，避免过度分段
+    filler_words = {'对吧', '是吧', '嗯', '啊', '哦', '那么', '然后', '其实', '当然', '就是说',
+                    '就是', '对吧', '好的', '好吧', '嗯嗯', '嗯好', '这个', '那个', '所以说'}
+
+    paragraphs = []
+    current_para = []
+    para_char_count = 0
+
+    for i, seg in enumerate(segments):
+        text = re.sub(r'\s+', '', seg['text'])  # 去除所有空白字符
+        if text in filler_words:
+            continue
+
+        current_para.append(text)
+        para_char_count += len(text)
+
+        if i < len(segments) - 1:
+            gap = segments[i + 1]['start'] - seg['end']
+            next_seg = segments[i + 1]['text'].strip()
+
+            # 检查是否需要分段
+            should_split = False
+            is_last_in_para = False
+
+            # 大停顿（>1秒）直接分段
+            if gap >= 1.0 and current_para:
+                should_split = True
+                is_last_in_para = True
+            # 句号/问号/叹号结尾 + 停顿≥0.3秒分段
+            elif ends_with_punct(text, ('。', '？', '！', '?', '!', '.', '」', '”')) and gap >= 0.3:
+                should_split = True
+                is_last_in_para = True
+            # 逗号/分号结尾 + 停顿≥0.5秒分段
+            elif ends_with_punct(text, ('，', ',', '；', ';')) and gap >= 0.5:
+                should_split = True
+                is_last_in_para = True
+            # 段落超过35个字符强制分段
+            elif para_char_count >= 35 and current_para:
+                should_split = True
+                is_last_in_para = True
+
+            if should_split and current_para:
+                # 给段落最后一个片段加标点（如果没有）
+                last_text = current_para[-1]
+                if last_text and not last_text[-1] in '。？！.?!"\'，,' :
+                    last_char = last_text[-1]
+                    if '\u4e00' <= last_char <= '\u9fff' or '\uac00' <= last_char <= '\ud7af':
+                        current_para[-1] = last_text + '，'
+
+                paragraphs.append(''.join(current_para))
+                current_para = []
+                para_char_count = 0
+
+    # 添加最后一段（加句号）
+    if current_para:
+        last_text = current_para[-1]
+        if last_text and not last_text[-1] in '。？！.?!"\'，,':
+            last_char = last_text[-1]
+            if '\u4e00' <= last_char <= '\u9fff' or '\uac00' <= last_char <= '\ud7af':
+                current_para[-1] = last_text + '。'
+        paragraphs.append(''.join(current_para))
+
+    return '\n\n'.join(paragraphs)
+
+
+def ends_with_punct(text: str, punctuations: tuple) -> bool:
+    """检查文本是否以指定标点结尾（去除尾随空格后）"""
+    stripped = text.strip()
+    return stripped.endswith(punctuations)
+
+
+def clean_repeated_text(segments: list) -> list:
+    """
+    清理转录结果中的重复片段
+    例如："围的围的围的围的" 会被合并为 "围的"
+    """
+    if not segments:
+        return segments
+
+    cleaned = []
+    for seg in segments:
+        text = seg['text']
+        # 检测并折叠连续重复模式（如 "围的围的围的围的"）
+        # 尝试匹配 2-5 字符的子串重复 3 次以上
+        for word_len in range(5, 1, -1):
+            pattern = r'(.{' + str(word_len) + r'})\1{3,}'
+            text = re.sub(pattern, r'\1', text)
+        cleaned.append({
+            'start': seg['start'],
+            'end': seg['end'],
+            'text': text
+        })
+    return cleaned
+
+
+def convert_to_simplified_chinese(text: str) -> str:
+    """
+    将繁体中文转换为简体中文
+    如果 opencc 不可用，返回原文
+    """
+    converter = get_t2s_converter()
+    if converter is None:
+        # 如果 opencc 不可用，返回原文
+        return text
+    return converter.convert(text)
+
+
+def make_segments(count: int, seed: int = 0) -> list:
+    """生成合成片段列表"""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.1:
+            text = rng.choice(_FILLERS)
+        elif kind < 0.15:
+            unit = ''.join(rng.choice(_CHARS) for _ in range(rng.randint(2, 5)))
+            text = unit * rng.randint(4, 8)
+        else:
+            words = [''.join(rng.choice(_CHARS) for _ in range(rng.randint(2, 6)))
+                     for _ in range(rng.randint(1, 4))]
+            text = ' '.join(words) + rng.choice(_ENDINGS)
+        duration = rng.uniform(0.5, 6.0)
+        segments.append({'start': round(t, 2), 'end': round(t + duration, 2), 'text': text})
+        t += duration + rng.choice([0.0, 0.1, 0.3, 0.5, 0.8, 1.2])
+    return segments
+
+
+def legacy_pipeline(segments: list) -> str:
+    """原来的三遍处理"""
+    cleaned = clean_repeated_text(segments)
+    for seg in cleaned:
+        seg['text'] = convert_to_simplified_chinese(seg['text'])
+    return smart_paragraph_split(cleaned)
+
+
+def fused_pipeline(segments: list) -> str:
+    """单遍处理"""
+    return TranscriptPostProcessor(simplify=True).process(segments)
+
+
+def best_time(func, segments: list, rounds: int) -> float:
+    """多轮运行取最短耗时"""
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(segments)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后处理性能测试")
+    parser.add_argument("-n", "--segments", help="合成片段数 (默认: 20000)", type=int, default=20000)
+    parser.add_argument("--rounds", help="每种实现运行轮数 (默认: 3)", type=int, default=3)
+    parser.add_argument("--seed", help="随机种子 (默认: 0)", type=int, default=0)
+    args = parser.parse_args()
+
+    segments = make_segments(args.segments, args.seed)
+
+    if legacy_pipeline(segments) != fused_pipeline(segments):
+        print("✗ 输出不一致")
+        sys.exit(1)
+    print(f"✓ 输出一致（{len(segments)} 个片段）")
+
+    legacy = best_time(legacy_pipeline, segments, args.rounds)
+    fused = best_time(fused_pipeline, segments, args.rounds)
+    print(f"三遍处理: {legacy * 1000:.1f} ms")
+    print(f"单遍处理: {fused * 1000:.1f} ms")
+    print(f"加速: {legacy / fused:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
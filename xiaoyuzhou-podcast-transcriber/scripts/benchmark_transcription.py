@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+转录性能基准测试
+对 transcribe_podcast.py 的 WhisperModel 推理路径和 youtube-tutorial-notes 的
+FasterWhisperTranscriber 做参数扫描：模型大小、compute_type、beam_size、
+cpu_threads / num_workers、VAD 开关、批量推理的批大小。每组参数在独立子进程中运行，
+输出实时率（RTF = 转录耗时 / 音频时长）、峰值内存和模型加载耗时，每组一行 JSON。
+
+批大小大于 1 的组（BatchedInferencePipeline，总是按 VAD 语音片段组批）额外与其他参数相同的
+逐段解码组（批大小 0）对比：speedup 为逐段解码耗时 / 批量解码耗时，
+similarity 为两者转录文本的字符级相似度（difflib，1.0 表示完全一致）。
+
+完全离线运行：子进程设置 HF_HUB_OFFLINE=1，模型需已在本地缓存（或直接传模型目录）；
+未指定 --audio 时生成一段合成的类语音音频作为测试素材（只适合比较速度，不适合比较准确度）。
+
+用法:
+  python3 benchmark_transcription.py --audio 样例.m4a
+  python3 benchmark_transcription.py -m tiny base --compute-types int8 float32 --cpu-threads 4 8
+  python3 benchmark_transcription.py --backend youtube --vad both -o results.jsonl
+  python3 benchmark_transcription.py --audio 样例.m4a -d cuda --compute-types float16 --batch-sizes 0 8 16
+"""
+
+import argparse
+import difflib
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import wave
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# youtube-tutorial-notes 的脚本目录（同一仓库内的相邻 skill）
+DEFAULT_YOUTUBE_SCRIPTS = SCRIPT_DIR.parents[1] / "youtube-tutorial-notes" / "scripts"
+
+FIXTURE_DIR = Path.home() / ".cache" / "xiaoyuzhou-transcriber" / "bench"
+
+
+def make_synthetic_fixture(duration: int = 120, sample_rate: int = 16000) -> Path:
+    """
+    生成合成测试音频：2~6 秒的谐波音节串（带音节包络），间隔 0.3~1.5 秒静音
+    结果按时长缓存，重复运行时复用同一文件
+    """
+    import numpy as np
+
+    path = FIXTURE_DIR / f"synthetic_{duration}s.wav"
+    if path.exists():
+        return path
+
+    rng = np.random.default_rng(0)
+    signal = np.zeros(duration * sample_rate, dtype=np.float32)
+    pos = 0
+    while pos < len(signal):
+        length = int(sample_rate * rng.uniform(2, 6))
+        t = np.arange(length) / sample_rate
+        f0 = rng.uniform(100, 250)
+        burst = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        burst *= 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 6) * t)
+        end = min(pos + length, len(signal))
+        signal[pos:end] = 0.2 * burst[:end - pos]
+        pos = end + int(sample_rate * rng.uniform(0.3, 1.5))
+
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((signal * 32767).astype('<i2').tobytes())
+    return path
+
+
+def audio_duration(path: str) -> float:
+    """音频时长（秒）"""
+    from faster_whisper import decode_audio
+
+    return len(decode_audio(path)) / 16000
+
+
+def peak_rss_mb() -> float:
+    """当前进程峰值常驻内存（MB）；Linux 上 ru_maxrss 单位为 KB，macOS 为字节"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_one(config: dict) -> dict:
+    """子进程内执行一组参数：加载模型、转录并消费全部片段"""
+    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    audio = config['audio']
+
+    started = time.perf_counter()
+    if config['backend'] == 'podcast':
+        sys.path.insert(0, str(SCRIPT_DIR))
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+        from transcribe_podcast import DECODE_OPTIONS
+
+        model = WhisperModel(config['model'], device=config['device'],
+                             compute_type=config['compute_type'],
+                             cpu_threads=config['cpu_threads'], num_workers=config['num_workers'])
+        load_time = time.perf_counter() - started
+
+        options = {**DECODE_OPTIONS, 'beam_size': config['beam_size'], 'vad_filter': config['vad']}
+        if config['batch_size'] > 1:
+            model = BatchedInferencePipeline(model)
+            options.update(batch_size=config['batch_size'], vad_filter=True)
+        started = time.perf_counter()
+        segments, _ = model.transcribe(audio, language=config['language'], **options)
+        texts = [segment.text for segment in segments]
+        segment_count = len(texts)
+        text = ''.join(texts)
+    else:
+        sys.path.insert(0, config['youtube_scripts'])
+        from faster_whisper_transcribe import FasterWhisperTranscriber
+
+        # 不用 PCM 缓存：与 podcast 后端一样每组参数都从音频文件解码，否则后面的参数组免去解码，结果不可比
+        transcriber = FasterWhisperTranscriber(config['model'], device=config['device'],
+                                               compute_type=config['compute_type'],
+                                               cpu_threads=config['cpu_threads'],
+                                               num_workers=config['num_workers'], pcm_cache=False)
+        load_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        text = transcriber.transcribe(audio, language=config['language'], beam_size=config['beam_size'],
+                                      vad_filter=config['vad'], batch_size=config['batch_size'])
+        segment_count = None if text is None else len(text)
+    transcribe_time = time.perf_counter() - started
+
+    return {
+        'load_time': round(load_time, 3),
+        'transcribe_time': round(transcribe_time, 3),
+        'rtf': round(transcribe_time / config['duration'], 4),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'segments' if config['backend'] == 'podcast' else 'chars': segment_count,
+        'text': text or '',
+    }
+
+
+def run_in_subprocess(config: dict, timeout: float) -> dict:
+    """在独立子进程中运行一组参数，保证峰值内存和加载耗时互不影响"""
+    env = dict(os.environ, HF_HUB_OFFLINE='1')
+    proc = subprocess.run(
+        [sys.executable, __file__, '--run-one', json.dumps(config)],
+        capture_output=True, text=True, env=env, timeout=timeout
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    return {'error': (proc.stderr.strip().splitlines() or ['未知错误'])[-1]}
+
+
+def compare_to_sequential(metrics: dict, baseline: dict) -> dict:
+    """批量解码结果相对逐段解码的加速比和文本相似度"""
+    if 'error' in metrics or not baseline or 'error' in baseline or not metrics['transcribe_time']:
+        return {}
+    return {
+        'speedup': round(baseline['transcribe_time'] / metrics['transcribe_time'], 2),
+        'similarity': round(difflib.SequenceMatcher(None, baseline['text'], metrics['text']).ratio(), 4),
+    }
+
+
+def host_info() -> dict:
+    """记录测试机器信息，便于跨时间对比"""
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="转录性能基准测试 - 输出实时率、峰值内存和模型加载耗时 (JSON)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('用法:')[1]
+    )
+    parser.add_argument("--audio", help="测试音频（可多个），默认生成合成音频", nargs='*', default=[])
+    parser.add_argument("--synthetic-seconds", help="合成音频时长，单位秒 (默认: 120)", type=int, default=120)
+    parser.add_argument("--backend", help="测试对象 (默认: podcast)", default="podcast",
+                        choices=["podcast", "youtube", "both"])
+    parser.add_argument("-m", "--models", help="模型大小或本地模型目录 (默认: base)", nargs='+', default=["base"])
+    parser.add_argument("--compute-types", help="计算类型 (默认: int8)", nargs='+', default=["int8"])
+    parser.add_argument("--beam-sizes", help="束搜索宽度 (默认: 5)", nargs='+', type=int, default=[5])
+    parser.add_argument("--cpu-threads", help="CPU 线程数，0 为默认值 (默认: 0)", nargs='+', type=int, default=[0])
+    parser.add_argument("--num-workers", help="模型并发数 (默认: 1)", nargs='+', type=int, default=[1])
+    parser.add_argument("--vad", help="VAD 开关 (默认: off)", default="off", choices=["on", "off", "both"])
+    parser.add_argument("--batch-sizes", help="批量推理的批大小，0 为逐段解码；给出多个时各组与 0 对比 (默认: 0)",
+                        nargs='+', type=int, default=[0])
+    parser.add_argument("-l", "--language", help="语言代码 (默认: zh)", default="zh")
+    parser.add_argument("-d", "--device", help="计算设备 (默认: cpu)", default="cpu")
+    parser.add_argument("--youtube-scripts", help="youtube-tutorial-notes/scripts 目录",
+                        default=str(DEFAULT_YOUTUBE_SCRIPTS))
+    parser.add_argument("--timeout", help="单组参数超时，单位秒 (默认: 3600)", type=float, default=3600)
+    parser.add_argument("-o", "--output", help="结果追加写入的 JSONL 文件")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+
+    audios = args.audio or [str(make_synthetic_fixture(args.synthetic_seconds))]
+    backends = ["podcast", "youtube"] if args.backend == "both" else [args.backend]
+    vads = {"on": [True], "off": [False], "both": [False, True]}[args.vad]
+    host = host_info()
+    output = open(args.output, 'a', encoding='utf-8') if args.output else None
+    # 逐段解码排在最前面，作为同组参数下批量解码的对比基准
+    batch_sizes = sorted(set(args.batch_sizes))
+
+    try:
+        for audio in audios:
+            duration = audio_duration(audio)
+            grid = itertools.product(backends, args.models, args.compute_types, args.beam_sizes,
+                                     args.cpu_threads, args.num_workers, vads, batch_sizes)
+            sequential = {}  # 除批大小外的参数 -> 逐段解码的结果
+            for backend, model, compute_type, beam_size, cpu_threads, num_workers, vad, batch_size in grid:
+                config = {
+                    'backend': backend,
+                    'audio': audio,
+                    'duration': round(duration, 3),
+                    'model': model,
+                    'device': args.device,
+                    'compute_type': compute_type,
+                    'beam_size': beam_size,
+                    'cpu_threads': cpu_threads,
+                    'num_workers': num_workers,
+                    'vad': vad,
+                    'batch_size': batch_size,
+                    'language': args.language,
+                    'youtube_scripts': args.youtube_scripts,
+                }
+                try:
+                    metrics = run_in_subprocess(config, args.timeout)
+                except subprocess.TimeoutExpired:
+                    metrics = {'error': f'超时 ({args.timeout:.0f} 秒)'}
+
+                group = (backend, model, compute_type, beam_size, cpu_threads, num_workers, vad)
+                if batch_size <= 1:
+                    sequential[group] = dict(metrics)
+                else:
+                    metrics.update(compare_to_sequential(metrics, sequential.get(group)))
+                metrics.pop('text', None)
+
+                record = {
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'host': host,
+                    **{k: v for k, v in config.items() if k != 'youtube_scripts'},
+                    **metrics,
+                }
+                line = json.dumps(record, ensure_ascii=False)
+                print(line, flush=True)
+                if output:
+                    output.write(line + '\n')
+                    output.flush()
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+按需导入与启动耗时分析
+依赖是否安装用 importlib.util.find_spec 判断，只查找不执行模块；
+faster_whisper（连带 ctranslate2、onnxruntime、av、numpy）、opencc 等重量级模块
+只在真正用到它们的代码路径上通过 load() 导入，仅获取信息或仅下载音频时不会加载。
+yt_dlp 同样按需导入：只读取播放列表文件、或在多进程转录的子进程中导入下载模块时不会加载。
+
+开启 --profile-startup 后记录每次 load() 的导入耗时，退出时打印明细。
+
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+import atexit
+import importlib
+import importlib.util
+import sys
+import time
+
+# 本模块被导入的时间，近似为脚本启动时间
+_STARTED = time.perf_counter()
+
+# 启动分析中额外报告是否被加载的重量级模块
+HEAVY_MODULES = ['faster_whisper', 'ctranslate2', 'onnxruntime', 'av', 'numpy', 'torch', 'opencc', 'yt_dlp']
+
+# 开启分析后为 [(模块名, 耗时秒)]，否则为 None
+_timings = None
+
+
+def is_installed(module_name: str) -> bool:
+    """检查模块是否已安装（不导入模块本身）"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load(module_name: str):
+    """导入模块；开启启动分析时记录首次导入的耗时"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if _timings is not None:
+        _timings.append((module_name, time.perf_counter() - started))
+    return module
+
+
+def enable_profile():
+    """开启启动耗时分析，进程退出时打印"""
+    global _timings
+    if _timings is None:
+        _timings = []
+        atexit.register(print_profile)
+
+
+def print_profile():
+    """打印导入耗时明细"""
+    total = time.perf_counter() - _STARTED
+    imported = sum(elapsed for _, elapsed in _timings or [])
+
+    print(f"\n{'='*50}")
+    print("启动耗时分析")
+    for module_name, elapsed in _timings or []:
+        print(f"  导入 {module_name:<20} {elapsed * 1000:8.1f} ms")
+    print(f"  按需导入合计{'':<15} {imported * 1000:8.1f} ms")
+    print(f"  运行总耗时{'':<17} {total * 1000:8.1f} ms")
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"  已加载的重量级模块: {', '.join(loaded) if loaded else '无'}")
+    print(f"{'='*50}")
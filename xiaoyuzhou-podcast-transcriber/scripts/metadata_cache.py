@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+节目信息本地缓存
+把解析出的节目信息（音频URL、时长、播客名、发布日期、文件大小）存入一个 JSON 文件，
+在有效期内重复或批量运行时直接读取，不再请求节目页面。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 默认缓存文件与有效期
+DEFAULT_METADATA_PATH = Path.home() / ".cache" / "xiaoyuzhou-transcriber" / "episodes.json"
+DEFAULT_TTL_HOURS = 24
+
+
+class EpisodeMetadataCache:
+    """以节目 ID 为键的节目信息缓存，记录写入时间，超过有效期视为未命中"""
+
+    def __init__(self, path=DEFAULT_METADATA_PATH, ttl_hours: float = DEFAULT_TTL_HOURS):
+        self.path = Path(path)
+        self.ttl = ttl_hours * 3600
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, episode_id: str):
+        """读取未过期的节目信息，未命中时返回 None"""
+        with self._lock:
+            entry = self._load().get(episode_id)
+        if entry is None or time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry['info']
+
+    def put(self, episode_id: str, info: dict):
+        """写入节目信息并原子保存缓存文件"""
+        with self._lock:
+            entries = self._load()
+            entries[episode_id] = {'fetched_at': time.time(), 'info': info}
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+多进程分块转录
+在 VAD 检测到的静音处把长音频切成若干块，用进程池并行转录，
+每个进程分到 cpu_count / workers 个线程，最后按全局时间戳拼接片段。
+
+拼接结果与 run_inference() 的返回格式一致，可直接交给
+build_transcript() 后处理。
+"""
+
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from pcm_cache import open_pcm
+from pcm_decode import SAMPLE_RATE, decode_pcm
+
+# 子进程内的模型实例（由 _init_worker 创建）
+_worker_model = None
+
+
+def find_silence_cut(window, min_offset: int):
+    """
+    在音频窗口内寻找切分点：min_offset 之后第一个静音间隙的中点
+
+    Returns:
+        窗口内的采样点偏移，没有合适的静音时返回 None
+    """
+    speech = detect_speech(window)
+    for prev, nxt in zip(speech, speech[1:]):
+        cut = (prev['end'] + nxt['start']) // 2
+        if cut >= min_offset:
+            return cut
+    return None
+
+
+def next_chunk_end(audio, chunk_start: int, complete: bool, target_seconds: float = 600,
+                   lookahead_seconds: float = 60, sample_rate: int = SAMPLE_RATE):
+    """
+    规划下一个块的结束位置
+
+    只在 [chunk_start, chunk_start + 目标长度 + 前瞻长度] 这个固定窗口上运行 VAD，
+    所以无论音频是一次性解码完成还是边下载边解码，切分结果都完全相同。
+
+    Args:
+        audio: 当前已解码的 PCM
+        chunk_start: 当前块起点（采样点）
+        complete: 音频是否已全部解码
+        target_seconds: 目标块长度（秒）
+        lookahead_seconds: 超过目标长度后继续寻找静音的范围（秒）
+        sample_rate: 采样率
+
+    Returns:
+        块结束位置（采样点）；数据不足、需要等待更多音频时返回 None
+    """
+    target = int(target_seconds * sample_rate)
+    window_end = chunk_start + target + int(lookahead_seconds * sample_rate)
+
+    if len(audio) < window_end and not complete:
+        return None
+    if len(audio) - chunk_start <= target:
+        return len(audio)
+
+    window_end = min(window_end, len(audio))
+    cut = find_silence_cut(audio[chunk_start:window_end], target)
+    if cut is not None:
+        return chunk_start + cut
+    # 前瞻范围内没有静音：窗口末尾强制切分（或到达音频结尾）
+    return window_end
+
+
+def plan_chunks(audio, target_seconds: float = 600, lookahead_seconds: float = 60) -> list:
+    """
+    对已完整解码的音频规划全部切分点
+
+    Returns:
+        [(起始采样点, 结束采样点), ...]，首尾相接覆盖整段音频
+    """
+    chunks = []
+    chunk_start = 0
+    while chunk_start < len(audio):
+        chunk_end = next_chunk_end(audio, chunk_start, True, target_seconds, lookahead_seconds)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    return chunks
+
+
+def detect_speech(audio) -> list:
+    """对音频运行 Silero VAD，返回语音区间（采样点）"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    return get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+
+
+def _init_worker(model_size: str, device: str, compute_type: str, cpu_threads: int):
+    """子进程初始化：每个进程加载一个模型实例，只使用分配到的线程数"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+
+
+def _transcribe_chunk(index: int, audio, offset: float, language: str, decode_options: dict) -> tuple:
+    """
+    子进程任务：转录一个音频块，时间戳加上块的起始偏移
+
+    audio 为 PCM 数组，或 (PCM 缓存文件, 起始采样点, 结束采样点)，后者在子进程中直接映射文件
+    """
+    if isinstance(audio, tuple):
+        audio = open_pcm(*audio)
+    segments, info = _worker_model.transcribe(audio, language=language, **decode_options)
+    result = []
+    for segment in segments:
+        text = segment.text.strip()
+        if text:
+            result.append({
+                'start': segment.start + offset,
+                'end': segment.end + offset,
+                'text': text,
+                'avg_logprob': round(segment.avg_logprob, 3),
+                'compression_ratio': round(segment.compression_ratio, 3),
+            })
+    return index, result, info.language, info.language_probability
+
+
+class ChunkTranscriber:
+    """
+    分块转录进程池
+
+    块可以陆续提交（边解码边提交），collect() 按块顺序拼接结果。
+    """
+
+    def __init__(self, model_size: str, language: str, device: str, compute_type: str, workers: int,
+                 decode_options: dict = None):
+        self.language = language
+        self.decode_options = decode_options or {}
+        self.workers = max(1, workers)
+        self.cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn 启动子进程，避免 fork 继承父进程中 onnxruntime 的线程状态
+        context = multiprocessing.get_context('spawn')
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                        initializer=_init_worker,
+                                        initargs=(model_size, device, compute_type, self.cpu_threads))
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.shutdown(wait=exc_type is None, cancel_futures=exc_type is not None)
+
+    def submit(self, audio, start: int, end: int):
+        """
+        提交 audio[start:end] 作为下一个块
+
+        audio 是 PCM 缓存文件的内存映射时只把文件路径和区间传给子进程，不复制采样数据
+        """
+        index = len(self.futures)
+        # 只认整个文件的映射：memmap 的切片也带着原文件名，但起点不同
+        if isinstance(audio, np.memmap) and isinstance(audio.base, mmap.mmap) and audio.offset == 0:
+            chunk = (audio.filename, start, end)
+        else:
+            chunk = audio[start:end]
+        self.futures.append(self.pool.submit(_transcribe_chunk, index, chunk,
+                                             start / SAMPLE_RATE, self.language, self.decode_options))
+
+    def collect(self, duration: float) -> tuple:
+        """
+        等待全部块完成并按顺序拼接
+
+        Returns:
+            (片段列表, 音频信息)，格式与 run_inference() 相同
+        """
+        results = {}
+        languages = {}
+        for done, future in enumerate(as_completed(self.futures), start=1):
+            index, segments, lang, lang_prob = future.result()
+            results[index] = segments
+            languages[index] = (lang, lang_prob)
+            print(f"已完成 {done}/{len(self.futures)} 块")
+
+        segments_with_timestamps = []
+        for index in range(len(self.futures)):
+            segments_with_timestamps.extend(results[index])
+
+        print(f"✓ 转录完成，共 {len(segments_with_timestamps)} 个片段")
+
+        if languages:
+            detected_lang, lang_prob = languages[0]
+            print(f"检测到语言: {detected_lang}, 概率: {lang_prob:.2f}")
+        else:
+            # 空音频没有切出任何块：与逐段转录一样返回空结果，语言取请求的语言
+            detected_lang, lang_prob = self.language, 1.0 if self.language else 0.0
+        info = {
+            'language': detected_lang,
+            'language_probability': lang_prob,
+            'duration': duration,
+        }
+        return segments_with_timestamps, info
+
+
+def run_parallel_inference(audio, model_size: str, language: str, device: str,
+                           compute_type: str, workers: int, chunk_seconds: float = 600,
+                           decode_options: dict = None) -> tuple:
+    """
+    分块并行转录
+
+    Args:
+        audio: 音频文件路径、内存中的音频，或已解码的 PCM（如 PcmCache.load() 返回的内存映射）
+        model_size: Whisper 模型大小
+        language: 语言代码
+        device: 计算设备（已解析）
+        compute_type: 计算类型
+        workers: 进程数
+        chunk_seconds: 目标块长度（秒）
+        decode_options: 传给 model.transcribe() 的解码参数
+
+    Returns:
+        (片段列表, 音频信息)，格式与 run_inference() 相同
+    """
+    if not isinstance(audio, np.ndarray):  # 文件路径或内存中的音频
+        print("解码音频...")
+        audio = decode_pcm(audio)
+    print("检测静音...")
+    duration = len(audio) / SAMPLE_RATE
+    chunks = plan_chunks(audio, chunk_seconds)
+
+    workers = max(1, min(workers, len(chunks)))
+    print(f"音频时长: {duration:.1f} 秒 ({duration/60:.1f} 分钟)")
+    with ChunkTranscriber(model_size, language, device, compute_type, workers,
+                          decode_options) as transcriber:
+        print(f"切分为 {len(chunks)} 块，{workers} 个进程并行，每进程 {transcriber.cpu_threads} 线程")
+        for start, end in chunks:
+            transcriber.submit(audio, start, end)
+        return transcriber.collect(duration)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+解码后 PCM 的磁盘缓存
+同一音频只解码一次：16kHz 单声道 float32 PCM 写入 ~/.cache/whisper-pcm/<音频哈希>.f32，
+之后换模型重跑、分块并行的各个子进程、常驻服务都以只读内存映射的方式读取，
+切片不复制数据，也不再经过 PyAV 解码。
+
+文件为裸 little-endian float32，没有文件头；youtube-tutorial-notes 使用同一目录和格式。
+缓存目录有总大小上限，超出时按最近使用时间淘汰（LRU）。
+
+两个 skill 共用缓存目录，键（audio_hash.py）和格式必须一致：
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from audio_hash import hash_audio
+from pcm_decode import iter_pcm_chunks
+
+# 默认缓存目录与大小上限（1 小时音频约 230 MB）
+DEFAULT_PCM_DIR = Path.home() / ".cache" / "whisper-pcm"
+DEFAULT_MAX_MB = 2048
+
+PCM_DTYPE = np.dtype('<f4')
+
+
+def open_pcm(path, start: int = 0, end: int = None) -> np.ndarray:
+    """
+    以只读内存映射打开 PCM 文件，可只映射 [start, end) 采样点
+
+    Returns:
+        np.memmap；区间为空时返回长度为 0 的普通数组（空文件无法映射）
+    """
+    total = os.path.getsize(path) // PCM_DTYPE.itemsize
+    end = total if end is None else min(end, total)
+    if end <= start:
+        return np.zeros(0, dtype=PCM_DTYPE)
+    return np.memmap(path, dtype=PCM_DTYPE, mode='r', offset=start * PCM_DTYPE.itemsize,
+                     shape=(end - start,))
+
+
+class PcmCache:
+    """按音频内容哈希缓存解码结果，文件修改时间即最近使用时间"""
+
+    def __init__(self, cache_dir=DEFAULT_PCM_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def path_for(self, audio_hash: str) -> Path:
+        return self.cache_dir / f"{audio_hash}.f32"
+
+    def load(self, audio_path: str, audio_hash: str = None) -> np.ndarray:
+        """
+        读取音频的 PCM，未缓存时先边解码边写入缓存
+
+        Args:
+            audio_path: 音频文件路径
+            audio_hash: 音频内容哈希，已算过时传入可省去再次读取文件
+
+        Returns:
+            只读内存映射的 float32 PCM
+        """
+        path = self.path_for(audio_hash or hash_audio(audio_path))
+        if path.exists():
+            os.utime(path)  # 更新最近使用时间
+        else:
+            self._decode_to(audio_path, path)
+            self.evict()
+        return open_pcm(path)
+
+    def _decode_to(self, audio_path: str, path: Path):
+        """逐块解码写入临时文件，完成后原子替换"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter_pcm_chunks(audio_path):
+                    f.write(chunk.astype(PCM_DTYPE, copy=False).tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        entries = []
+        for path in self.cache_dir.glob('*.f32'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        # 最新的条目即使超过上限也保留，它正要被使用
+        for _, size, path in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+音频解码为 16kHz 单声道 PCM
+与 faster_whisper.decode_audio 的处理流程一致（s16 重采样后归一化为 float32），
+但按块产出，可以边读边解码。输入可以是文件路径，也可以是类文件对象。
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# 重采样前按此采样点数合并帧，与 faster_whisper 保持一致
+_GROUP_SAMPLES = 500000
+
+
+def iter_pcm_chunks(source, sampling_rate: int = SAMPLE_RATE):
+    """
+    逐块解码音频
+
+    Args:
+        source: 文件路径或类文件对象
+        sampling_rate: 目标采样率
+
+    Yields:
+        float32 单声道 PCM 数组
+    """
+    import av
+
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=sampling_rate)
+    fifo = av.audio.fifo.AudioFifo()
+
+    def resample(frame):
+        for resampled in resampler.resample(frame):
+            yield resampled.to_ndarray().reshape(-1).astype(np.float32) / 32768.0
+
+    with av.open(source, mode="r", metadata_errors="ignore") as container:
+        frames = container.decode(audio=0)
+        while True:
+            try:
+                frame = next(frames)
+            except StopIteration:
+                break
+            except av.error.InvalidDataError:
+                continue  # 跳过无效帧
+
+            frame.pts = None  # 忽略时间戳检查
+            fifo.write(frame)
+            if fifo.samples >= _GROUP_SAMPLES:
+                yield from resample(fifo.read())
+
+        if fifo.samples > 0:
+            yield from resample(fifo.read())
+        yield from resample(None)  # 刷新重采样器缓冲
+
+
+def decode_pcm(source, sampling_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """一次性解码整段音频为 float32 PCM"""
+    chunks = list(iter_pcm_chunks(source, sampling_rate))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+多连接断点续传下载
+把文件按 HTTP Range 切成若干段，多个连接并行下载，整段写入预分配的 .part 文件。
+已完成的分段记录在 .part.json 中，下载中断后重新运行会跳过已完成的分段。
+服务器不支持 Range 时退化为单连接顺序下载。
+
+download_to_buffer() 不落盘：分段直接写入内存缓冲（SpooledTemporaryFile），
+超过阈值才溢出到临时目录下的匿名文件，适合下载后即丢弃的音频；没有断点续传。
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# 默认分段大小
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024
+
+# 单次读取大小（顺序下载及分段读取）
+_READ_SIZE = 1024 * 1024
+
+
+def probe_range_support(url: str, headers: dict, ssl_context=None, timeout: int = 30) -> tuple:
+    """
+    探测服务器是否支持 Range 请求
+
+    Returns:
+        (是否支持 Range, 文件总大小)，大小未知时为 None
+    """
+    req = urllib.request.Request(url, headers={**headers, 'Range': 'bytes=0-0'})
+    with urllib.request.urlopen(req, context=ssl_context, timeout=timeout) as response:
+        if response.status == 206:
+            match = re.match(r'bytes \d+-\d+/(\d+)', response.getheader('Content-Range') or '')
+            if match:
+                return True, int(match.group(1))
+        total_size = response.getheader('Content-Length')
+        return False, int(total_size) if total_size else None
+
+
+class _Progress:
+    """线程安全的下载进度输出（每 10% 输出一次）"""
+
+    def __init__(self, total_size: int, downloaded: int = 0):
+        self.total_size = total_size
+        self.downloaded = downloaded
+        self.last_percent = int(downloaded * 100 / total_size) // 10 * 10 if total_size else -1
+        self._lock = threading.Lock()
+
+    def add(self, size: int):
+        with self._lock:
+            self.downloaded += size
+            if not self.total_size:
+                return
+            percent = int(self.downloaded * 100 / self.total_size) // 10 * 10
+            if percent > self.last_percent:
+                print(f"下载进度: {percent}%")
+                self.last_percent = percent
+
+
+def _load_segment_map(map_path: str, total_size: int, segment_size: int) -> set:
+    """读取分段记录，文件大小或分段大小不一致时视为新下载"""
+    try:
+        with open(map_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state['total_size'] == total_size and state['segment_size'] == segment_size:
+            return set(state['done'])
+    except (OSError, ValueError, KeyError):
+        pass
+    return set()
+
+
+def _save_segment_map(map_path: str, total_size: int, segment_size: int, done: set):
+    """原子写入分段记录"""
+    tmp_path = map_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'total_size': total_size, 'segment_size': segment_size, 'done': sorted(done)}, f)
+    os.replace(tmp_path, map_path)
+
+
+def _copy_response(url: str, f, headers: dict, ssl_context, timeout: int) -> int:
+    """单连接顺序下载到已打开的文件对象，返回字节数"""
+    req = urllib.request.Request(url, headers=headers)
+    with urllib.request.urlopen(req, context=ssl_context, timeout=timeout) as response:
+        total_size = response.getheader('Content-Length')
+        total_size = int(total_size) if total_size else None
+        progress = _Progress(total_size)
+        while True:
+            chunk = response.read(_READ_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            progress.add(len(chunk))
+
+    if total_size is not None and progress.downloaded != total_size:
+        raise IOError(f"下载不完整: {progress.downloaded}/{total_size} 字节")
+    return progress.downloaded
+
+
+def _download_sequential(url: str, output_path: str, headers: dict, ssl_context, timeout: int) -> int:
+    """单连接顺序下载（服务器不支持 Range 时使用）"""
+    part_path = output_path + '.part'
+    with open(part_path, 'wb', buffering=_READ_SIZE) as f:
+        size = _copy_response(url, f, headers, ssl_context, timeout)
+    os.replace(part_path, output_path)
+    return size
+
+
+def _fetch_range(url: str, index: int, start: int, end: int, headers: dict, ssl_context,
+                 retries: int, timeout: int) -> bytearray:
+    """下载 [start, end] 字节区间，失败时重试，返回完整的分段数据"""
+    expected = end - start + 1
+    last_error = None
+    for _ in range(retries + 1):
+        try:
+            req = urllib.request.Request(url, headers={**headers, 'Range': f'bytes={start}-{end}'})
+            data = bytearray()
+            with urllib.request.urlopen(req, context=ssl_context, timeout=timeout) as response:
+                if response.status != 206:
+                    raise IOError(f"分段请求未返回 206: {response.status}")
+                while len(data) < expected:
+                    chunk = response.read(min(_READ_SIZE, expected - len(data)))
+                    if not chunk:
+                        break
+                    data.extend(chunk)
+            if len(data) != expected:
+                raise IOError(f"分段 {index} 不完整: {len(data)}/{expected} 字节")
+            return data
+        except Exception as e:
+            last_error = e
+    raise IOError(f"分段 {index} 下载失败: {last_error}")
+
+
+def download_file(url: str, output_path: str, headers: dict = None, ssl_context=None,
+                  connections: int = 4, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                  retries: int = 3, timeout: int = 60) -> int:
+    """
+    多连接分段下载文件，支持断点续传
+
+    Args:
+        url: 下载链接
+        output_path: 保存路径（下载中使用 <output_path>.part 和 <output_path>.part.json）
+        headers: 请求头
+        ssl_context: SSL 上下文
+        connections: 并行连接数
+        segment_size: 分段大小（字节）
+        retries: 每个分段的重试次数
+        timeout: 单次请求超时（秒）
+
+    Returns:
+        文件大小（字节）；下载失败时抛出异常
+    """
+    headers = headers or {}
+    supports_range, total_size = probe_range_support(url, headers, ssl_context, timeout)
+    if not supports_range or not total_size:
+        print("服务器不支持分段下载，使用单连接下载")
+        return _download_sequential(url, output_path, headers, ssl_context, timeout)
+
+    print(f"文件大小: {total_size / (1024 * 1024):.1f} MB")
+
+    part_path = output_path + '.part'
+    map_path = part_path + '.json'
+    segments = [(start, min(start + segment_size, total_size) - 1)
+                for start in range(0, total_size, segment_size)]
+
+    done = _load_segment_map(map_path, total_size, segment_size) if os.path.exists(part_path) else set()
+    if done:
+        print(f"继续上次的下载：已完成 {len(done)}/{len(segments)} 段")
+    else:
+        # 预分配完整大小的 .part 文件，各分段直接写入对应位置
+        with open(part_path, 'wb') as f:
+            f.truncate(total_size)
+        _save_segment_map(map_path, total_size, segment_size, done)
+
+    progress = _Progress(total_size, sum(end - start + 1 for i, (start, end) in enumerate(segments) if i in done))
+    write_lock = threading.Lock()
+
+    def fetch(index: int):
+        start, end = segments[index]
+        data = _fetch_range(url, index, start, end, headers, ssl_context, retries, timeout)
+
+        # 整段一次写入，写完再记录完成状态
+        with write_lock:
+            f.seek(start)
+            f.write(data)
+            f.flush()
+            done.add(index)
+            _save_segment_map(map_path, total_size, segment_size, done)
+        progress.add(len(data))
+
+    pending = [i for i in range(len(segments)) if i not in done]
+    with open(part_path, 'r+b') as f:
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+            # list() 让任意分段的异常在这里抛出：走到下面时每个分段都已完整写入
+            list(pool.map(fetch, pending))
+
+    os.replace(part_path, output_path)
+    os.remove(map_path)
+    return total_size
+
+
+def download_to_buffer(url: str, headers: dict = None, ssl_context=None, connections: int = 4,
+                       spill_bytes: int = 256 * 1024 * 1024, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                       retries: int = 3, timeout: int = 60):
+    """
+    多连接分段下载到内存，不写下载目录
+
+    Args:
+        url: 下载链接
+        headers: 请求头
+        ssl_context: SSL 上下文
+        connections: 并行连接数
+        spill_bytes: 内存中最多保留的字节数，超过时整体溢出到临时目录（TMPDIR）下的匿名文件，
+            文件关闭即删除；TMPDIR 指向 tmpfs 时全程不落盘
+        segment_size: 分段大小（字节）
+        retries: 每个分段的重试次数
+        timeout: 单次请求超时（秒）
+
+    Returns:
+        位于开头的可读写缓冲（SpooledTemporaryFile），用完后由调用方关闭；下载失败时抛出异常
+    """
+    headers = headers or {}
+    buffer = tempfile.SpooledTemporaryFile(max_size=spill_bytes)
+    try:
+        supports_range, total_size = probe_range_support(url, headers, ssl_context, timeout)
+        if not supports_range or not total_size:
+            print("服务器不支持分段下载，使用单连接下载")
+            _copy_response(url, buffer, headers, ssl_context, timeout)
+        else:
+            print(f"文件大小: {total_size / (1024 * 1024):.1f} MB（下载到内存）")
+            if total_size > spill_bytes:
+                print(f"超过内存阈值 {spill_bytes / (1024 * 1024):.0f} MB，溢出到临时文件")
+                buffer.rollover()
+            segments = [(start, min(start + segment_size, total_size) - 1)
+                        for start in range(0, total_size, segment_size)]
+            progress = _Progress(total_size)
+            write_lock = threading.Lock()
+
+            def fetch(index: int):
+                start, end = segments[index]
+                data = _fetch_range(url, index, start, end, headers, ssl_context, retries, timeout)
+                with write_lock:
+                    buffer.seek(start)
+                    buffer.write(data)
+                progress.add(len(data))
+
+            with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+                # list() 让任意分段的异常在这里抛出（_fetch_range 只返回完整的分段）
+                list(pool.map(fetch, range(len(segments))))
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
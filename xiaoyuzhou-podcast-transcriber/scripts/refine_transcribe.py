@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+两遍转录：小模型初转，大模型只重转可疑片段
+整期节目用 large-v3 转录比 base 慢数倍，但 base 的大部分片段已经足够好。
+第一遍用小模型转录全程，片段保留 avg_logprob 和 compression_ratio；
+平均对数概率过低、压缩比过高（Whisper 重复幻觉的典型特征），或文本含有
+后处理要折叠的连续重复（has_repeated_text()）的片段被标记为可疑。
+相邻的可疑片段合并成区间，只把这些区间的音频交给大模型重转，结果按时间替换回原位置。
+
+区间的边界对齐原片段边界，两端只向静音间隙延伸，不会切进未标记的相邻片段，
+因此替换后不会出现重复或缺失的句子。大模型在某个区间没有输出时保留第一遍的结果。
+"""
+
+# 标记阈值，与 faster-whisper 判定解码失败（回退到更高温度）的默认阈值一致
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+# 区间两端向相邻静音延伸的最大长度（秒），给大模型留出完整的起止音
+DEFAULT_PADDING_SECONDS = 0.5
+
+# 两个可疑片段相距不超过该值（秒）时合并为一个区间，中间的片段一并重转
+DEFAULT_MERGE_GAP_SECONDS = 3.0
+
+# 作为区间上文提示的前文片段数
+_PROMPT_SEGMENTS = 3
+
+
+def is_suspicious(segment: dict, logprob_threshold: float = LOGPROB_THRESHOLD,
+                  compression_threshold: float = COMPRESSION_RATIO_THRESHOLD, text_check=None) -> bool:
+    """
+    片段是否需要重转
+
+    没有置信度字段的片段（如旧版本写入的缓存）只做文本检查。
+    """
+    avg_logprob = segment.get('avg_logprob')
+    if avg_logprob is not None and avg_logprob < logprob_threshold:
+        return True
+    compression_ratio = segment.get('compression_ratio')
+    if compression_ratio is not None and compression_ratio > compression_threshold:
+        return True
+    return bool(text_check and text_check(segment['text']))
+
+
+def plan_spans(segments: list, flagged: list, padding: float = DEFAULT_PADDING_SECONDS,
+               merge_gap: float = DEFAULT_MERGE_GAP_SECONDS, duration: float = None) -> list:
+    """
+    把可疑片段合并为重转区间
+
+    Args:
+        segments: 第一遍的片段（按时间排序）
+        flagged: 可疑片段的下标（升序）
+        padding: 区间两端向静音间隙延伸的最大长度（秒）
+        merge_gap: 可疑片段相距不超过该值（秒）时合并
+        duration: 音频时长，用于限制最后一个区间的结束时间
+
+    Returns:
+        [(起始秒, 结束秒, 首片段下标, 末片段下标)]，首末下标之间的片段都会被替换
+    """
+    groups = []
+    for index in flagged:
+        if groups and segments[index]['start'] - segments[groups[-1][1]]['end'] <= merge_gap:
+            groups[-1][1] = index
+        else:
+            groups.append([index, index])
+
+    spans = []
+    for first, last in groups:
+        lower = segments[first - 1]['end'] if first > 0 else 0.0
+        upper = segments[last + 1]['start'] if last + 1 < len(segments) else duration
+        start = max(lower, segments[first]['start'] - padding)
+        end = segments[last]['end'] + padding
+        if upper is not None:
+            end = min(end, max(upper, segments[last]['end']))
+        spans.append((start, end, first, last))
+    return spans
+
+
+def refine_segments(model, audio, segments: list, language: str, decode_options: dict = None,
+                    text_check=None, logprob_threshold: float = LOGPROB_THRESHOLD,
+                    compression_threshold: float = COMPRESSION_RATIO_THRESHOLD,
+                    padding: float = DEFAULT_PADDING_SECONDS, merge_gap: float = DEFAULT_MERGE_GAP_SECONDS,
+                    duration: float = None) -> tuple:
+    """
+    用大模型重转可疑片段并替换回原位置
+
+    Args:
+        model: 用于第二遍的 WhisperModel
+        audio: 音频文件路径，或 16kHz PCM 数组（如 PcmCache.load() 返回的内存映射）
+        segments: 第一遍的片段 [{'start', 'end', 'text', 'avg_logprob', 'compression_ratio'}]
+        language: 第一遍检测到的语言，第二遍沿用
+        decode_options: 传给 model.transcribe() 的其他解码参数
+        text_check: text_check(文本) 返回 True 时片段也视为可疑（如含连续重复）
+        logprob_threshold: avg_logprob 低于该值视为可疑
+        compression_threshold: compression_ratio 高于该值视为可疑
+        padding: 见 plan_spans()
+        merge_gap: 见 plan_spans()
+        duration: 音频时长（秒）
+
+    Returns:
+        (新的片段列表, 统计信息 {'flagged', 'spans', 'refined_seconds'})
+    """
+    from pcm_decode import SAMPLE_RATE
+    from windowed_transcribe import PcmWindowReader
+
+    flagged = [i for i, seg in enumerate(segments)
+               if is_suspicious(seg, logprob_threshold, compression_threshold, text_check)]
+    spans = plan_spans(segments, flagged, padding, merge_gap, duration)
+    stats = {'flagged': len(flagged), 'spans': len(spans),
+             'refined_seconds': round(sum(end - start for start, end, _, _ in spans), 3)}
+    if not spans:
+        return segments, stats
+
+    # 区间按时间递增，文件输入时 PcmWindowReader 顺序解码且只缓冲当前区间
+    reader = PcmWindowReader(audio)
+    decode_options = dict(decode_options or {})
+    refined = []
+    kept = 0  # segments 中已写入 refined 的位置
+    for number, (start, end, first, last) in enumerate(spans, 1):
+        refined.extend(segments[kept:first])
+        kept = last + 1
+
+        begin = int(start * SAMPLE_RATE)
+        pcm, _ = reader.read(begin, int(end * SAMPLE_RATE) - begin)
+        prompt = ' '.join(seg['text'] for seg in segments[max(0, first - _PROMPT_SEGMENTS):first])
+        new_segments = []
+        if len(pcm):
+            new_segments, _ = model.transcribe(pcm, language=language, initial_prompt=prompt or None,
+                                               **decode_options)
+        replacement = []
+        for segment in new_segments:
+            text = segment.text.strip()
+            if text:
+                replacement.append({
+                    'start': round(min(start + segment.start, end), 3),
+                    'end': round(min(start + segment.end, end), 3),
+                    'text': text,
+                    'avg_logprob': round(segment.avg_logprob, 3),
+                    'compression_ratio': round(segment.compression_ratio, 3),
+                })
+        # 大模型判定为无语音时保留原结果，交给后处理的去重
+        refined.extend(replacement or segments[first:last + 1])
+        print(f"  精修区间 {number}/{len(spans)}: {start/60:.1f}-{end/60:.1f} 分钟, "
+              f"{last - first + 1} 段 → {len(replacement)} 段")
+
+    refined.extend(segments[kept:])
+    return refined, stats
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+边下载边转录
+下载线程把收到的字节同时写入音频文件和内存缓冲，解码线程从缓冲中边读边解码为 PCM，
+主线程每凑够一个块（见 parallel_transcribe.next_chunk_end）就提交给转录进程池，
+下载尾部时前面的块已经在转录了。
+
+Whisper 的逐段解码需要完整音频，所以边下载边转录总是分块转录（workers=1 时单进程逐块转录）。
+切分规则只依赖固定窗口内的音频，所以结果与先下载、再用同样的 --workers / --chunk-minutes
+分块转录完全一致，但与默认的整段转录不同：块边界处缺少上文，文本可能略有差异。moov 信息在文件末尾的 m4a 需要先拿到文件尾才能解码，
+此时解码会等到下载完成，退化为两阶段流程。
+"""
+
+import io
+import threading
+import urllib.request
+
+import numpy as np
+
+from parallel_transcribe import ChunkTranscriber, next_chunk_end
+from pcm_decode import SAMPLE_RATE, iter_pcm_chunks
+
+
+class GrowingBuffer(io.RawIOBase):
+    """
+    下载中的字节缓冲，供解码器当作文件读取
+
+    读取或定位到尚未下载的位置时阻塞，直到数据到达或下载结束。
+    """
+
+    def __init__(self, total_size: int = None):
+        super().__init__()
+        self.total_size = total_size
+        self._data = bytearray()
+        self._pos = 0
+        self._done = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    def append(self, chunk: bytes):
+        with self._cond:
+            self._data.extend(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error: Exception = None):
+        with self._cond:
+            self._done = True
+            self._error = error
+            self._cond.notify_all()
+
+    def _wait_for(self, size: int):
+        """等待缓冲长度达到 size 或下载结束"""
+        with self._cond:
+            while len(self._data) < size and not self._done:
+                self._cond.wait()
+            if self._error:
+                raise IOError(f"音频下载失败: {self._error}")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        self._wait_for(self._pos + len(b))
+        data = self._data[self._pos:self._pos + len(b)]
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            if self.total_size is None:
+                self._wait_for(float('inf'))
+                self._pos = len(self._data) + offset
+            else:
+                self._pos = self.total_size + offset
+        else:
+            raise ValueError(f"不支持的 whence: {whence}")
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class PcmBuffer:
+    """解码线程持续追加的 PCM 缓冲，按需扩容"""
+
+    def __init__(self):
+        self._array = np.empty(SAMPLE_RATE * 600, dtype=np.float32)
+        self._length = 0
+        self._complete = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    def extend(self, chunk):
+        with self._cond:
+            needed = self._length + len(chunk)
+            if needed > len(self._array):
+                grown = np.empty(max(needed, len(self._array) * 2), dtype=np.float32)
+                grown[:self._length] = self._array[:self._length]
+                self._array = grown
+            self._array[self._length:needed] = chunk
+            self._length = needed
+            self._cond.notify_all()
+
+    def finish(self, error: Exception = None):
+        with self._cond:
+            self._complete = True
+            self._error = error
+            self._cond.notify_all()
+
+    def wait(self, min_samples: int) -> tuple:
+        """
+        等待至少 min_samples 个采样点解码完成（或解码结束）
+
+        Returns:
+            (已解码 PCM 的视图, 是否已全部解码)
+        """
+        with self._cond:
+            while self._length < min_samples and not self._complete:
+                self._cond.wait()
+            if self._error:
+                raise RuntimeError(f"音频解码失败: {self._error}")
+            return self._array[:self._length], self._complete
+
+
+def _download(response, buffer: GrowingBuffer, output_path: str, total_size: int):
+    """下载线程：写入文件的同时追加到内存缓冲"""
+    try:
+        downloaded = 0
+        last_percent = -1
+        with open(output_path, 'wb') as f:
+            while True:
+                chunk = response.read(256 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+                buffer.append(chunk)
+                downloaded += len(chunk)
+
+                if total_size:
+                    percent = int(downloaded * 100 / total_size)
+                    if percent != last_percent and percent % 10 == 0:
+                        print(f"下载进度: {percent}%")
+                        last_percent = percent
+
+        if total_size and downloaded != total_size:
+            raise IOError(f"下载不完整: {downloaded}/{total_size} 字节")
+        print(f"✓ 下载完成: {output_path}")
+        buffer.finish()
+    except Exception as e:
+        buffer.finish(e)
+    finally:
+        response.close()
+
+
+def _decode(buffer: GrowingBuffer, pcm: PcmBuffer):
+    """解码线程：从下载缓冲边读边解码"""
+    try:
+        for chunk in iter_pcm_chunks(buffer):
+            pcm.extend(chunk)
+        pcm.finish()
+    except Exception as e:
+        pcm.finish(e)
+
+
+def stream_transcribe(audio_url: str, output_path: str, headers: dict, ssl_context,
+                      model_size: str, language: str, device: str, compute_type: str,
+                      workers: int = 1, chunk_seconds: float = 600,
+                      lookahead_seconds: float = 60, decode_options: dict = None) -> tuple:
+    """
+    边下载边分块转录
+
+    Args:
+        audio_url: 音频链接
+        output_path: 音频保存路径
+        headers: 下载请求头
+        ssl_context: SSL 上下文
+        model_size: Whisper 模型大小
+        language: 语言代码
+        device: 计算设备（已解析）
+        compute_type: 计算类型
+        workers: 转录进程数
+        chunk_seconds: 目标块长度（秒）
+        lookahead_seconds: 寻找静音的前瞻范围（秒）
+        decode_options: 传给 model.transcribe() 的解码参数
+
+    Returns:
+        (片段列表, 音频信息)，格式与 run_inference() 相同
+    """
+    req = urllib.request.Request(audio_url, headers=headers)
+    response = urllib.request.urlopen(req, context=ssl_context, timeout=60)
+    total_size = response.getheader('Content-Length')
+    total_size = int(total_size) if total_size else None
+    if total_size:
+        print(f"文件大小: {total_size / (1024 * 1024):.1f} MB")
+
+    buffer = GrowingBuffer(total_size)
+    pcm = PcmBuffer()
+    threads = [
+        threading.Thread(target=_download, args=(response, buffer, output_path, total_size), daemon=True),
+        threading.Thread(target=_decode, args=(buffer, pcm), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    window = int((chunk_seconds + lookahead_seconds) * SAMPLE_RATE)
+    # 模型在子进程中加载，与下载同时进行
+    with ChunkTranscriber(model_size, language, device, compute_type, workers,
+                          decode_options) as transcriber:
+        print(f"边下载边转录：{transcriber.workers} 个进程，每进程 {transcriber.cpu_threads} 线程")
+        chunk_start = 0
+        while True:
+            audio, complete = pcm.wait(chunk_start + window)
+            if complete and chunk_start >= len(audio):
+                break
+            chunk_end = next_chunk_end(audio, chunk_start, complete, chunk_seconds, lookahead_seconds)
+            transcriber.submit(audio, chunk_start, chunk_end)
+            print(f"已提交第 {len(transcriber.futures)} 块 "
+                  f"({chunk_start / SAMPLE_RATE / 60:.1f}-{chunk_end / SAMPLE_RATE / 60:.1f} 分钟)")
+            chunk_start = chunk_end
+
+        duration = len(audio) / SAMPLE_RATE
+        print(f"音频时长: {duration:.1f} 秒 ({duration/60:.1f} 分钟)")
+        result = transcriber.collect(duration)
+
+    for thread in threads:
+        thread.join()
+    return result
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+常驻转录服务
+在本机后台常驻，按 (模型大小, 设备, 计算类型) 缓存已加载的 WhisperModel，
+transcribe_podcast.py 检测到服务在运行时直接提交任务，省去每次加载模型的开销。
+
+用法:
+  python3 transcribe_daemon.py                        # 监听 127.0.0.1:8765
+  python3 transcribe_daemon.py --preload base small   # 启动时预加载模型
+  python3 transcribe_daemon.py --port 9000 -d cpu
+
+接口:
+  GET  /health       服务状态及已加载模型
+  POST /transcribe   {"audio_path", "model_size", "language", "device", "compute_type", "audio_hash",
+                      "window_seconds", "beam_size", "batch_size"}
+                     返回 {"segments": [...], "info": {...}}
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transcribe_podcast import (_MODEL_CACHE, default_compute_type, load_model,
+                                resolve_device, run_inference)
+
+
+# 解码 PCM 缓存（与 transcribe_podcast.py 共用），--no-pcm-cache 时为 None
+_pcm_cache = None
+
+# 每个模型一把锁：同一模型的任务串行执行，不同模型互不阻塞
+_model_locks = {}
+_locks_guard = threading.Lock()
+
+
+def get_model(model_size: str, device: str = "auto", compute_type: str = None):
+    """加载（或复用）模型，返回 (模型, 该模型的锁)"""
+    device = resolve_device(device)
+    compute_type = compute_type or default_compute_type(device)
+    key = (model_size, device, compute_type, 1)
+    with _locks_guard:
+        lock = _model_locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _MODEL_CACHE:
+            print(f"加载模型: {model_size}, 设备: {device}, 计算类型: {compute_type}")
+        model = load_model(model_size, device, compute_type)
+    return model, lock
+
+
+class TranscribeHandler(BaseHTTPRequestHandler):
+    """处理转录请求"""
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': f'未知路径: {self.path}'})
+            return
+        models = [
+            {'model_size': size, 'device': device, 'compute_type': compute_type}
+            for size, device, compute_type, _ in _MODEL_CACHE
+        ]
+        self._send_json(200, {'status': 'ok', 'models': models})
+
+    def do_POST(self):
+        if self.path != '/transcribe':
+            self._send_json(404, {'error': f'未知路径: {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = json.loads(self.rfile.read(length).decode('utf-8'))
+            audio_path = job['audio_path']
+        except Exception as e:
+            self._send_json(400, {'error': f'请求格式错误: {e}'})
+            return
+
+        if not Path(audio_path).exists():
+            self._send_json(400, {'error': f'音频文件不存在: {audio_path}'})
+            return
+
+        try:
+            model, lock = get_model(job.get('model_size', 'base'),
+                                    job.get('device', 'auto'),
+                                    job.get('compute_type'))
+            print(f"\n转录: {audio_path}")
+            audio = _pcm_cache.load(audio_path, job.get('audio_hash')) if _pcm_cache else audio_path
+            with lock:
+                segments, info = run_inference(model, audio, job.get('language', 'zh'),
+                                               window_seconds=job.get('window_seconds'),
+                                               beam_size=job.get('beam_size'),
+                                               batch_size=job.get('batch_size') or 0)
+        except Exception as e:
+            print(f"转录失败: {e}")
+            self._send_json(500, {'error': str(e)})
+            return
+
+        self._send_json(200, {'segments': segments, 'info': info})
+
+    def log_message(self, format, *args):
+        # 只保留转录日志，不打印每个 HTTP 请求
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="小宇宙播客转录常驻服务 - 常驻内存复用 Whisper 模型")
+    parser.add_argument("--host", help="监听地址 (默认: 127.0.0.1)", default="127.0.0.1")
+    parser.add_argument("--port", help="监听端口 (默认: 8765)", type=int, default=8765)
+    parser.add_argument("--preload", help="启动时预加载的模型", nargs='*', default=[])
+    parser.add_argument("-d", "--device", help="预加载模型使用的设备 (cpu/cuda/auto, 默认: auto)",
+                        default="auto")
+    parser.add_argument("--no-pcm-cache", help="不缓存解码后的 PCM", action="store_true")
+    args = parser.parse_args()
+
+    # 设置环境变量解决 OpenMP 库冲突
+    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+
+    global _pcm_cache
+    if not args.no_pcm_cache:
+        from pcm_cache import PcmCache
+
+        _pcm_cache = PcmCache()
+
+    for model_size in args.preload:
+        get_model(model_size, args.device)
+
+    server = ThreadingHTTPServer((args.host, args.port), TranscribeHandler)
+    print(f"✓ 常驻转录服务已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,27 +10,39 @@
 """
 
 import argparse
+import functools
+import json
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from lazy_imports import enable_profile, is_installed, load
+from refine_transcribe import COMPRESSION_RATIO_THRESHOLD, LOGPROB_THRESHOLD
+from stage_metrics import configure as configure_metrics, span
 
-def check_and_install_dependencies():
-    """检查并自动安装必要的依赖"""
-    dependencies = [
-        ('faster_whisper', 'faster-whisper', 'Whisper 语音识别模型'),
-        ('opencc', 'opencc-python-reimplemented', '中文简繁转换库'),
-        ('certifi', 'certifi', 'SSL 证书验证'),
-    ]
+
+def check_and_install_dependencies(transcription: bool = True):
+    """
+    检查并自动安装必要的依赖
+
+    只检查模块是否存在，不导入模块；仅下载音频时不检查转录相关的依赖。
+    """
+    dependencies = [('certifi', 'certifi', 'SSL 证书验证')]
+    if transcription:
+        dependencies += [
+            ('faster_whisper', 'faster-whisper', 'Whisper 语音识别模型'),
+            ('opencc', 'opencc-python-reimplemented', '中文简繁转换库'),
+        ]
 
     missing = []
     for module_name, pip_name, description in dependencies:
-        try:
-            __import__(module_name)
-        except ImportError:
+        if not is_installed(module_name):
             missing.append((pip_name, description))
 
     if missing:
@@ -66,6 +78,15 @@ def check_and_install_dependencies():
     return True
 
 
+# 下载音频使用的请求头
+AUDIO_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'zh-CN,zh;q=0.9',
+    'Referer': 'https://www.xiaoyuzhoufm.com/',
+}
+
+
 def extract_episode_id(url: str) -> str:
     """从小宇宙URL中提取episode ID"""
     pattern = r'xiaoyuzhoufm\.com/episode/([a-zA-Z0-9]+)'
@@ -75,8 +96,94 @@ def extract_episode_id(url: str) -> str:
     raise ValueError(f"无法从URL中提取episode ID: {url}")
 
 
-def get_episode_info(episode_id: str) -> dict:
-    """获取播客节目信息，包括音频URL"""
+# 页面内嵌的 Next.js 状态数据
+_NEXT_DATA_PATTERN = re.compile(
+    r'<script id="__NEXT_DATA__" type="application/json"[^>]*>(.*?)</script>', re.S)
+
+
+def parse_episode_page(html: str, episode_id: str) -> dict:
+    """
+    从页面内嵌的 __NEXT_DATA__ JSON 中解析节目信息
+
+    Returns:
+        节目信息，包含 id/title/url/audio_url/duration/podcast/pub_date/size；
+        页面中没有可用的状态数据时返回 None
+    """
+    match = _NEXT_DATA_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        episode = json.loads(match.group(1))['props']['pageProps']['episode']
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    media = episode.get('media') or {}
+    audio_url = ((episode.get('enclosure') or {}).get('url')
+                 or (media.get('source') or {}).get('url'))
+    if not audio_url:
+        return None
+
+    return {
+        'id': episode_id,
+        'title': episode.get('title') or episode_id,
+        'url': f"https://www.xiaoyuzhoufm.com/episode/{episode_id}",
+        'audio_url': audio_url,
+        'duration': episode.get('duration'),
+        'podcast': (episode.get('podcast') or {}).get('title'),
+        'pub_date': episode.get('pubDate'),
+        'size': media.get('size'),
+    }
+
+
+def parse_episode_html(html: str, episode_id: str) -> dict:
+    """页面结构变化、没有状态数据时，用正则从 HTML 中提取标题和音频URL"""
+    # 提取标题
+    title_match = re.search(r'<title>(.*?)</title>', html)
+    title = title_match.group(1) if title_match else episode_id
+    # 清理小宇宙平台后缀："XXX - 播客名 | 小宇宙 - 听播客，上小宇宙"
+    title = re.sub(r'\s*[-|]\s*小宇宙.*$', '', title)
+
+    # 直接提取音频URL（小宇宙音频链接格式）
+    audio_patterns = [
+        r'(https://media\.xyzcdn\.net/[^\s"\'<>]+\.(?:m4a|mp3))',
+        r'(https://[^\s"\'<>]*\.xyzcdn\.net/[^\s"\'<>]+\.(?:m4a|mp3))',
+        r'"(https://[^\s"\'<>]+\.(?:m4a|mp3))"',
+    ]
+
+    audio_url = None
+    for pattern in audio_patterns:
+        audio_match = re.search(pattern, html)
+        if audio_match:
+            audio_url = audio_match.group(1)
+            audio_url = audio_url.replace('\\u002F', '/').replace('\\/', '/')
+            break
+
+    return {
+        'id': episode_id,
+        'title': title,
+        'url': f"https://www.xiaoyuzhoufm.com/episode/{episode_id}",
+        'audio_url': audio_url,
+        'duration': None,
+        'podcast': None,
+        'pub_date': None,
+        'size': None,
+    }
+
+
+def get_episode_info(episode_id: str, metadata_cache=None) -> dict:
+    """
+    获取播客节目信息，包括音频URL
+
+    Args:
+        episode_id: 节目 ID
+        metadata_cache: EpisodeMetadataCache 实例，未过期的记录直接返回，不再请求页面
+    """
+    if metadata_cache is not None:
+        cached = metadata_cache.get(episode_id)
+        if cached is not None:
+            print("✓ 使用本地缓存的节目信息")
+            return cached
+
     url = f"https://www.xiaoyuzhoufm.com/episode/{episode_id}"
 
     headers = {
@@ -90,314 +197,819 @@ def get_episode_info(episode_id: str) -> dict:
         ssl_context = get_ssl_context()
         with urllib.request.urlopen(req, context=ssl_context, timeout=30) as response:
             html = response.read().decode('utf-8')
-
-            # 提取标题
-            title_match = re.search(r'<title>(.*?)</title>', html)
-            title = title_match.group(1) if title_match else episode_id
-            # 清理小宇宙平台后缀："XXX - 播客名 | 小宇宙 - 听播客，上小宇宙"
-            title = re.sub(r'\s*[-|]\s*小宇宙.*$', '', title)
-
-            # 直接提取音频URL（小宇宙音频链接格式）
-            audio_patterns = [
-                r'(https://media\.xyzcdn\.net/[^\s"\'<>]+\.(?:m4a|mp3))',
-                r'(https://[^\s"\'<>]*\.xyzcdn\.net/[^\s"\'<>]+\.(?:m4a|mp3))',
-                r'"(https://[^\s"\'<>]+\.(?:m4a|mp3))"',
-            ]
-
-            audio_url = None
-            for pattern in audio_patterns:
-                audio_match = re.search(pattern, html)
-                if audio_match:
-                    audio_url = audio_match.group(1)
-                    audio_url = audio_url.replace('\\u002F', '/').replace('\\/', '/')
-                    break
-
-            return {
-                'id': episode_id,
-                'title': title,
-                'url': url,
-                'audio_url': audio_url
-            }
     except Exception as e:
         print(f"获取节目信息失败: {e}")
         return {
             'id': episode_id,
             'title': episode_id,
             'url': url,
-            'audio_url': None
+            'audio_url': None,
+            'duration': None,
+            'podcast': None,
+            'pub_date': None,
+            'size': None,
         }
 
+    info = parse_episode_page(html, episode_id) or parse_episode_html(html, episode_id)
+    if metadata_cache is not None and info['audio_url']:
+        metadata_cache.put(episode_id, info)
+    return info
 
-def download_audio_direct(audio_url: str, output_path: str, title: str = "音频") -> bool:
-    """直接下载音频文件，显示下载进度"""
-    print(f"正在下载: {title}")
-    print(f"音频链接: {audio_url}")
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': '*/*',
-        'Accept-Language': 'zh-CN,zh;q=0.9',
-        'Referer': 'https://www.xiaoyuzhoufm.com/',
-    }
+def download_audio_direct(audio_url: str, output_path: str, title: str = "音频",
+                          connections: int = 4) -> bool:
+    """多连接分段下载音频文件，支持断点续传，显示下载进度"""
+    from ranged_download import download_file
 
-    req = urllib.request.Request(audio_url, headers=headers)
+    print(f"正在下载: {title}")
+    print(f"音频链接: {audio_url}")
 
     try:
-        ssl_context = get_ssl_context()
-        with urllib.request.urlopen(req, context=ssl_context, timeout=60) as response:
-            total_size = response.getheader('Content-Length')
-            if total_size:
-                total_size = int(total_size)
-                size_mb = total_size / (1024 * 1024)
-                print(f"文件大小: {size_mb:.1f} MB")
-
-            downloaded = 0
-            chunk_size = 8192
-            last_percent = -1
-
-            with open(output_path, 'wb') as f:
-                while True:
-                    chunk = response.read(chunk_size)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    downloaded += len(chunk)
-
-                    if total_size:
-                        percent = int(downloaded * 100 / total_size)
-                        if percent != last_percent and percent % 10 == 0:
-                            print(f"下载进度: {percent}%")
-                            last_percent = percent
-
+        download_file(audio_url, output_path, headers=AUDIO_HEADERS,
+                      ssl_context=get_ssl_context(), connections=connections)
         print(f"✓ 下载完成: {output_path}")
         return True
 
     except Exception as e:
         print(f"下载失败: {e}")
+        print("(已下载的分段会保留，重新运行即可继续下载)")
         return False
 
 
-def smart_paragraph_split(segments: list, min_gap: float = 0.5) -> str:
+def download_audio_memory(audio_url: str, title: str = "音频", connections: int = 4,
+                          spill_mb: float = 256):
     """
-    根据语音停顿和标点分割段落，自动添加中文标点
+    多连接分段下载音频到内存，不写下载目录
 
-    Args:
-        segments: 带时间戳的片段列表
-        min_gap: 触发段落分割的最小停顿时间（秒）
+    超过 spill_mb 时溢出到临时目录（TMPDIR）下的匿名文件，关闭即删除。
+
+    Returns:
+        音频缓冲（可 seek 的二进制文件对象，可直接交给解码器）；下载失败时返回 None
+    """
+    from ranged_download import download_to_buffer
+
+    print(f"正在下载: {title}")
+    print(f"音频链接: {audio_url}")
+
+    try:
+        buffer = download_to_buffer(audio_url, headers=AUDIO_HEADERS, ssl_context=get_ssl_context(),
+                                    connections=connections, spill_bytes=int(spill_mb * 1024 * 1024))
+        print(f"✓ 下载完成（内存）")
+        return buffer
+
+    except Exception as e:
+        print(f"下载失败: {e}")
+        return None
+
+
+def save_audio_buffer(buffer, output_path):
+    """把内存中的音频原子写入文件"""
+    import shutil
+    import tempfile
+
+    output_path = Path(output_path)
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            buffer.seek(0)
+            shutil.copyfileobj(buffer, f)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    finally:
+        buffer.seek(0)
+
+
+def download_episode_audio(audio_url: str, audio_path, title: str, args):
+    """
+    下载节目音频
+
+    --in-memory 时下载到内存（指定 --keep-audio 时另存一份到 audio_path），否则下载到 audio_path。
 
     Returns:
-        分段后的文本
-    """
-    if not segments:
-        return ""
-
-    # 过滤掉无意义的短停顿和填充词，避免过度分段
-    filler_words = {'对吧', '是吧', '嗯', '啊', '哦', '那么', '然后', '其实', '当然', '就是说',
-                    '就是', '对吧', '好的', '好吧', '嗯嗯', '嗯好', '这个', '那个', '所以说'}
-
-    paragraphs = []
-    current_para = []
-    para_char_count = 0
-
-    for i, seg in enumerate(segments):
-        text = re.sub(r'\s+', '', seg['text'])  # 去除所有空白字符
-        if text in filler_words:
-            continue
-
-        current_para.append(text)
-        para_char_count += len(text)
-
-        if i < len(segments) - 1:
-            gap = segments[i + 1]['start'] - seg['end']
-            next_seg = segments[i + 1]['text'].strip()
-
-            # 检查是否需要分段
-            should_split = False
-            is_last_in_para = False
-
-            # 大停顿（>1秒）直接分段
-            if gap >= 1.0 and current_para:
-                should_split = True
-                is_last_in_para = True
-            # 句号/问号/叹号结尾 + 停顿≥0.3秒分段
-            elif ends_with_punct(text, ('。', '？', '！', '?', '!', '.', '」', '”')) and gap >= 0.3:
-                should_split = True
-                is_last_in_para = True
-            # 逗号/分号结尾 + 停顿≥0.5秒分段
-            elif ends_with_punct(text, ('，', ',', '；', ';')) and gap >= 0.5:
-                should_split = True
-                is_last_in_para = True
-            # 段落超过35个字符强制分段
-            elif para_char_count >= 35 and current_para:
-                should_split = True
-                is_last_in_para = True
-
-            if should_split and current_para:
-                # 给段落最后一个片段加标点（如果没有）
-                last_text = current_para[-1]
-                if last_text and not last_text[-1] in '。？！.?!"\'，,' :
-                    last_char = last_text[-1]
-                    if '\u4e00' <= last_char <= '\u9fff' or '\uac00' <= last_char <= '\ud7af':
-                        current_para[-1] = last_text + '，'
-
-                paragraphs.append(''.join(current_para))
-                current_para = []
-                para_char_count = 0
-
-    # 添加最后一段（加句号）
-    if current_para:
-        last_text = current_para[-1]
-        if last_text and not last_text[-1] in '。？！.?!"\'，,':
-            last_char = last_text[-1]
-            if '\u4e00' <= last_char <= '\u9fff' or '\uac00' <= last_char <= '\ud7af':
-                current_para[-1] = last_text + '。'
-        paragraphs.append(''.join(current_para))
-
-    return '\n\n'.join(paragraphs)
-
-
-def ends_with_punct(text: str, punctuations: tuple) -> bool:
-    """检查文本是否以指定标点结尾（去除尾随空格后）"""
-    stripped = text.strip()
-    return stripped.endswith(punctuations)
-
-
-def clean_repeated_text(segments: list) -> list:
-    """
-    清理转录结果中的重复片段
-    例如："围的围的围的围的" 会被合并为 "围的"
-    """
-    if not segments:
-        return segments
-
-    cleaned = []
-    for seg in segments:
-        text = seg['text']
-        # 检测并折叠连续重复模式（如 "围的围的围的围的"）
-        # 尝试匹配 2-5 字符的子串重复 3 次以上
-        for word_len in range(5, 1, -1):
-            pattern = r'(.{' + str(word_len) + r'})\1{3,}'
-            text = re.sub(pattern, r'\1', text)
-        cleaned.append({
-            'start': seg['start'],
-            'end': seg['end'],
-            'text': text
-        })
-    return cleaned
+        转录的输入：内存中的音频缓冲或音频文件路径；下载失败时返回 None
+    """
+    if not args.in_memory:
+        if not download_audio_direct(audio_url, str(audio_path), title, connections=args.connections):
+            return None
+        return str(audio_path)
+
+    buffer = download_audio_memory(audio_url, title, args.connections, args.spill_mb)
+    if buffer is not None and args.keep_audio:
+        save_audio_buffer(buffer, audio_path)
+        print(f"✓ 音频已另存: {audio_path}")
+    return buffer
+
+
+def audio_source(audio):
+    """交给解码器的输入：文件路径原样返回，内存中的音频先回到开头（每次使用都从头解码）"""
+    if hasattr(audio, 'seek'):
+        audio.seek(0)
+    return audio
+
+
+def audio_size(audio) -> int:
+    """音频文件或内存中音频的字节数"""
+    if hasattr(audio, 'seek'):
+        audio.seek(0, os.SEEK_END)
+        size = audio.tell()
+        audio.seek(0)
+        return size
+    return os.path.getsize(audio)
 
 
 def get_ssl_context():
     """获取 SSL 上下文，优先使用 certifi 的 CA bundle"""
     import ssl
-    import certifi
+    certifi = load('certifi')
     context = ssl.create_default_context(cafile=certifi.where())
     return context
 
 
-def convert_to_simplified_chinese(text: str) -> str:
-    """
-    将繁体中文转换为简体中文
-    如果 opencc 不可用，返回原文
-    """
+@functools.lru_cache(maxsize=1)
+def get_t2s_converter():
+    """创建并缓存繁体转简体转换器，opencc 不可用时返回 None"""
     try:
-        import opencc
-        converter = opencc.OpenCC('t2s')  # 繁体转简体
-        return converter.convert(text)
+        opencc = load('opencc')
+        return opencc.OpenCC('t2s')  # 繁体转简体
     except ImportError:
-        # 如果 opencc 不可用，返回原文
-        return text
+        return None
+
+
+# 后处理规则，预编译供 TranscriptPostProcessor 使用
+# (重复单元长度, 匹配 4 次以上重复的正则)，文本短于 4 倍单元长度时不可能匹配
+_REPEAT_PATTERNS = [(n, re.compile(r'(.{' + str(n) + r'})\1{3,}')) for n in range(5, 1, -1)]
+_WHITESPACE = re.compile(r'\s+')
+_FILLER_WORDS = frozenset({'对吧', '是吧', '嗯', '啊', '哦', '那么', '然后', '其实', '当然', '就是说',
+                           '就是', '好的', '好吧', '嗯嗯', '嗯好', '这个', '那个', '所以说'})
+_SENTENCE_END = ('。', '？', '！', '?', '!', '.', '」', '”')
+_CLAUSE_END = ('，', ',', '；', ';')
+_NO_TRAILING_PUNCT = '。？！.?!"\'，,'
 
 
-def transcribe_audio(audio_path: str, model_size: str = "base", language: str = "zh",
-                     output_path: str = None, device: str = None, title: str = None) -> str:
+def _needs_punct(text: str) -> bool:
+    """段落末尾是中日韩文字且没有标点时需要补标点"""
+    if not text or text[-1] in _NO_TRAILING_PUNCT:
+        return False
+    last_char = text[-1]
+    return '\u4e00' <= last_char <= '\u9fff' or '\uac00' <= last_char <= '\ud7af'
+
+
+def has_repeated_text(text: str) -> bool:
+    """文本是否含有后处理会折叠的连续重复（Whisper 幻觉的常见表现）"""
+    return any(len(text) >= 4 * word_len and pattern.search(text) for word_len, pattern in _REPEAT_PATTERNS)
+
+
+class TranscriptPostProcessor:
     """
-    使用 faster-whisper 转录音频
-    中文播客自动转换为简体中文输出
+    单遍流式后处理：去重复 → 繁转简 → 分段
 
-    Args:
-        audio_path: 音频文件路径
-        model_size: Whisper 模型大小
-        language: 语言代码
-        output_path: 输出文件路径
-        device: 计算设备
-        title: 节目标题（用于输出文件标题行）
+    - 去重复：2-5 个字的单元连续重复 4 次以上时折叠为一次（如 "围的围的围的围的" → "围的"）
+    - 分段：去掉填充词，按停顿（≥1 秒）、句末标点 + 停顿≥0.3 秒、逗号/分号 + 停顿≥0.5 秒、
+      段落超过 35 字分段，段末补中文标点
+    每个片段只处理一次，正则预编译、转换器只创建一次；与原来的三遍处理完全一致（见 bench_postprocess.py）。
+    片段逐个 feed()，段落一旦确定就返回，最后调用 finish() 取出最后一段。
     """
-    from faster_whisper import WhisperModel
 
-    # 自动检测设备
+    def __init__(self, simplify: bool = False):
+        converter = get_t2s_converter() if simplify else None
+        self._convert = converter.convert if converter is not None else None
+        self._para = []
+        self._char_count = 0
+        self._pending_end = None  # 上一个未判断分段的片段结束时间
+
+    def _clean(self, text: str) -> str:
+        for word_len, pattern in _REPEAT_PATTERNS:
+            if len(text) >= 4 * word_len:
+                text = pattern.sub(r'\1', text)
+        if self._convert is not None:
+            text = self._convert(text)
+        return _WHITESPACE.sub('', text)
+
+    def _flush(self, punct: str) -> str:
+        if _needs_punct(self._para[-1]):
+            self._para[-1] += punct
+        paragraph = ''.join(self._para)
+        self._para = []
+        self._char_count = 0
+        return paragraph
+
+    def feed(self, segment: dict) -> list:
+        """
+        处理一个片段
+
+        Returns:
+            因本片段到来而确定的段落（0 或 1 个）
+        """
+        paragraphs = []
+        if self._pending_end is not None:
+            gap = segment['start'] - self._pending_end
+            text = self._para[-1]
+            if (gap >= 1.0
+                    or (text.endswith(_SENTENCE_END) and gap >= 0.3)
+                    or (text.endswith(_CLAUSE_END) and gap >= 0.5)
+                    or self._char_count >= 35):
+                paragraphs.append(self._flush('，'))
+            self._pending_end = None
+
+        text = self._clean(segment['text'])
+        if text not in _FILLER_WORDS:
+            self._para.append(text)
+            self._char_count += len(text)
+            self._pending_end = segment['end']
+        return paragraphs
+
+    def finish(self) -> list:
+        """结束输入，返回最后一段（加句号）"""
+        self._pending_end = None
+        return [self._flush('。')] if self._para else []
+
+    def process(self, segments: list) -> str:
+        """处理全部片段，返回以空行分隔的段落文本"""
+        paragraphs = []
+        for segment in segments:
+            paragraphs.extend(self.feed(segment))
+        paragraphs.extend(self.finish())
+        return '\n\n'.join(paragraphs)
+
+
+# 已加载模型缓存，键为 (模型大小, 设备, 计算类型, 并发数)，同一进程内复用
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+# 常驻转录服务默认地址（见 transcribe_daemon.py）
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+
+# 解码参数（同时作为转录缓存键的一部分）
+DECODE_OPTIONS = {'beam_size': 5, 'condition_on_previous_text': True}
+
+# --batch-size auto 且没有自动调优档案时的批大小
+DEFAULT_BATCH_SIZE = 8
+
+# 访问本地服务时不走系统代理
+_local_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def decode_options(beam_size: int = None) -> dict:
+    """解码参数，beam_size 为 None 时使用默认值"""
+    options = dict(DECODE_OPTIONS)
+    if beam_size:
+        options['beam_size'] = beam_size
+    return options
+
+
+def resolve_device(device: str = None) -> str:
+    """解析计算设备，auto 时通过 ctranslate2（faster-whisper 的推理后端）检测 CUDA"""
     if device is None or device == "auto":
         try:
-            import torch
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+            ctranslate2 = load('ctranslate2')
+            return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
         except ImportError:
-            device = "cpu"
+            return "cpu"
+    return device
 
-    print(f"\n加载模型: {model_size}, 设备: {device}")
-    print("(首次使用某模型时会自动下载，请耐心等待...)")
 
-    # 加载模型
-    model = WhisperModel(model_size, device=device, compute_type="float16" if device == "cuda" else "int8")
+@functools.lru_cache(maxsize=None)
+def tuned_profile(device: str):
+    """本机的自动调优档案（见 autotune.py），没有档案或档案不是在该设备上校准的时返回 None"""
+    from autotune import load_profile
 
-    print("开始转录...")
+    return load_profile(device)
 
-    # 转录音频
-    segments, info = model.transcribe(audio_path, language=language, beam_size=5,
-                                      condition_on_previous_text=True)
 
+def default_compute_type(device: str) -> str:
+    """选择默认计算类型：优先使用自动调优档案，否则按设备选择"""
+    profile = tuned_profile(device)
+    if profile:
+        return profile['compute_type']
+    return "float16" if device == "cuda" else "int8"
+
+
+def resolve_batch_size(batch_size, device: str) -> int:
+    """解析批大小：auto 时使用自动调优档案校准出的批大小，没有档案时为 DEFAULT_BATCH_SIZE"""
+    if batch_size == 'auto':
+        profile = tuned_profile(device)
+        return profile.get('batch_size', DEFAULT_BATCH_SIZE) if profile else DEFAULT_BATCH_SIZE
+    return int(batch_size or 0)
+
+
+def load_model(model_size: str, device: str, compute_type: str = None, num_workers: int = 1):
+    """
+    加载 WhisperModel，同一进程内按 (模型大小, 设备, 计算类型, 并发数) 缓存复用
+
+    Args:
+        model_size: Whisper 模型大小
+        device: 计算设备（已解析，cpu/cuda）
+        compute_type: 计算类型，默认按设备选择
+        num_workers: 允许多少个线程同时调用该模型转录
+
+    CPU 线程数按自动调优档案的线程总数（cpu_threads × num_workers）平分给 num_workers 路；
+    没有档案或档案未指定线程数（如 CUDA 档案）时使用 faster-whisper 的默认值。
+    """
+    WhisperModel = load('faster_whisper').WhisperModel
+
+    compute_type = compute_type or default_compute_type(device)
+    from whisper_profile import profile_cpu_threads
+
+    cpu_threads = profile_cpu_threads(tuned_profile(device), num_workers)
+    key = (model_size, device, compute_type, num_workers)
+    with _MODEL_LOCK:
+        if key not in _MODEL_CACHE:
+            _MODEL_CACHE[key] = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                             cpu_threads=cpu_threads, num_workers=num_workers)
+    return _MODEL_CACHE[key]
+
+
+def run_inference(model, audio, language: str = "zh", resume_from: float = 0.0,
+                  initial_prompt: str = None, on_start=None, on_segment=None,
+                  window_seconds: float = None, beam_size: int = None, batch_size: int = 0) -> tuple:
+    """
+    对音频执行一次完整推理
+
+    Args:
+        model: WhisperModel
+        audio: 音频文件路径，或已解码的 16kHz PCM（如 PcmCache.load() 返回的内存映射）
+        language: 语言代码
+        resume_from: 从该时间（秒）开始解码，用于断点续转
+        initial_prompt: 续转时作为上文提示的已转录文本
+        on_start: 回调 on_start(音频信息)，开始解码前调用
+        on_segment: 回调 on_segment(片段)，每产生一个非空片段调用
+        window_seconds: 按该长度的窗口边解码边转录（见 windowed_transcribe.py），
+            内存占用与音频时长无关；None 表示整段交给模型
+        beam_size: 束搜索宽度，None 表示默认值
+        batch_size: 大于 1 时改用 faster-whisper 的 BatchedInferencePipeline：先用 VAD 切出语音片段，
+            再按该批大小成批解码，GPU 上吞吐量明显更高；批量解码的片段之间不传递上文，
+            文本与逐段解码略有差异（见 benchmark_transcription.py --batch-sizes）
+
+    Returns:
+        (片段列表, 音频信息)，片段为 {'start', 'end', 'text', 'avg_logprob', 'compression_ratio'}
+        （后两项供两遍转录挑出可疑片段，见 refine_transcribe.py），
+        音频信息为 {'language', 'language_probability', 'duration'}
+    """
+    options = decode_options(beam_size)
+    offset = 0.0
+    if batch_size > 1:
+        # 接口与 WhisperModel.transcribe() 相同，可直接替代模型（包括按窗口转录）
+        model = load('faster_whisper').BatchedInferencePipeline(model)
+        options['batch_size'] = batch_size
+
+    if window_seconds:
+        from windowed_transcribe import transcribe_windowed
+
+        segments, info = transcribe_windowed(model, audio, language, window_seconds,
+                                             decode_options=options, start_seconds=resume_from,
+                                             initial_prompt=initial_prompt)
+    elif batch_size > 1:
+        if resume_from > 0:
+            # 批量推理的 clip_timestamps 是语音区间而不是起点，续转时直接截掉已转录的部分
+            if not hasattr(audio, 'shape'):  # 文件路径或内存中的音频
+                audio = load('faster_whisper').decode_audio(audio if hasattr(audio, 'read') else str(audio))
+            offset = resume_from
+            audio = audio[int(resume_from * 16000):]
+            options['initial_prompt'] = initial_prompt
+        segments, info = model.transcribe(audio, language=language, **options)
+    else:
+        if resume_from > 0:
+            options['clip_timestamps'] = [resume_from]
+            options['initial_prompt'] = initial_prompt
+        segments, info = model.transcribe(audio, language=language, **options)
+
+    audio_info = {
+        'language': info.language,
+        'language_probability': info.language_probability,
+        'duration': info.duration + offset,
+    }
     print(f"检测到语言: {info.language}, 概率: {info.language_probability:.2f}")
-    print(f"音频时长: {info.duration:.1f} 秒 ({info.duration/60:.1f} 分钟)")
+    print(f"音频时长: {audio_info['duration']:.1f} 秒 ({audio_info['duration']/60:.1f} 分钟)")
+    if on_start:
+        on_start(audio_info)
 
-    # 收集所有文本
-    full_text = []
     segments_with_timestamps = []
     segment_count = 0
     for segment in segments:
         segment_count += 1
         text = segment.text.strip()
         if text:
-            full_text.append(text)
-            segments_with_timestamps.append({
-                'start': segment.start,
-                'end': segment.end,
-                'text': text
-            })
+            seg = {
+                'start': segment.start + offset,
+                'end': segment.end + offset,
+                'text': text,
+                'avg_logprob': round(segment.avg_logprob, 3),
+                'compression_ratio': round(segment.compression_ratio, 3),
+            }
+            segments_with_timestamps.append(seg)
+            if on_segment:
+                on_segment(seg)
 
         if segment_count % 50 == 0:
             print(f"已处理 {segment_count} 个片段...")
 
     print(f"✓ 转录完成，共 {segment_count} 个片段")
 
-    # 清理重复片段
-    segments_with_timestamps = clean_repeated_text(segments_with_timestamps)
+    audio_info['duration'] = info.duration + offset  # 窗口转录时解码结束才知道准确时长
+    return segments_with_timestamps, audio_info
 
-    # 如果检测到中文语言，转换为简体中文
-    detected_lang = info.language
-    if detected_lang in ('zh', 'chinese', 'yue'):  # zh=普通话, yue=粤语
-        print("检测到中文，转换为简体中文...")
-        # 同时转换带时间戳的文本
-        for seg in segments_with_timestamps:
-            seg['text'] = convert_to_simplified_chinese(seg['text'])
-        print("✓ 已转换为简体中文")
 
-    # 合并文本
-    final_text = ' '.join(seg['text'] for seg in segments_with_timestamps)
-    if detected_lang in ('zh', 'chinese', 'yue'):
-        final_text = convert_to_simplified_chinese(final_text)
+def run_journaled_inference(model, audio, language: str, output_path, model_size: str,
+                            title: str, audio_hash: str, params: dict, window_seconds: float = None,
+                            beam_size: int = None, batch_size: int = 0) -> tuple:
+    """
+    边转录边写日志和文字稿，支持断点续转
+
+    每个片段写入日志后才算提交；同一任务的日志存在时，从最后一个已提交片段的结束时间继续解码，
+    并把已提交片段重新写入文字稿。
+
+    Returns:
+        ((片段列表, 音频信息), 文字稿)
+    """
+    from transcript_journal import TranscriptJournal, journal_path_for
+
+    journal = TranscriptJournal(journal_path_for(output_path), audio_hash, params)
+    committed = journal.load()
+    resume_from = committed[-1]['end'] if committed else 0.0
+    initial_prompt = ' '.join(seg['text'] for seg in committed[-5:]) or None
+    if committed:
+        print(f"发现未完成的转录，从 {resume_from/60:.1f} 分钟处继续（已提交 {len(committed)} 个片段）")
+
+    writer = None
 
-    # 段落分割处理（根据停顿时间自动分段）
-    paragraph_text = smart_paragraph_split(segments_with_timestamps)
+    def on_start(audio_info):
+        nonlocal writer
+        writer = TranscriptWriter(output_path, title, model_size, audio_info)
+        for seg in committed:
+            writer.feed(seg)
 
-    # 构建输出
-    display_title = title if title else (output_path.stem if output_path else '播客文字稿')
+    def on_segment(seg):
+        journal.append(seg)
+        writer.feed(seg)
+
+    journal.open()
+    try:
+        segments, info = run_inference(model, audio, language, resume_from, initial_prompt,
+                                       on_start=on_start, on_segment=on_segment,
+                                       window_seconds=window_seconds, beam_size=beam_size,
+                                       batch_size=batch_size)
+    finally:
+        journal.close()
+
+    transcript = writer.finish()
+    print(f"\n✓ 文字稿已保存到: {output_path}")
+    journal.remove()
+    return (committed + segments, info), transcript
+
+
+def daemon_is_running(daemon_url: str, timeout: float = 0.5) -> bool:
+    """检查常驻转录服务是否在运行"""
+    try:
+        with _local_opener.open(f"{daemon_url.rstrip('/')}/health", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def transcribe_via_daemon(daemon_url: str, audio_path: str, model_size: str, language: str,
+                          device: str = None, compute_type: str = None, audio_hash: str = None,
+                          window_seconds: float = None, beam_size: int = None, batch_size: int = 0):
+    """
+    提交转录任务到常驻转录服务
+
+    附带音频哈希时，服务端直接用它查找 PCM 缓存，不必再读一遍音频文件。
+
+    Returns:
+        (片段列表, 音频信息)；服务不可用或任务失败时返回 None
+    """
+    if not daemon_is_running(daemon_url):
+        return None
+
+    payload = {
+        'audio_path': str(Path(audio_path).resolve()),
+        'model_size': model_size,
+        'language': language,
+        'device': device or 'auto',
+        'compute_type': compute_type,
+        'audio_hash': audio_hash,
+        'window_seconds': window_seconds,
+        'beam_size': beam_size,
+        'batch_size': batch_size,
+    }
+    req = urllib.request.Request(
+        f"{daemon_url.rstrip('/')}/transcribe",
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+
+    print(f"\n提交任务到常驻转录服务: {daemon_url}")
+    try:
+        with _local_opener.open(req) as response:
+            result = json.loads(response.read().decode('utf-8'))
+    except Exception as e:
+        print(f"常驻转录服务调用失败: {e}，改为本地加载模型")
+        return None
+
+    if 'error' in result:
+        print(f"常驻转录服务返回错误: {result['error']}，改为本地加载模型")
+        return None
+
+    info = result['info']
+    print(f"检测到语言: {info['language']}, 概率: {info['language_probability']:.2f}")
+    print(f"音频时长: {info['duration']:.1f} 秒 ({info['duration']/60:.1f} 分钟)")
+    print(f"✓ 转录完成，共 {len(result['segments'])} 个片段")
+    return result['segments'], info
+
+
+def inference_params(model_size: str, compute_type: str, language: str, chunk_seconds: float = None,
+                     window_seconds: float = None, beam_size: int = None, batch_size: int = 0) -> dict:
+    """影响推理结果的全部参数，用作转录缓存键"""
+    params = {
+        'model_size': model_size,
+        'compute_type': compute_type,
+        'language': language,
+        **decode_options(beam_size),
+    }
+    if chunk_seconds:
+        params['chunk_seconds'] = chunk_seconds
+    if window_seconds:
+        params['window_seconds'] = window_seconds
+    if batch_size > 1:
+        params['batch_size'] = batch_size
+    return params
+
+
+def record_stream_result(result: tuple, audio_path, audio_url: str, params: dict, model_size: str,
+                         language: str, beam_size: int = None, title: str = None, cache=None,
+                         fingerprints=None) -> str:
+    """
+    边下载边转录完成后补上普通流程的记录：计算音频哈希，写入转录缓存（并记下音频链接对应的哈希）和指纹索引
+
+    写入失败（如磁盘已满）只打印提示，不影响已完成的转录。
+
+    Returns:
+        音频哈希
+    """
+    from audio_hash import hash_audio
+
+    with span('hash') as record:
+        audio_hash = hash_audio(str(audio_path))
+        record['bytes'] = os.path.getsize(audio_path)
+
+    if cache is not None:
+        try:
+            cache.put(cache.make_key(audio_hash, params), *result, params)
+            cache.remember_source(audio_url, audio_hash)
+        except OSError as e:
+            print(f"写入转录缓存失败: {e}")
+
+    if fingerprints is not None:
+        from audio_fingerprint import compute_fingerprint, fingerprint_params
+
+        with span('fingerprint'):
+            fingerprint = compute_fingerprint(str(audio_path))
+        try:
+            fingerprints.add(audio_hash, fingerprint, *result, model_size, title or Path(audio_path).name,
+                             fingerprint_params(language, decode_options(beam_size), result[1]['language']))
+        except OSError as e:
+            print(f"写入指纹索引失败: {e}")
+    return audio_hash
+
+
+def refine_result(result: tuple, audio_path: str, refine_model: str, device: str, params: dict,
+                  audio_hash: str = None, cache=None, pcm_cache=None, num_workers: int = 1,
+                  logprob_threshold: float = LOGPROB_THRESHOLD,
+                  compression_threshold: float = COMPRESSION_RATIO_THRESHOLD) -> tuple:
+    """
+    两遍转录的第二遍：用大模型重转第一遍结果中的可疑片段（见 refine_transcribe.py）
+
+    精修结果按第一遍参数加上精修模型和阈值写入转录缓存，命中时跳过第二遍。
+
+    Args:
+        result: 第一遍的 (片段列表, 音频信息)
+        audio_path: 音频文件路径，或内存中的音频
+        refine_model: 第二遍使用的模型大小
+        device: 计算设备（已解析）
+        params: 第一遍的推理参数（见 inference_params()）
+        audio_hash: 音频内容哈希，使用缓存时必需
+        cache: TranscriptCache 实例
+        pcm_cache: PcmCache 实例，从中读取区间的 PCM
+        num_workers: 本地模型允许同时转录的线程数
+        logprob_threshold: avg_logprob 低于该值的片段重转
+        compression_threshold: compression_ratio 高于该值的片段重转
+
+    Returns:
+        精修后的 (片段列表, 音频信息)
+    """
+    from refine_transcribe import refine_segments
+
+    compute_type = default_compute_type(device)
+    refine_params = {**params, 'refine_model': refine_model, 'refine_compute_type': compute_type,
+                     'refine_logprob': logprob_threshold, 'refine_compression': compression_threshold}
+    if cache is not None:
+        cache_key = cache.make_key(audio_hash, refine_params)
+        refined = cache.get(cache_key)
+        if refined is not None:
+            print(f"✓ 命中精修缓存（模型 {refine_model}），跳过第二遍")
+            return refined
+
+    segments, info = result
+    print(f"\n第二遍精修: 模型 {refine_model}, 设备: {device}")
+    model = load_model(refine_model, device, compute_type, num_workers)
+    audio = pcm_cache.load(audio_path, audio_hash) if pcm_cache is not None else audio_source(audio_path)
+    started = time.time()
+    refined, stats = refine_segments(model, audio, segments, info['language'], decode_options(params['beam_size']),
+                                     has_repeated_text, logprob_threshold, compression_threshold,
+                                     duration=info['duration'])
+    share = stats['refined_seconds'] / info['duration'] * 100 if info['duration'] else 0
+    print(f"✓ 精修完成: {stats['flagged']}/{len(segments)} 个可疑片段，{stats['spans']} 个区间，"
+          f"重转 {stats['refined_seconds']:.0f} 秒（全长的 {share:.1f}%），耗时 {time.time() - started:.1f} 秒")
+
+    if cache is not None:
+        try:
+            cache.put(cache_key, refined, info, refine_params)
+        except OSError as e:
+            print(f"写入转录缓存失败: {e}")
+    return refined, info
+
+
+def transcribe_audio(audio_path, model_size: str = "base", language: str = "zh",
+                     output_path: str = None, device: str = None, title: str = None,
+                     daemon_url: str = None, workers: int = 1, chunk_minutes: float = 10,
+                     cache=None, num_workers: int = 1, journal: bool = True, pcm_cache=None,
+                     window_minutes: float = None, refine_model: str = None,
+                     refine_logprob: float = LOGPROB_THRESHOLD,
+                     refine_compression: float = COMPRESSION_RATIO_THRESHOLD, fingerprints=None,
+                     beam_size: int = None, batch_size=0) -> str:
+    """
+    使用 faster-whisper 转录音频
+    中文播客自动转换为简体中文输出
+
+    Args:
+        audio_path: 音频文件路径，或内存中的音频（download_audio_memory() 返回的缓冲，不经过下载目录）
+        model_size: Whisper 模型大小
+        language: 语言代码
+        output_path: 输出文件路径
+        device: 计算设备
+        title: 节目标题（用于输出文件标题行）
+        daemon_url: 常驻转录服务地址，服务在运行时提交任务，否则本地加载模型（内存中的音频不提交）
+        workers: 并行转录进程数，大于 1 时在静音处分块多进程转录
+        chunk_minutes: 分块转录时每块的目标时长（分钟）
+        cache: TranscriptCache 实例，命中时跳过推理
+        num_workers: 本地模型允许同时转录的线程数（批量模式下多个节目共享一个模型）
+        journal: 本地逐段转录时是否写日志、增量输出文字稿，崩溃后可从断点继续
+        pcm_cache: PcmCache 实例，本地推理时从中读取解码后的 PCM，不再重复解码
+        window_minutes: 非分块转录时按该长度的窗口边解码边转录，内存占用与音频时长无关
+        refine_model: 两遍转录：第一遍结果中的可疑片段再用该模型重转，None 表示只转一遍
+        refine_logprob: avg_logprob 低于该值的片段重转
+        refine_compression: compression_ratio 高于该值的片段重转
+        fingerprints: FingerprintIndex 实例，推理前查找重新编码过的同一内容（如另一平台的上传）并复用其转录，
+            推理后把本次结果加入索引
+        beam_size: 束搜索宽度，None 表示默认值（5）
+        batch_size: 大于 1 时本地推理改用 VAD 分段 + 批量解码（分块并行转录不支持），auto 表示按自动调优档案
+    """
+    device = resolve_device(device)
+    compute_type = default_compute_type(device)
+    chunk_seconds = chunk_minutes * 60 if workers > 1 else None
+    window_seconds = window_minutes * 60 if window_minutes and workers <= 1 else None
+    batch_size = resolve_batch_size(batch_size, device) if workers <= 1 else 0
+
+    journal = journal and output_path is not None
+    params = inference_params(model_size, compute_type, language, chunk_seconds, window_seconds,
+                              beam_size, batch_size)
+    audio_hash = None
+    if cache is not None or journal or pcm_cache is not None or fingerprints is not None:
+        from audio_hash import hash_audio
+
+        with span('hash') as record:
+            audio_hash = hash_audio(audio_path)
+            record['bytes'] = audio_size(audio_path)
+
+    def load_audio():
+        """本地推理的输入：PCM 缓存的内存映射，或音频文件路径 / 内存中的音频"""
+        if pcm_cache is None:
+            return audio_source(audio_path)
+        with span('decode') as record:
+            pcm = pcm_cache.load(audio_path, audio_hash)
+            record['bytes'] = pcm.nbytes
+        return pcm
+
+    result = None
+    transcript = None
+    if cache is not None:
+        cache_key = cache.make_key(audio_hash, params)
+        result = cache.get(cache_key)
+        if result is not None:
+            print(f"\n✓ 命中转录缓存（模型 {model_size}），跳过推理")
+    from_cache = result is not None
+
+    fingerprint = match = None
+    if not from_cache and fingerprints is not None:
+        from audio_fingerprint import fingerprint_params
+
+        audio = load_audio()
+        with span('fingerprint'):
+            fingerprint, match = fingerprints.lookup(audio, audio_hash, model_size,
+                                                     fingerprint_params(language, decode_options(beam_size)))
+        if match is not None:
+            shift = match.get('offset', 0.0)
+            print(f"\n✓ 指纹命中：与已转录的 {match['source']} 为同一内容"
+                  f"（BER {match['ber']:.3f}，模型 {match['model_size']}），复用其转录")
+            result = ([{**seg, 'start': max(0.0, seg['start'] - shift), 'end': max(0.0, seg['end'] - shift)}
+                       for seg in match['segments']], match['info'])
+
+    if result is None and workers > 1:
+        from parallel_transcribe import run_parallel_inference
+
+        print(f"\n分块并行转录: 模型 {model_size}, 设备: {device}")
+        audio = load_audio()
+        with span('inference', model=model_size, backend='parallel'):
+            result = run_parallel_inference(audio, model_size, language, device, compute_type,
+                                            workers, chunk_seconds=chunk_seconds,
+                                            decode_options=decode_options(beam_size))
+    elif result is None and daemon_url and not hasattr(audio_path, 'read'):  # 常驻服务按路径读取音频
+        with span('inference', model=model_size, backend='daemon'):
+            result = transcribe_via_daemon(daemon_url, audio_path, model_size, language, device,
+                                           compute_type, audio_hash, window_seconds, beam_size, batch_size)
+
+    if result is None:
+        print(f"\n加载模型: {model_size}, 设备: {device}")
+        print("(首次使用某模型时会自动下载，请耐心等待...)")
+        with span('model_load', model=model_size):
+            model = load_model(model_size, device, compute_type, num_workers)
+        audio = load_audio()
+
+        print("开始转录...")
+        with span('inference', model=model_size, backend='batched' if batch_size > 1 else 'local'):
+            if journal:
+                result, transcript = run_journaled_inference(model, audio, language, output_path,
+                                                             model_size, title, audio_hash, params,
+                                                             window_seconds, beam_size, batch_size)
+            else:
+                result = run_inference(model, audio, language, window_seconds=window_seconds,
+                                       beam_size=beam_size, batch_size=batch_size)
+
+    if cache is not None and not from_cache:
+        try:
+            cache.put(cache_key, *result, params)
+        except OSError as e:
+            print(f"写入转录缓存失败: {e}")
+
+    if refine_model:
+        with span('refine', model=refine_model):
+            result = refine_result(result, audio_path, refine_model, device, params, audio_hash, cache,
+                                   pcm_cache, num_workers, refine_logprob, refine_compression)
+        transcript = None  # 第一遍增量写出的文字稿由精修结果整体覆盖
+
+    if fingerprint is not None and match is None:
+        try:
+            fingerprints.add(audio_hash, fingerprint, *result, model_size, title or Path(audio_path).name,
+                             fingerprint_params(language, decode_options(beam_size), result[1]['language']))
+        except OSError as e:
+            print(f"写入指纹索引失败: {e}")
+
+    if transcript is not None:
+        return transcript
+    with span('postprocess') as record:
+        transcript = build_transcript(result, f"{model_size} + {refine_model}" if refine_model else model_size,
+                                      output_path, title)
+        record['bytes'] = len(transcript.encode('utf-8'))
+    return transcript
+
+
+def transcript_header(title: str, model_size: str, duration: float, output_path=None) -> str:
+    """文字稿的标题和转录信息部分"""
+    display_title = title if title else (Path(output_path).stem if output_path else '播客文字稿')
     transcript_lines = []
     transcript_lines.append(f"# {display_title}\n\n")
-    transcript_lines.append(f"**转录信息**: 模型 {model_size} | 时长 {info.duration/60:.1f} 分钟\n\n")
+    transcript_lines.append(f"**转录信息**: 模型 {model_size} | 时长 {duration/60:.1f} 分钟\n\n")
     transcript_lines.append(f"---\n\n")
+    return "".join(transcript_lines)
+
+
+def is_chinese(language: str) -> bool:
+    """检测到的语言是否为中文（需要转换为简体）"""
+    return language in ('zh', 'chinese', 'yue')  # zh=普通话, yue=粤语
+
 
-    # 段落分割处理（根据停顿时间自动分段）
-    transcript_lines.append(paragraph_text)
+def build_transcript(result: tuple, model_size: str, output_path=None, title: str = None) -> str:
+    """
+    对推理结果做后处理并生成 Markdown 文字稿
+
+    Args:
+        result: (片段列表, 音频信息)，见 run_inference()
+        model_size: Whisper 模型大小（写入转录信息）
+        output_path: 输出文件路径
+        title: 节目标题（用于输出文件标题行）
+    """
+    segments_with_timestamps, info = result
+
+    # 去重复、繁转简（中文）、分段一遍完成
+    simplify = is_chinese(info['language'])
+    if simplify:
+        print("检测到中文，转换为简体中文...")
+    paragraph_text = TranscriptPostProcessor(simplify=simplify).process(segments_with_timestamps)
+    if simplify:
+        print("✓ 已转换为简体中文")
 
-    transcript = "".join(transcript_lines)
+    transcript = transcript_header(title, model_size, info['duration'], output_path) + paragraph_text
 
     # 保存到文件
     if output_path:
@@ -408,6 +1020,205 @@ def transcribe_audio(audio_path: str, model_size: str = "base", language: str =
     return transcript
 
 
+class TranscriptWriter:
+    """
+    增量写文字稿：片段逐个 feed()，段落一确定就追加写入输出文件并刷新，
+    finish() 后文件内容与 build_transcript() 的结果完全相同。
+    """
+
+    def __init__(self, output_path, title: str, model_size: str, info: dict):
+        simplify = is_chinese(info['language'])
+        if simplify:
+            print("检测到中文，输出简体中文")
+        self._processor = TranscriptPostProcessor(simplify=simplify)
+        self._parts = [transcript_header(title, model_size, info['duration'], output_path)]
+        self._paragraph_count = 0
+        self._file = open(output_path, 'w', encoding='utf-8')
+        self._file.write(self._parts[0])
+        self._file.flush()
+
+    def _write(self, paragraphs: list):
+        for paragraph in paragraphs:
+            text = paragraph if self._paragraph_count == 0 else '\n\n' + paragraph
+            self._paragraph_count += 1
+            self._parts.append(text)
+            self._file.write(text)
+        if paragraphs:
+            self._file.flush()
+
+    def feed(self, segment: dict):
+        self._write(self._processor.feed(segment))
+
+    def finish(self) -> str:
+        """写入最后一段并关闭文件，返回完整文字稿"""
+        self._write(self._processor.finish())
+        self._file.close()
+        return "".join(self._parts)
+
+
+# 音频和文字稿默认保存目录
+AUDIO_DIR = Path.home() / "Downloads" / "podcast_transcript"
+
+
+def transcript_filename(title: str, episode_id: str = None) -> str:
+    """根据节目标题生成文字稿文件名；批量模式传入节目 ID，同名节目不会写到同一个文件"""
+    safe_title = re.sub(r'[<>:"/\\|?*]', '', title)[:50]
+    if episode_id:
+        return f"{safe_title}_{episode_id}_文字稿.md"
+    return f"{safe_title}_文字稿.md"
+
+
+def read_batch_urls(path: str) -> list:
+    """读取批量链接文件：每行一个链接，忽略空行和 # 开头的注释"""
+    urls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+    return urls
+
+
+def run_batch(urls: list, args, cache=None, metadata_cache=None) -> list:
+    """
+    批量处理多期节目
+
+    获取节目信息和下载音频在网络线程池中进行（--net-concurrency），
+    下载完成的节目交给转录线程池（--cpu-concurrency），所有节目共享同一个已加载的模型。
+    下载领先转录最多 --prefetch 期：已下载或正在转录的节目达到 cpu_concurrency + prefetch 期时，
+    新的下载等待转录完成（--in-memory 时内存中同时最多只有这么多期音频）。
+    文字稿文件名带节目 ID，同名节目互不覆盖。
+
+    Returns:
+        每期节目的处理记录（状态、输出路径、各阶段耗时）
+    """
+    output_dir = Path(args.output) if args.output else AUDIO_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+
+    records = [{'url': url, 'status': 'pending', 'timings': {}} for url in urls]
+
+    pcm_cache = None
+    if not args.no_pcm_cache and not args.audio_only and not args.in_memory:
+        from pcm_cache import PcmCache
+
+        pcm_cache = PcmCache()
+
+    # 下载得到的转录输入（内存缓冲或文件路径），按记录对象区分，不写入汇总
+    audio_inputs = {}
+    # 持有音频（已下载待转录或正在转录）的节目数上限，转录结束（或下载失败）时归还
+    audio_slots = threading.BoundedSemaphore(max(1, args.cpu_concurrency) + max(0, args.prefetch))
+
+    fingerprints = None
+    if not args.no_fingerprint and not args.audio_only:
+        from audio_fingerprint import FingerprintIndex
+
+        fingerprints = FingerprintIndex()
+
+    def fetch(record):
+        """网络阶段：获取节目信息并下载音频"""
+        started = time.time()
+        try:
+            record['episode_id'] = extract_episode_id(record['url'])
+            with span('metadata', episode=record['episode_id']):
+                info = get_episode_info(record['episode_id'], metadata_cache)
+            record['title'] = info['title']
+            record['duration'] = info.get('duration')
+            record['timings']['metadata'] = round(time.time() - started, 3)
+            if not info['audio_url']:
+                raise ValueError("无法从页面提取音频链接")
+
+            audio_path = AUDIO_DIR / f"{record['episode_id']}.m4a"
+            if not args.audio_only:
+                audio_slots.acquire()
+            download_started = time.time()
+            try:
+                with span('download', episode=record['episode_id']) as metrics:
+                    audio = download_episode_audio(info['audio_url'], audio_path, info['title'], args)
+                    if audio is None:
+                        raise IOError("音频下载失败")
+                    metrics['bytes'] = audio_size(audio)
+            except BaseException:
+                if not args.audio_only:
+                    audio_slots.release()
+                raise
+            record['timings']['download'] = round(time.time() - download_started, 3)
+            audio_inputs[id(record)] = audio
+            if not args.in_memory or args.keep_audio:
+                record['audio_path'] = str(audio_path)
+            record['status'] = 'downloaded'
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+        record['timings']['total'] = round(time.time() - started, 3)
+        return record
+
+    def transcribe(record):
+        """转录阶段"""
+        started = time.time()
+        audio = audio_inputs.pop(id(record))
+        output_path = output_dir / transcript_filename(record['title'], record['episode_id'])
+        try:
+            transcribe_audio(
+                audio_path=audio,
+                model_size=args.model,
+                language=args.language,
+                output_path=output_path,
+                device=args.device,
+                title=record['title'],
+                daemon_url=None if args.no_daemon else args.daemon_url,
+                workers=args.workers,
+                chunk_minutes=args.chunk_minutes,
+                cache=cache,
+                num_workers=args.cpu_concurrency,
+                journal=not args.no_journal,
+                pcm_cache=pcm_cache,
+                window_minutes=args.window_minutes,
+                beam_size=args.beam_size,
+                batch_size=args.batch_size,
+                refine_model=args.refine_model,
+                refine_logprob=args.refine_logprob,
+                refine_compression=args.refine_compression,
+                fingerprints=fingerprints
+            )
+            record['output'] = str(output_path)
+            record['status'] = 'ok'
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+        finally:
+            if hasattr(audio, 'close'):
+                audio.close()
+            elif not args.keep_audio and Path(audio).exists():
+                Path(audio).unlink()
+                record.pop('audio_path')
+            audio_slots.release()
+        record['timings']['transcribe'] = round(time.time() - started, 3)
+        record['timings']['total'] = round(record['timings']['total'] + time.time() - started, 3)
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, args.net_concurrency)) as net_pool, \
+            ThreadPoolExecutor(max_workers=max(1, args.cpu_concurrency)) as cpu_pool:
+        transcribe_futures = []
+        for future in as_completed([net_pool.submit(fetch, record) for record in records]):
+            record = future.result()
+            if record['status'] == 'failed':
+                print(f"✗ {record['url']}: {record['error']}")
+            elif args.audio_only:
+                record['status'] = 'ok'
+                print(f"✓ 音频已保存到: {record['audio_path']}")
+            else:
+                transcribe_futures.append(cpu_pool.submit(transcribe, record))
+        for future in as_completed(transcribe_futures):
+            record = future.result()
+            if record['status'] == 'ok':
+                print(f"✓ {record['title']}: {record['output']}")
+            else:
+                print(f"✗ {record['title']}: {record['error']}")
+
+    return records
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="小宇宙播客转录工具 - 将播客音频转换为文字稿",
@@ -417,10 +1228,11 @@ def main():
   %(prog)s "https://www.xiaoyuzhoufm.com/episode/xxx"
   %(prog)s "https://www.xiaoyuzhoufm.com/episode/xxx" -m small -o 输出.md
   %(prog)s "https://www.xiaoyuzhoufm.com/episode/xxx" --audio-path 本地音频.m4a
+  %(prog)s --batch 链接列表.txt --net-concurrency 4 --cpu-concurrency 2
         """
     )
-    parser.add_argument("url", help="小宇宙播客链接")
-    parser.add_argument("-o", "--output", help="输出文件路径", default=None)
+    parser.add_argument("url", help="小宇宙播客链接（可以给出多个，按批量模式处理）", nargs='*')
+    parser.add_argument("-o", "--output", help="输出文件路径（批量模式下为输出目录）", default=None)
     parser.add_argument("-m", "--model", help="Whisper模型大小 (默认: base)",
                         default="base", choices=["tiny", "base", "small", "medium", "large", "large-v2", "large-v3"])
     parser.add_argument("-l", "--language", help="语言代码 (默认: zh)", default="zh")
@@ -428,23 +1240,146 @@ def main():
     parser.add_argument("--keep-audio", help="保留下载的音频文件", action="store_true")
     parser.add_argument("--audio-only", help="仅下载音频，不转录", action="store_true")
     parser.add_argument("--audio-path", help="使用本地音频文件，跳过下载")
+    parser.add_argument("--connections", help="下载音频的并行连接数 (默认: 4)", type=int, default=4)
+    parser.add_argument("--in-memory",
+                        help="音频下载到内存直接交给解码器，不写下载目录，也不写 PCM 缓存（--keep-audio 时仍另存音频文件）",
+                        action="store_true")
+    parser.add_argument("--spill-mb",
+                        help="--in-memory 时内存中最多保留的音频大小，超过时溢出到临时目录 TMPDIR，单位 MB (默认: 256)",
+                        type=float, default=256)
     parser.add_argument("--no-install", help="跳过自动安装依赖", action="store_true")
+    parser.add_argument("--profile-startup", help="退出时打印各模块的导入耗时", action="store_true")
+    parser.add_argument("--metrics-file",
+                        help="把各阶段的耗时、CPU 时间和字节数按 JSON lines 追加到该文件 (默认: 环境变量 SKILL_METRICS_FILE)")
+    parser.add_argument("--metrics-prom",
+                        help="同时把各阶段累计值写成 Prometheus textfile (默认: 环境变量 SKILL_METRICS_PROM)")
+    parser.add_argument("--daemon-url", help=f"常驻转录服务地址 (默认: {DEFAULT_DAEMON_URL})",
+                        default=os.environ.get('PODCAST_TRANSCRIBER_DAEMON', DEFAULT_DAEMON_URL))
+    parser.add_argument("--no-daemon", help="不使用常驻转录服务，始终本地加载模型", action="store_true")
+    parser.add_argument("--no-cache", help="不使用转录缓存", action="store_true")
+    parser.add_argument("--no-pcm-cache", help="不缓存解码后的 PCM（默认缓存到 ~/.cache/whisper-pcm，换模型重跑时免解码）",
+                        action="store_true")
+    parser.add_argument("--no-fingerprint",
+                        help="不做音频指纹去重（默认转录前在 ~/.cache/whisper-fingerprints 查找重新编码过的同一内容并复用其转录）",
+                        action="store_true")
+    parser.add_argument("--no-journal", help="不写转录日志（默认边转录边写日志和文字稿，崩溃后可续转）",
+                        action="store_true")
+    parser.add_argument("--cache-dir", help="转录缓存目录 (默认: ~/.cache/xiaoyuzhou-transcriber/transcripts)",
+                        default=None)
+    parser.add_argument("--metadata-ttl", help="节目信息缓存有效期，单位小时，0 表示不缓存 (默认: 24)",
+                        type=float, default=24)
+    parser.add_argument("--cache-size-mb", help="转录缓存大小上限，单位 MB (默认: 500)",
+                        type=float, default=500)
+    parser.add_argument("-j", "--workers", help="并行转录进程数，大于 1 时分块多进程转录 (默认: 1)",
+                        type=int, default=1)
+    parser.add_argument("--stream", help="边下载边转录（总是分块转录，-j 1 时也是；结果与同样 -j / --chunk-minutes "
+                                         "的分块转录一致，与默认的整段转录不同）",
+                        action="store_true")
+    parser.add_argument("--chunk-minutes", help="分块转录时每块的目标时长，单位分钟 (默认: 10)",
+                        type=float, default=10)
+    parser.add_argument("--window-minutes",
+                        help="按该长度的窗口边解码边转录，内存占用与音频时长无关，适合数小时的长音频 (默认: 0，不分窗)",
+                        type=float, default=0)
+    parser.add_argument("--beam-size", help=f"束搜索宽度 (默认: {DECODE_OPTIONS['beam_size']})", type=int, default=None)
+    parser.add_argument("--batch-size",
+                        help="大于 1 时先用 VAD 切出语音片段再按该批大小批量解码（GPU 上吞吐量更高），"
+                             f"auto 表示使用自动调优档案的批大小（没有档案时为 {DEFAULT_BATCH_SIZE}）(默认: 0，逐段解码)",
+                        type=lambda value: value if value == 'auto' else int(value), default=0)
+    parser.add_argument("--refine-model",
+                        help="两遍转录：先用 -m 的模型转录全程，再用该模型只重转低置信度或有重复幻觉的片段 (如 large-v3)",
+                        default=None, choices=["tiny", "base", "small", "medium", "large", "large-v2", "large-v3"])
+    parser.add_argument("--refine-logprob", help=f"两遍转录时 avg_logprob 低于该值的片段重转 (默认: {LOGPROB_THRESHOLD})",
+                        type=float, default=LOGPROB_THRESHOLD)
+    parser.add_argument("--refine-compression",
+                        help=f"两遍转录时 compression_ratio 高于该值的片段重转 (默认: {COMPRESSION_RATIO_THRESHOLD})",
+                        type=float, default=COMPRESSION_RATIO_THRESHOLD)
+    parser.add_argument("--batch", help="批量模式：从文件读取链接，每行一个")
+    parser.add_argument("--net-concurrency", help="批量模式下同时获取信息/下载的节目数 (默认: 4)",
+                        type=int, default=4)
+    parser.add_argument("--prefetch",
+                        help="批量模式下下载最多领先转录的节目数，限制同时持有的音频（--in-memory 时即内存占用）(默认: 2)",
+                        type=int, default=2)
+    parser.add_argument("--cpu-concurrency",
+                        help="批量模式下同时转录的节目数 (默认: 自动调优档案中的 num_workers，没有档案时为 1)",
+                        type=int, default=None)
+    parser.add_argument("--summary", help="批量模式的 JSON 汇总文件路径 (默认: 保存目录下 batch_summary_<时间>.json)")
 
     args = parser.parse_args()
 
+    configure_metrics('transcribe_podcast', args.metrics_file, args.metrics_prom)
+    if args.profile_startup:
+        enable_profile()
+
+    urls = list(args.url)
+    if args.batch:
+        urls.extend(read_batch_urls(args.batch))
+    urls = list(dict.fromkeys(urls))  # 重复的链接只处理一次
+    if not urls:
+        parser.error("请提供小宇宙播客链接或使用 --batch 指定链接文件")
+    batch_mode = bool(args.batch) or len(urls) > 1
+    if batch_mode and args.stream:
+        parser.error("批量模式不支持 --stream")
+    if batch_mode and args.audio_path:
+        parser.error("批量模式不支持 --audio-path（本地音频只能对应一期节目）")
+    if args.in_memory and args.stream:
+        parser.error("--in-memory 不能与 --stream 同时使用（边下载边转录会把音频写入下载目录）")
+    args.in_memory = args.in_memory and not args.audio_only  # 仅下载音频时总是保存到文件
+
     # 设置环境变量解决 OpenMP 库冲突
     os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 
     # 检查并安装依赖
     if not args.no_install:
-        if not check_and_install_dependencies():
+        if not check_and_install_dependencies(transcription=not args.audio_only):
             sys.exit(1)
 
+    # 节目信息缓存
+    metadata_cache = None
+    if args.metadata_ttl > 0:
+        from metadata_cache import EpisodeMetadataCache
+
+        metadata_cache = EpisodeMetadataCache(ttl_hours=args.metadata_ttl)
+
+    # 批量模式
+    if batch_mode:
+        cache = None
+        if not args.no_cache:
+            from transcript_cache import DEFAULT_CACHE_DIR, TranscriptCache
+
+            cache = TranscriptCache(args.cache_dir or DEFAULT_CACHE_DIR, args.cache_size_mb)
+
+        if args.cpu_concurrency is None:
+            profile = None if args.audio_only else tuned_profile(resolve_device(args.device))
+            args.cpu_concurrency = profile['num_workers'] if profile else 1
+
+        print(f"批量模式: 共 {len(urls)} 期节目")
+        started = time.time()
+        records = run_batch(urls, args, cache, metadata_cache)
+        succeeded = sum(1 for record in records if record['status'] == 'ok')
+
+        summary_path = Path(args.summary) if args.summary else \
+            AUDIO_DIR / f"batch_summary_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'total': len(records),
+                'success': succeeded,
+                'failed': len(records) - succeeded,
+                'elapsed': round(time.time() - started, 3),
+                'episodes': records,
+            }, f, ensure_ascii=False, indent=2)
+
+        print(f"\n{'='*50}")
+        print(f"批量处理完成: 成功 {succeeded}/{len(records)}")
+        print(f"汇总: {summary_path}")
+        print(f"{'='*50}")
+        sys.exit(0 if succeeded == len(records) else 1)
+
     # 验证URL并提取episode ID
     episode_id = None
     if not args.audio_path:
         try:
-            episode_id = extract_episode_id(args.url)
+            episode_id = extract_episode_id(urls[0])
             print(f"✓ Episode ID: {episode_id}")
         except ValueError as e:
             print(f"错误: {e}")
@@ -461,6 +1396,7 @@ def main():
 
     # 确定音频路径
     episode_title = None
+    audio = None  # 下载得到的转录输入：内存中的音频或文件路径
     if args.audio_path:
         audio_path = Path(args.audio_path)
         if not audio_path.exists():
@@ -470,8 +1406,13 @@ def main():
     else:
         # 获取节目信息并提取音频URL
         print(f"\n正在获取节目信息...")
-        info = get_episode_info(episode_id)
+        with span('metadata', episode=episode_id):
+            info = get_episode_info(episode_id, metadata_cache)
         print(f"节目标题: {info['title']}")
+        if info.get('podcast'):
+            print(f"播客: {info['podcast']}")
+        if info.get('duration'):
+            print(f"节目时长: {info['duration'] / 60:.1f} 分钟")
         episode_title = info['title']
 
         if not info['audio_url']:
@@ -480,36 +1421,115 @@ def main():
             sys.exit(1)
 
         # 创建输出目录
-        audio_dir = Path.home() / "Downloads" / "podcast_transcript"
+        audio_dir = AUDIO_DIR
         audio_dir.mkdir(parents=True, exist_ok=True)
         audio_path = audio_dir / f"{episode_id}.m4a"
 
-        # 下载音频
-        print()
-        if not download_audio_direct(info['audio_url'], str(audio_path), info['title']):
-            sys.exit(1)
+        # 下载音频（边下载边转录时在转录阶段下载）
+        if not args.stream or args.audio_only:
+            print()
+            with span('download', episode=episode_id) as record:
+                audio = download_episode_audio(info['audio_url'], audio_path, info['title'], args)
+                if audio is None:
+                    sys.exit(1)
+                record['bytes'] = audio_size(audio)
 
         # 更新输出路径使用节目标题
         if not args.output:
-            safe_title = re.sub(r'[<>:"/\\|?*]', '', info['title'])[:50]
-            output_path = audio_dir / f"{safe_title}_文字稿.md"
+            output_path = audio_dir / transcript_filename(info['title'])
 
     # 如果只需要音频，到此结束
     if args.audio_only:
         print(f"\n✓ 音频已保存到: {audio_path}")
         sys.exit(0)
 
+    # 转录缓存
+    cache = None
+    if not args.no_cache:
+        from transcript_cache import DEFAULT_CACHE_DIR, TranscriptCache
+
+        cache = TranscriptCache(args.cache_dir or DEFAULT_CACHE_DIR, args.cache_size_mb)
+
+    # 解码 PCM 缓存（--in-memory 时不写磁盘缓存）
+    pcm_cache = None
+    if not args.no_pcm_cache and not args.in_memory:
+        from pcm_cache import PcmCache
+
+        pcm_cache = PcmCache()
+
+    # 音频指纹索引
+    fingerprints = None
+    if not args.no_fingerprint:
+        from audio_fingerprint import FingerprintIndex
+
+        fingerprints = FingerprintIndex()
+
     # 转录音频
     print()
     try:
-        transcript = transcribe_audio(
-            audio_path=str(audio_path),
-            model_size=args.model,
-            language=args.language,
-            output_path=output_path,
-            device=args.device,
-            title=episode_title
-        )
+        if not args.audio_path and args.stream:
+            from streaming_pipeline import stream_transcribe
+
+            device = resolve_device(args.device)
+            params = inference_params(args.model, default_compute_type(device), args.language,
+                                      args.chunk_minutes * 60, beam_size=args.beam_size)
+            # 之前转录过同一音频链接：按记下的音频哈希查转录缓存，命中时不再下载
+            # （两遍转录的精修阶段需要音频，照常下载）
+            audio_hash = cache.source_hash(info['audio_url']) if cache is not None and not args.refine_model else None
+            result = cache.get(cache.make_key(audio_hash, params)) if audio_hash else None
+            if result is not None:
+                print(f"✓ 命中转录缓存（模型 {args.model}），跳过下载和推理")
+            else:
+                if args.batch_size:
+                    print("⚠️ --stream 总是分块并行转录，忽略 --batch-size")
+                print(f"正在下载: {episode_title}")
+                print(f"音频链接: {info['audio_url']}")
+                with span('inference', episode=episode_id, model=args.model, backend='stream') as record:
+                    result = stream_transcribe(
+                        info['audio_url'], str(audio_path), AUDIO_HEADERS, get_ssl_context(),
+                        model_size=args.model,
+                        language=args.language,
+                        device=device,
+                        compute_type=default_compute_type(device),
+                        workers=args.workers,
+                        chunk_seconds=args.chunk_minutes * 60,
+                        decode_options=decode_options(args.beam_size)
+                    )
+                    record['bytes'] = audio_path.stat().st_size
+                audio_hash = record_stream_result(result, audio_path, info['audio_url'], params, args.model,
+                                                  args.language, args.beam_size, episode_title, cache,
+                                                  fingerprints)
+            model_label = args.model
+            if args.refine_model:
+                result = refine_result(result, str(audio_path), args.refine_model, device, params,
+                                       audio_hash, cache, pcm_cache, logprob_threshold=args.refine_logprob,
+                                       compression_threshold=args.refine_compression)
+                model_label = f"{args.model} + {args.refine_model}"
+            with span('postprocess') as record:
+                transcript = build_transcript(result, model_label, output_path, episode_title)
+                record['bytes'] = len(transcript.encode('utf-8'))
+        else:
+            transcript = transcribe_audio(
+                audio_path=str(audio_path) if audio is None else audio,
+                model_size=args.model,
+                language=args.language,
+                output_path=output_path,
+                device=args.device,
+                title=episode_title,
+                daemon_url=None if args.no_daemon else args.daemon_url,
+                workers=args.workers,
+                chunk_minutes=args.chunk_minutes,
+                cache=cache,
+                journal=not args.no_journal,
+                pcm_cache=pcm_cache,
+                window_minutes=args.window_minutes,
+                beam_size=args.beam_size,
+                batch_size=args.batch_size,
+                refine_model=args.refine_model,
+                refine_logprob=args.refine_logprob,
+                refine_compression=args.refine_compression,
+                fingerprints=fingerprints
+            )
 
         print(f"\n{'='*50}")
         print(f"转录完成！")
@@ -524,7 +1544,9 @@ def main():
 
     finally:
         # 清理临时文件
-        if not args.audio_path and not args.keep_audio:
+        if hasattr(audio, 'close'):
+            audio.close()
+        elif not args.audio_path and not args.keep_audio:
             try:
                 if audio_path.exists():
                     audio_path.unlink()
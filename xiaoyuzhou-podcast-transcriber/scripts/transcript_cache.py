@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+转录结果缓存
+以 音频内容哈希 + 模型 + 计算类型 + 语言 + 解码参数 为键，缓存原始片段列表（后处理之前），
+修改分段、标点等后处理逻辑后重新生成文字稿无需再跑推理。
+缓存目录有总大小上限，超出时按最近使用时间淘汰（LRU）。
+
+边下载边转录（--stream）在推理开始前还没有音频哈希，因此另在 audio_sources.tsv 中记录
+音频链接 -> 音频哈希，重新运行时按链接找到哈希，缓存命中则不必再下载。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# 默认缓存目录与大小上限
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "xiaoyuzhou-transcriber" / "transcripts"
+DEFAULT_MAX_MB = 500
+
+# 音频链接与音频哈希的对照表（每行 链接<TAB>哈希，后写的行优先）
+SOURCES_FILE = "audio_sources.tsv"
+
+
+class TranscriptCache:
+    """磁盘上的转录片段缓存，每个条目一个 JSON 文件，文件修改时间即最近使用时间"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    @staticmethod
+    def make_key(audio_hash: str, params: dict) -> str:
+        """由音频哈希和推理参数生成缓存键"""
+        payload = json.dumps({'audio': audio_hash, **params}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str):
+        """
+        读取缓存
+
+        Returns:
+            (片段列表, 音频信息)，未命中时返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # 更新最近使用时间
+        except (OSError, ValueError):
+            return None
+        return entry['segments'], entry['info']
+
+    def put(self, key: str, segments: list, info: dict, params: dict):
+        """写入缓存（原子替换），随后按大小上限淘汰旧条目"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'params': params, 'info': info, 'segments': segments}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def source_hash(self, audio_url: str):
+        """音频链接上次下载得到的音频哈希，没有记录时返回 None"""
+        hashes = {}
+        try:
+            with open(self.cache_dir / SOURCES_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    url, _, audio_hash = line.rstrip('\n').partition('\t')
+                    if audio_hash:
+                        hashes[url] = audio_hash
+        except OSError:
+            return None
+        return hashes.get(audio_url)
+
+    def remember_source(self, audio_url: str, audio_hash: str):
+        """记录音频链接对应的音频哈希"""
+        if self.source_hash(audio_url) == audio_hash:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / SOURCES_FILE, 'a', encoding='utf-8') as f:
+            f.write(f"{audio_url}\t{audio_hash}\n")
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+转录日志（断点续转）
+转录过程中每产生一个片段就追加写入 <文字稿>.journal.jsonl 并落盘，
+进程崩溃后用相同音频和参数重新运行，从最后一个已提交片段的结束时间继续解码，
+已转录的部分不再重跑。转录完成后删除日志。
+
+文件格式：第一行为任务头 {"type": "header", "audio_hash", "params"}，之后每行一个片段。
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+def journal_path_for(output_path) -> Path:
+    """文字稿对应的日志路径"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + '.journal.jsonl')
+
+
+class TranscriptJournal:
+    """追加写入的片段日志"""
+
+    def __init__(self, path, audio_hash: str, params: dict):
+        self.path = Path(path)
+        self.audio_hash = audio_hash
+        self.params = params
+        self._file = None
+
+    def load(self) -> list:
+        """
+        读取同一任务（音频哈希和参数都相同）已提交的片段
+
+        日志属于其他任务时丢弃；最后一行写到一半（崩溃时）会被忽略。
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            header = {}
+        if header.get('audio_hash') != self.audio_hash or header.get('params') != self.params:
+            self.remove()
+            return []
+
+        segments = []
+        for line in lines[1:]:
+            try:
+                segments.append(json.loads(line))
+            except ValueError:
+                break
+        # 去掉可能不完整的尾部后重写，保证之后追加的行接在完整行后面
+        self._rewrite(segments)
+        return segments
+
+    def _rewrite(self, segments: list):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self._header_line())
+            for segment in segments:
+                f.write(json.dumps(segment, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def _header_line(self) -> str:
+        header = {'type': 'header', 'audio_hash': self.audio_hash, 'params': self.params}
+        return json.dumps(header, ensure_ascii=False) + '\n'
+
+    def open(self):
+        """打开日志准备追加；日志不存在时先写任务头"""
+        if not self.path.exists():
+            self._rewrite([])
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, segment: dict):
+        """追加一个片段并落盘"""
+        self._file.write(json.dumps(segment, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """任务完成后删除日志"""
+        self.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+定长窗口转录（内存占用与音频时长无关）
+faster-whisper 默认把整段音频解码成一个 float32 数组并一次算出整段的梅尔频谱，
+4 小时的节目仅 PCM 就接近 900 MB。这里改为边解码边按窗口送入模型：
+每个窗口长 window + overlap 秒，只提交起点落在前 window 秒内、且没有被窗口末尾截断的片段，
+下一个窗口从最后一个已提交片段的结束处开始，因此窗口边界不会切断句子。
+跨窗口延续识别语言，并把最近几个片段的文本作为下一窗口的 initial_prompt，保持上下文连贯。
+
+内存中只保留一个窗口的 PCM（外加一个解码块），峰值与节目长度无关。
+
+xiaoyuzhou-podcast-transcriber 和 youtube-tutorial-notes 各有一份相同的本文件（由仓库根目录的 check_shared_copies.py 检查）。
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from pcm_decode import SAMPLE_RATE, iter_pcm_chunks
+
+# 默认窗口长度与重叠（秒）；重叠不小于 Whisper 单个片段的最大长度 30 秒
+DEFAULT_WINDOW_SECONDS = 300
+DEFAULT_OVERLAP_SECONDS = 30
+
+# 结束时间距窗口末尾不足该值（秒）的片段视为被截断，留给下一个窗口
+_EDGE_GUARD_SECONDS = 1.0
+
+# 作为下一窗口上文提示的片段数
+_PROMPT_SEGMENTS = 5
+
+
+def probe_duration(source) -> float:
+    """从容器信息读取音频时长（秒），读取不到时返回 0"""
+    import av
+
+    # 内存中的音频可能正被 PcmWindowReader 解码，读完容器信息后恢复读取位置
+    position = source.tell() if hasattr(source, 'tell') else None
+    try:
+        if position is not None:
+            source.seek(0)
+        with av.open(source, mode="r", metadata_errors="ignore") as container:
+            if container.duration:
+                return container.duration / av.time_base
+    except av.error.FFmpegError:
+        pass
+    finally:
+        if position is not None:
+            source.seek(position)
+    return 0.0
+
+
+class PcmWindowReader:
+    """
+    按需读取 PCM 窗口
+
+    source 为 PCM 数组（如 PCM 缓存的内存映射）时直接切片；
+    为文件路径时边解码边缓冲，只保留从当前窗口起点开始的数据。
+    """
+
+    def __init__(self, source):
+        if isinstance(source, np.ndarray):
+            self._array = source
+            self._chunks = None
+        else:
+            self._array = None
+            self._chunks = iter_pcm_chunks(source)
+            self._buffer = np.zeros(0, dtype=np.float32)
+            self._buffer_start = 0
+        self.total_samples = None if self._array is None else len(self._array)
+
+    def read(self, start: int, length: int) -> tuple:
+        """
+        读取 [start, start + length) 采样点
+
+        Returns:
+            (PCM, 是否已到音频末尾)
+        """
+        if self._array is not None:
+            return self._array[start:start + length], start + length >= len(self._array)
+
+        # 丢弃窗口起点之前的数据（复制一份，让旧缓冲可以被回收）
+        if start > self._buffer_start:
+            drop = min(start - self._buffer_start, len(self._buffer))
+            self._buffer = self._buffer[drop:].copy()
+            self._buffer_start += drop
+
+        while self.total_samples is None and self._buffer_start + len(self._buffer) < start + length:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.total_samples = self._buffer_start + len(self._buffer)
+                break
+            chunk_start = self._buffer_start + len(self._buffer)
+            if chunk_start + len(chunk) <= start:
+                self._buffer_start += len(chunk)  # 整块都在起点之前（续转时跳过）
+                continue
+            if chunk_start < start:
+                chunk = chunk[start - chunk_start:]
+                self._buffer_start = start
+            self._buffer = np.concatenate([self._buffer, chunk])
+
+        at_end = self.total_samples is not None and start + length >= self.total_samples
+        begin = start - self._buffer_start
+        return self._buffer[begin:begin + length], at_end
+
+
+def transcribe_windowed(model, source, language: str = None, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                        overlap_seconds: float = DEFAULT_OVERLAP_SECONDS, decode_options: dict = None,
+                        start_seconds: float = 0.0, initial_prompt: str = None) -> tuple:
+    """
+    按窗口转录，接口与 model.transcribe() 相同：返回 (片段生成器, 音频信息)
+
+    Args:
+        model: WhisperModel
+        source: 音频文件路径、内存中的音频（可 seek 的二进制文件对象），或 16kHz PCM 数组
+        language: 语言代码，None 表示由第一个窗口自动检测，之后的窗口沿用检测结果
+        window_seconds: 每个窗口提交的范围（秒）
+        overlap_seconds: 窗口之间的重叠（秒）
+        decode_options: 传给 model.transcribe() 的其他解码参数
+        start_seconds: 从该时间开始转录（断点续转）
+        initial_prompt: 第一个窗口的上文提示
+
+    Returns:
+        片段的时间戳已换算为整段音频的绝对时间；
+        音频信息的 duration 在文件输入时先取容器时长，片段全部产出后更新为实际解码长度
+    """
+    decode_options = dict(decode_options or {})
+    reader = PcmWindowReader(source)
+    window = int(window_seconds * SAMPLE_RATE)
+    length = int((window_seconds + overlap_seconds) * SAMPLE_RATE)
+
+    offset = int(start_seconds * SAMPLE_RATE)
+    pcm, at_end = reader.read(offset, length)
+    segments, first_info = model.transcribe(pcm, language=language, initial_prompt=initial_prompt,
+                                            **decode_options)
+    info = SimpleNamespace(
+        language=first_info.language,
+        language_probability=first_info.language_probability,
+        duration=reader.total_samples / SAMPLE_RATE if reader.total_samples is not None
+        else probe_duration(source),
+    )
+
+    def generate():
+        nonlocal offset, pcm, at_end, segments
+        recent = [initial_prompt] if initial_prompt else []
+        while True:
+            window_end = len(pcm) / SAMPLE_RATE
+            committed_end = 0.0
+            pending_start = None  # 第一个留给下一窗口的片段的起点
+            for segment in segments:
+                if not at_end and (segment.start >= window_seconds or
+                                   segment.end > window_end - _EDGE_GUARD_SECONDS):
+                    pending_start = segment.start
+                    break
+                committed_end = segment.end
+                if segment.text.strip():
+                    recent = (recent + [segment.text.strip()])[-_PROMPT_SEGMENTS:]
+                segment.start += offset / SAMPLE_RATE
+                segment.end += offset / SAMPLE_RATE
+                yield segment
+
+            if at_end:
+                break
+            # 有片段留给下一窗口时从最后一个已提交片段的结束处（没有则从该片段起点）继续，
+            # 否则整个提交范围都已处理完
+            if pending_start is None:
+                step = max(window, int(committed_end * SAMPLE_RATE))
+            else:
+                step = int((committed_end or pending_start) * SAMPLE_RATE) or window
+            offset += step
+            pcm, at_end = reader.read(offset, length)
+            if len(pcm) == 0:
+                break
+            segments, _ = model.transcribe(pcm, language=info.language,
+                                           initial_prompt=' '.join(recent) or None, **decode_options)
+
+        info.duration = reader.total_samples / SAMPLE_RATE
+
+    return generate(), info
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+ranged_download 的测试：本地 http.server 提供带/不带 Range 支持的文件
+
+运行:
+    python -m unittest discover -s tests
+"""
+
+import http.server
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import ranged_download  # noqa: E402
+
+SEGMENT_SIZE = 1024
+CONTENT = os.urandom(SEGMENT_SIZE * 5 + 100)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """按服务器设置响应 GET：支持 Range 时返回 206，fail_starts 中的分段返回 500"""
+
+    def do_GET(self):
+        server = self.server
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range') or '')
+        if not server.supports_range or not match:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(CONTENT)))
+            self.end_headers()
+            self.wfile.write(CONTENT)
+            return
+
+        start, end = int(match.group(1)), int(match.group(2))
+        server.requested.append(start)
+        if start in server.fail_starts:
+            self.send_error(500)
+            return
+        data = CONTENT[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{start + len(data) - 1}/{len(CONTENT)}')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RangedDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.supports_range = True
+        self.server.fail_starts = set()
+        self.server.requested = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/audio.m4a'
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.tmp.name, 'audio.m4a')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def download(self):
+        with redirect_stdout(StringIO()):
+            return ranged_download.download_file(self.url, self.output_path, connections=3,
+                                                 segment_size=SEGMENT_SIZE, retries=0, timeout=10)
+
+    def test_ranged_download(self):
+        self.assertEqual(self.download(), len(CONTENT))
+        self.assertEqual(Path(self.output_path).read_bytes(), CONTENT)
+        self.assertFalse(os.path.exists(self.output_path + '.part'))
+        self.assertFalse(os.path.exists(self.output_path + '.part.json'))
+
+    def test_fallback_without_range(self):
+        self.server.supports_range = False
+        self.assertEqual(self.download(), len(CONTENT))
+        self.assertEqual(Path(self.output_path).read_bytes(), CONTENT)
+        self.assertEqual(self.server.requested, [])
+
+    def test_resume_after_failed_segment(self):
+        failed_start = 2 * SEGMENT_SIZE
+        self.server.fail_starts = {failed_start}
+        with self.assertRaises(IOError):
+            self.download()
+        self.assertFalse(os.path.exists(self.output_path))
+        self.assertTrue(os.path.exists(self.output_path + '.part.json'))
+
+        # 重新运行只请求上次失败的分段（外加探测请求 bytes=0-0）
+        self.server.fail_starts = set()
+        self.server.requested = []
+        self.assertEqual(self.download(), len(CONTENT))
+        self.assertEqual(sorted(self.server.requested), [0, failed_start])
+        self.assertEqual(Path(self.output_path).read_bytes(), CONTENT)
+
+    def test_download_to_buffer(self):
+        for supports_range in (True, False):
+            self.server.supports_range = supports_range
+            with redirect_stdout(StringIO()):
+                buffer = ranged_download.download_to_buffer(self.url, connections=3,
+                                                            segment_size=SEGMENT_SIZE, retries=0, timeout=10)
+            with buffer:
+                self.assertEqual(buffer.read(), CONTENT)
+
+
+if __name__ == '__main__':
+    unittest.main()
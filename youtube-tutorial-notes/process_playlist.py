@@ -6,16 +6,31 @@ AI步骤（review、笔记生成、思维导图）由 Claude agent 处理
 """
 import sys
 import json
+import hashlib
+import argparse
 import os
+import re
 import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 # 添加scripts目录到路径
 script_dir = Path(__file__).parent / "scripts"
 sys.path.insert(0, str(script_dir))
 
-from download_video import download_video
-from transcribe_audio import transcribe_video
+from download_video import YoutubeDownloader, download_video
+from job_journal import JobJournal, file_sha256, write_atomic
+from media_index import MediaIndex, video_id
+from stage_metrics import configure as configure_metrics, span
+from transcribe_audio import TranscriptionSession
+
+# 转录文件名中标题部分的上限（UTF-8 字节，文件名整体不超过常见文件系统的 255 字节）
+MAX_TITLE_BYTES = 200
+
+# 不能出现在文件名中的字符：路径分隔符、Windows 保留字符和控制字符
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f\x7f]')
 
 
 def get_config():
@@ -42,157 +57,446 @@ def parse_playlist(file_path):
     return videos
 
 
+def safe_filename(title, max_bytes=MAX_TITLE_BYTES):
+    """把视频标题转成可作文件名的字符串：替换路径分隔符、保留字符和控制字符，按 UTF-8 字节数截断"""
+    name = _UNSAFE_FILENAME_CHARS.sub('_', title).strip().strip('.')
+    name = name.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore').rstrip()
+    return name or 'untitled'
+
+
 def save_progress(index, total, title, output_dir):
     """保存进度"""
     progress_file = output_dir / "progress.json"
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'current': index,
-            'total': total,
-            'last_video': title,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-        }, f, ensure_ascii=False, indent=2)
+    write_atomic(progress_file, json.dumps({
+        'current': index,
+        'total': total,
+        'last_video': title,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }, ensure_ascii=False, indent=2))
 
 
-def process_video(index, video, config, output_dir, video_dir):
-    """处理单个视频：下载→转录→保存"""
+def create_session(config, cpu_threads=None):
+    """按配置创建转录会话，整个播放列表共用一个模型"""
+    transcription_config = config.get('transcription', {})
+    return TranscriptionSession(
+        model_size=transcription_config.get('model_size', 'base'),
+        device=transcription_config.get('device', 'cpu'),
+        language=transcription_config.get('language', 'auto'),
+        window_minutes=transcription_config.get('window_minutes', 0),
+        fingerprint=transcription_config.get('fingerprint_dedup', True),
+        beam_size=transcription_config.get('beam_size', 5),
+        batch_size=transcription_config.get('batch_size', 0),
+        cpu_threads=cpu_threads
+    )
+
+
+def fetch_audio(index, video, video_dir, journal=None, downloader=None):
+    """
+    阶段一：检查或下载音频
+
+    按视频 ID 在媒体索引中查找已下载的音频（文件仍在且大小一致时直接复用），否则通过共用的下载会话下载；
+    下载完成或失败都写入日志
+
+    Returns:
+        音频文件路径；下载失败时返回 None
+    """
+    title = video['title']
+    url = video['url']
+    print(f"\n[1/3] [{index}] 检查音频: {title}")
+
+    media = downloader.index if downloader else MediaIndex(video_dir)
+    vid = video_id(url)
+    entry = media.lookup(vid) if vid else None
+    if entry:
+        print(f"✅ [{index}] 找到现有文件: {entry['file']} ({entry['bytes'] / 1024 / 1024:.2f} MB)")
+        record_download(journal, index, video, entry['path'], entry['sha256'])
+        return entry['path']
+
+    print(f"⬇️  [{index}] 开始下载...")
+    with span('download', video=index) as record:
+        video_file = download_video(url, str(video_dir), downloader)
+
+        if not video_file:
+            print(f"❌ [{index}] 下载失败: {title}")
+            record.fail('下载失败')
+            if journal:
+                journal.record(url, 'failed', index=index, title=title, stage='download', error='下载失败')
+            return None
+
+        video_path = Path(video_file)
+        if not video_path.exists():
+            print(f"❌ [{index}] 文件不存在: {video_file}")
+            record.fail(f'文件不存在: {video_file}')
+            if journal:
+                journal.record(url, 'failed', index=index, title=title, stage='download',
+                               error=f'文件不存在: {video_file}')
+            return None
+        record['bytes'] = video_path.stat().st_size
+
+    file_size = video_path.stat().st_size
+    print(f"✅ [{index}] 下载完成: {video_path.name} ({file_size / 1024 / 1024:.2f} MB)")
+    entry = media.lookup(vid) if vid else None
+    record_download(journal, index, video, video_path, entry['sha256'] if entry else None)
+    return video_path
+
+
+def record_download(journal, index, video, video_path, sha256=None):
+    """在日志中记录已就绪的音频（文件名、大小、校验和，校验和优先取媒体索引中的）"""
+    if journal:
+        journal.record(video['url'], 'downloaded', index=index, title=video['title'],
+                       audio_file=video_path.name, audio_bytes=video_path.stat().st_size,
+                       audio_sha256=sha256 or file_sha256(video_path))
+
+
+def transcribe_and_save(index, video, video_path, session, output_dir, journal=None):
+    """
+    阶段二、三：转录音频并原子写入转录文件，完成或失败后都清理音频
+
+    转录完成、保存完成（含转录文件的大小和校验和）及失败都写入日志
+
+    Returns:
+        manifest 中的视频元数据；失败时返回 False
+    """
     title = video['title']
     url = video['url']
+    stage = 'transcribe'
     print(f"\n{'='*60}")
     print(f"处理 [{index}/{video.get('total', '?')}]: {title}")
     print(f"{'='*60}")
 
-    video_file = None
-    transcription_config = config.get('transcription', {})
-    model_size = transcription_config.get('model_size', 'base')
-    device = transcription_config.get('device', 'cpu')
-    language = transcription_config.get('language', 'auto')
-
     try:
-        # 1. 检查或下载音频
-        print(f"\n[1/3] 检查音频...")
-
-        existing_files = []
-        for pattern in [f"{title}.*"]:
-            existing_files.extend(video_dir.glob(pattern))
-
-        # 模糊匹配
-        if not existing_files:
-            for f in video_dir.glob('*'):
-                if title in f.name:
-                    existing_files.append(f)
-
-        if existing_files:
-            video_path = existing_files[0]
-            file_size = video_path.stat().st_size
-            print(f"✅ 找到现有文件: {video_path.name} ({file_size / 1024 / 1024:.2f} MB)")
-        else:
-            print(f"⬇️  开始下载...")
-            video_file = download_video(url, str(video_dir))
-
-            if not video_file:
-                print(f"❌ 下载失败: {title}")
-                return False
-
-            video_path = Path(video_file)
-            if not video_path.exists():
-                print(f"❌ 文件不存在: {video_file}")
-                return False
-
-            file_size = video_path.stat().st_size
-            print(f"✅ 下载完成: {video_path.name} ({file_size / 1024 / 1024:.2f} MB)")
-
         # 2. 转录音频
         print(f"\n[2/3] 转录音频...")
-        transcript = transcribe_video(
-            str(video_path),
-            model_size=model_size,
-            device=device,
-            language=language
-        )
+        with span('transcribe', video=index, model=session.model_size) as record:
+            transcript = session.transcribe(str(video_path))
+            record['bytes'] = video_path.stat().st_size
+            if not transcript:
+                record.fail('转录结果为空')
 
         if not transcript:
             print(f"❌ 转录失败: {title}")
+            if journal:
+                journal.record(url, 'failed', index=index, title=title, stage=stage, error='转录结果为空')
             return False
 
         print(f"✅ 转录完成，长度: {len(transcript)} 字符")
+        if journal:
+            journal.record(url, 'transcribed', index=index, title=title, chars=len(transcript))
 
         # 3. 保存转录文件
         print(f"\n[3/3] 保存转录文件...")
+        stage = 'save'
         transcript_dir = output_dir / "transcripts"
         transcript_dir.mkdir(parents=True, exist_ok=True)
 
-        transcript_file = transcript_dir / f"{index:02d}_{title}.txt"
-        with open(transcript_file, 'w', encoding='utf-8') as f:
-            f.write(transcript)
+        transcript_file = transcript_dir / f"{index:02d}_{safe_filename(title)}.txt"
+        data = transcript.encode('utf-8')
+        with span('output', video=index) as record:
+            write_atomic(transcript_file, data)
+            record['bytes'] = len(data)
 
+        if journal:
+            journal.record(url, 'saved', index=index, title=title, transcript_file=transcript_file.name,
+                           transcript_bytes=len(data), transcript_mtime_ns=transcript_file.stat().st_mtime_ns,
+                           transcript_sha256=hashlib.sha256(data).hexdigest())
         print(f"💾 转录已保存: {transcript_file.name}")
 
-        # 清理音频文件
-        video_path.unlink()
-        print(f"🗑️  已清理音频文件")
-
         # 返回元数据
         return {
             'index': index,
             'title': title,
-            'url': url,
+            'url': video['url'],
             'transcript_file': str(transcript_file.name)
         }
 
     except Exception as e:
         print(f"\n❌ 处理失败: {e}")
+        if journal:
+            journal.record(url, 'failed', index=index, title=title, stage=stage, error=str(e))
         import traceback
         traceback.print_exc()
+        return False
 
-        # 清理可能残留的文件
-        if video_file and Path(video_file).exists():
-            try:
-                Path(video_file).unlink()
-                print(f"🗑️  已清理失败的音频文件")
-            except:
-                pass
+    finally:
+        # 清理音频文件（失败时同样清理，避免 temp_videos 占用不断增长）
+        try:
+            if video_path.exists():
+                video_path.unlink()
+                print(f"🗑️  已清理音频文件")
+        except OSError:
+            pass
 
+
+def process_video(video, session, output_dir, video_dir, journal=None, downloader=None):
+    """处理单个视频：下载→转录→保存"""
+    index = video['index']
+    video_path = fetch_audio(index, video, video_dir, journal, downloader)
+    if video_path is None:
         return False
+    return transcribe_and_save(index, video, video_path, session, output_dir, journal)
+
+
+def dir_usage(path):
+    """目录下文件的总字节数（包括下载中的临时文件）"""
+    total = 0
+    for entry in os.scandir(path):
+        try:
+            if entry.is_file():
+                total += entry.stat().st_size
+        except OSError:
+            pass  # 下载器刚好删除了该文件
+    return total
+
+
+def run_pipeline(videos, session, output_dir, video_dir, prefetch=2, max_temp_mb=2048, journal=None,
+                 downloader=None):
+    """
+    流水线处理：下载线程提前下载后续视频，主线程按播放列表顺序逐个转录
+
+    预取队列有界：正在转录第 i 个视频时，最多下载到第 i + prefetch 个；
+    temp_videos 的占用达到 max_temp_mb 时暂停提交新的下载（当前要转录的视频除外），
+    等已转录的音频清理后再继续。转录文件按视频在播放列表中的编号（video['index']）命名，
+    结果的顺序与 videos 一致。
+
+    Returns:
+        与 videos 一一对应的结果列表，元素为视频元数据或 False
+    """
+    max_bytes = max_temp_mb * 1024 * 1024
+    futures = []
+    results = []
+
+    def refill(current):
+        """按队列上限和磁盘占用提交后续下载"""
+        while len(futures) < len(videos) and len(futures) <= current + prefetch:
+            if len(futures) > current and dir_usage(video_dir) >= max_bytes:
+                print(f"⏸️  temp_videos 已占用 {dir_usage(video_dir) / 1024 / 1024:.0f} MB，暂停预取")
+                break
+            video = videos[len(futures)]
+            futures.append(pool.submit(fetch_audio, video['index'], video, video_dir, journal, downloader))
+
+    with ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+        for i, video in enumerate(videos):
+            refill(i)
+            video_path = futures[i].result()
+            futures[i] = None  # 释放已消费的结果
+            if video_path is None:
+                results.append(False)
+                continue
+            results.append(transcribe_and_save(video['index'], video, video_path, session, output_dir, journal))
+
+    return results
+
+
+def partition_cpus(workers):
+    """把本进程可用的 CPU 按编号顺序切成 workers 组（核数不足时多个进程共用一个核）"""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    size, extra = divmod(len(cpus), workers)
+    groups = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+
+# 转录子进程内的会话和任务日志
+_worker_session = None
+_worker_journal = None
+
+
+def _init_worker(config, cpu_groups, slot_counter, warm_up, journal_path):
+    """子进程初始化：领取一组 CPU 并绑定，按组内核数设置线程数，加载自己的模型"""
+    global _worker_session, _worker_journal
+
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+    cpus = cpu_groups[slot % len(cpu_groups)]
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    configure_metrics('process_playlist', worker=slot + 1)  # 各子进程写各自的 Prometheus 文件
+
+    # 子进程只追加记录，与主进程共用同一个日志文件
+    _worker_journal = JobJournal(journal_path, load=False) if journal_path else None
+    print(f"🧵 转录进程 {slot + 1}: CPU {cpus}")
+    _worker_session = create_session(config, cpu_threads=len(cpus))
+    if warm_up:
+        _worker_session.warm_up()
+
+
+def _transcribe_in_worker(index, video, video_path, output_dir):
+    """子进程任务：转录并保存一个视频"""
+    return transcribe_and_save(index, video, video_path, _worker_session, output_dir, _worker_journal)
+
+
+def run_workers(videos, config, output_dir, video_dir, workers, prefetch=2, max_temp_mb=2048, warm_up=True,
+                journal=None, downloader=None):
+    """
+    多进程转录：workers 个子进程各自加载模型，并绑定到互不重叠的一组 CPU
+
+    每个视频由一个线程负责：下载（或找到现有文件）后交给进程池转录，线程数为 workers + prefetch，
+    即同时最多有这么多个视频处于下载、待转录或转录中的状态。temp_videos 的占用达到 max_temp_mb 时，
+    新的下载等待已转录的音频清理，尚未完成的视频中编号最小的那个不等待，避免互相卡住。
+    转录文件按 video['index'] 命名，产出结果的顺序与 videos 一致。
+
+    Yields:
+        按 videos 的顺序，每个视频的元数据；失败时为 False
+    """
+    max_bytes = max_temp_mb * 1024 * 1024
+    pending = set(range(len(videos)))
+    changed = threading.Condition()
+
+    cpu_groups = partition_cpus(workers)
+    # spawn 启动子进程，避免 fork 继承父进程中下载线程的状态
+    context = multiprocessing.get_context('spawn')
+    slot_counter = context.Value('i', 0)
+
+    def job(i):
+        try:
+            with changed:
+                changed.wait_for(lambda: i == min(pending) or dir_usage(video_dir) < max_bytes)
+            index = videos[i]['index']
+            video_path = fetch_audio(index, videos[i], video_dir, journal, downloader)
+            if video_path is None:
+                return False
+            return pool.submit(_transcribe_in_worker, index, videos[i], video_path, output_dir).result()
+        finally:
+            with changed:
+                pending.discard(i)
+                changed.notify_all()
+
+    print(f"🧵 {workers} 个转录进程，CPU 分组: {cpu_groups}")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(config, cpu_groups, slot_counter, warm_up,
+                                       journal.path if journal else None)) as pool, \
+            ThreadPoolExecutor(max_workers=workers + max(0, prefetch)) as threads:
+        futures = [threads.submit(job, i) for i in range(len(videos))]
+        for future in futures:
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"\n❌ 处理失败: {e}")
+                yield False
+
+
+def parse_batch_size(value):
+    """--batch-size 参数：整数或 auto"""
+    return value if value == 'auto' else int(value)
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="处理YouTube播放列表：下载→转录→保存转录文件→生成manifest")
+    parser.add_argument("playlist", nargs="?", default=None,
+                        help="YouTube 播放列表 URL，或 title|||url 格式的列表文件（默认: playlist_new.txt）")
+    parser.add_argument("--batch-size", type=parse_batch_size, default=None,
+                        help="大于 1 时按 VAD 语音片段批量解码，auto 表示取自动调优档案的批大小，0 表示逐段解码"
+                             "（默认: config.json 的 transcription.batch_size）")
+    parser.add_argument("--beam-size", type=int, default=None,
+                        help="束搜索宽度（默认: config.json 的 transcription.beam_size）")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="转录当前视频时最多提前下载的视频数，0 表示逐个下载→转录（默认: 2）")
+    parser.add_argument("--max-temp-mb", type=float, default=2048,
+                        help="temp_videos 占用达到该大小（MB）时暂停预取（默认: 2048）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="转录进程数，大于 1 时每个进程加载自己的模型并绑定一组 CPU（默认: 1）")
+    parser.add_argument("--verify", action="store_true",
+                        help="跳过已完成的视频前校验转录文件的 SHA-256（默认只比较大小和修改时间）")
+    parser.add_argument("--no-warm-up", action="store_true",
+                        help="不在开始时预热模型（默认在后台加载模型并试跑一次推理，与第一个视频的下载重叠）")
+    args = parser.parse_args()
+
     cwd = Path.cwd()
     output_dir = cwd / "tutorial_notes"
     video_dir = cwd / "temp_videos"
 
-    # 读取配置
+    # 读取配置，命令行参数优先
     config = get_config()
+    transcription_config = config.setdefault('transcription', {})
+    if args.batch_size is not None:
+        transcription_config['batch_size'] = args.batch_size
+    if args.beam_size is not None:
+        transcription_config['beam_size'] = args.beam_size
+    configure_metrics('process_playlist')  # 设置 SKILL_METRICS_FILE / SKILL_METRICS_PROM 时输出各阶段耗时
+
+    # 整个播放列表共用一个下载会话（cookies、连接只建立一次），已下载的音频按视频 ID 登记在媒体索引中
+    with YoutubeDownloader(video_dir) as downloader:
+        # 解析播放列表：播放列表 URL 直接展开（flat 提取），否则读取 title|||url 列表文件
+        if args.playlist and args.playlist.startswith(('http://', 'https://')):
+            print(f"🔎 展开播放列表: {args.playlist}")
+            try:
+                videos = downloader.resolve_playlist(args.playlist)
+            except Exception as e:
+                print(f"❌ 播放列表解析失败: {e}")
+                sys.exit(1)
+        else:
+            playlist_file = Path(args.playlist) if args.playlist else Path(__file__).parent / "playlist_new.txt"
+            videos = parse_playlist(playlist_file)
 
-    # 解析播放列表
-    playlist_file = Path(__file__).parent / "playlist_new.txt"
-    videos = parse_playlist(playlist_file)
+        if not videos:
+            print("❌ 播放列表为空或格式错误")
+            sys.exit(1)
 
-    if not videos:
-        print("❌ 播放列表为空或格式错误")
-        sys.exit(1)
+        print(f"📹 播放列表共 {len(videos)} 个视频")
+        print(f"📁 工作目录: {cwd}")
+        print(f"📁 输出目录: {output_dir}\n")
 
-    print(f"📹 播放列表共 {len(videos)} 个视频")
-    print(f"📁 工作目录: {cwd}")
-    print(f"📁 输出目录: {output_dir}\n")
+        # 创建目录
+        output_dir.mkdir(parents=True, exist_ok=True)
+        video_dir.mkdir(parents=True, exist_ok=True)
 
-    # 创建目录
-    output_dir.mkdir(parents=True, exist_ok=True)
-    video_dir.mkdir(parents=True, exist_ok=True)
+        for i, video in enumerate(videos, start=1):
+            video['index'] = i  # 播放列表中的编号，决定转录文件名
+            video['total'] = len(videos)  # 传入总数用于显示
 
-    # 处理每个视频
+        # 任务日志：已保存且转录文件未变的视频直接跳过，其余（失败或中断的）重新处理
+        transcript_dir = output_dir / "transcripts"
+        journal = JobJournal(output_dir / "jobs.jsonl")
+        todo = [video for video in videos if not journal.is_saved(video['url'], transcript_dir, args.verify)]
+        if len(todo) < len(videos):
+            print(f"⏭️  跳过已完成的 {len(videos) - len(todo)} 个视频，待处理 {len(todo)} 个\n")
+
+        if not todo:
+            outcomes = []
+        elif args.workers > 1:
+            outcomes = run_workers(todo, config, output_dir, video_dir, args.workers, args.prefetch,
+                                   args.max_temp_mb, warm_up=not args.no_warm_up, journal=journal,
+                                   downloader=downloader)
+        else:
+            # 整个播放列表共用一个转录会话，模型只加载一次
+            session = create_session(config)
+            if not args.no_warm_up:
+                session.warm_up(background=True)
+
+            if args.prefetch > 0:
+                outcomes = run_pipeline(todo, session, output_dir, video_dir, args.prefetch, args.max_temp_mb,
+                                        journal=journal, downloader=downloader)
+            else:
+                outcomes = (process_video(video, session, output_dir, video_dir, journal, downloader) for video in todo)
+
+        for video, result in zip(todo, outcomes):
+            if result:
+                save_progress(video['index'], len(videos), video['title'], output_dir)
+
+    # 由任务日志生成 manifest（重新读取：多进程转录时子进程直接追加日志）
+    journal.load()
     results = []
     failed_videos = []
-
-    for i, video in enumerate(videos, start=1):
-        video['total'] = len(videos)  # 传入总数用于显示
-        result = process_video(i, video, config, output_dir, video_dir)
-        if result:
-            results.append(result)
-            save_progress(i, len(videos), video['title'], output_dir)
+    for video in videos:
+        job = journal.get(video['url'])
+        if job and job['state'] == 'saved':
+            results.append({
+                'index': video['index'],
+                'title': video['title'],
+                'url': video['url'],
+                'transcript_file': job['transcript_file']
+            })
         else:
-            failed_videos.append(f"{i}. {video['title']}")
+            failed_videos.append(f"{video['index']}. {video['title']}")
 
     # 生成 manifest
     manifest = {
@@ -203,10 +507,9 @@ def main():
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
     }
 
-    manifest_file = output_dir / "transcripts" / "manifest.json"
+    manifest_file = transcript_dir / "manifest.json"
     manifest_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(manifest_file, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    write_atomic(manifest_file, json.dumps(manifest, ensure_ascii=False, indent=2))
 
     # 打印总结
     print(f"\n{'='*60}")
@@ -2,76 +2,179 @@
 # -*- coding: utf-8 -*-
 """
 最简单的YouTube视频下载脚本
+
+在进程内通过 yt_dlp.YoutubeDL 会话下载：每个下载线程一个会话，cookies 在每个会话中只加载一次，
+HTTP 连接和 JS 运行时在该线程的视频之间复用，不再为每个视频启动一个 yt-dlp 子进程。同一会话也负责把播放列表 URL 展开为视频列表（flat 提取，不逐个解析视频）。
+
+音频保存为 <视频ID>.m4a，并登记到下载目录的媒体索引（media_index.py）；
+已下载且文件仍在的视频直接返回索引中的路径，不再访问 YouTube。
+
+yt_dlp 在创建 YoutubeDownloader 时才通过 lazy_imports.load() 导入，只导入本模块
+（process_playlist 启动、多进程转录的子进程）不会加载它。
 """
 
-import subprocess
+import threading
 from pathlib import Path
 
+from lazy_imports import load
+from media_index import MediaIndex, video_id
+
+# cookies.txt 放在技能根目录
+COOKIES_FILE = Path(__file__).parent.parent / "cookies.txt"
+
+
+def ydl_options(output_dir, cookies_file=COOKIES_FILE, archive=None) -> dict:
+    """YoutubeDL 参数，与原先的 yt-dlp 命令行（只下载音频并转为 m4a）一致"""
+    options = {
+        'js_runtimes': {'node': {'path': '/usr/local/bin/node'}},
+        'remote_components': ['ejs:github'],
+        'cookiefile': str(cookies_file),
+        'format': 'bestaudio/best',
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'm4a',
+            'preferredquality': '0',
+        }],
+        'noplaylist': True,
+        # 播放列表只列出条目（标题、URL），单个视频不受影响
+        'extract_flat': 'in_playlist',
+        'outtmpl': {'default': f"{output_dir}/%(id)s.%(ext)s"},
+        'retries': 10,
+        'fragment_retries': 10,
+        'quiet': True,
+        'noprogress': True,
+        'no_warnings': True,
+    }
+    if archive:
+        options['download_archive'] = str(archive)
+    return options
+
+
+class YoutubeDownloader:
+    """
+    进程内的 YouTube 下载会话
+
+    整个播放列表共用一个下载器；YoutubeDL 不保证线程安全，每个调用 download() 的线程
+    第一次使用时按 ydl_options() 新建自己的会话，多个预取线程可以同时下载。
+    媒体索引和归档文件的更新由 MediaIndex 加锁。
+    """
+
+    def __init__(self, output_dir: str = "./temp_videos", index: MediaIndex = None):
+        """
+        Args:
+            output_dir: 输出目录
+            index: 输出目录的媒体索引（默认按 output_dir 新建）
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.index = index or MediaIndex(self.output_dir)
+
+        # 检查 cookies 文件是否存在
+        if not COOKIES_FILE.exists():
+            print(f"⚠️ 警告: cookies.txt 文件不存在")
+            print(f"   期望路径: {COOKIES_FILE}")
+
+        self._yt_dlp = load('yt_dlp')
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _session(self):
+        """当前线程的 YoutubeDL 会话，第一次调用时新建"""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self._yt_dlp.YoutubeDL(ydl_options(self.output_dir, archive=self.index.archive_path))
+            self._local.ydl = ydl
+            with self._lock:
+                self._sessions.append(ydl)
+        return ydl
+
+    def close(self):
+        """关闭所有线程的会话（写回 cookies、关闭连接）"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for ydl in sessions:
+            ydl.close()
+
+    def resolve_playlist(self, playlist_url: str) -> list:
+        """
+        展开播放列表（flat 提取：只请求列表页，不解析每个视频）
+
+        Returns:
+            [{'title', 'url'}, ...]，按播放列表顺序
+        """
+        info = self._session().extract_info(playlist_url, download=False)
+
+        entries = (info.get('entries') or []) if info.get('_type') == 'playlist' else [info]
+        videos = []
+        for entry in entries:
+            if not entry:
+                continue  # 已删除或私有的视频
+            url = entry.get('url') or entry.get('webpage_url')
+            if url:
+                videos.append({'title': entry.get('title') or entry.get('id') or url, 'url': url})
+        return videos
+
+    def download(self, video_url: str) -> str:
+        """
+        下载一个视频的音频
+
+        Returns:
+            下载的文件路径；失败时返回 None
+        """
+        ydl = self._session()
+        vid = video_id(video_url)
+        if vid:
+            entry = self.index.lookup(vid)
+            if entry:
+                print(f"✅ 已下载: {entry['path']}")
+                return str(entry['path'])
+            # 索引中没有（或文件已清理）：确保归档里也没有，否则 yt-dlp 会跳过下载；
+            # 会话创建时已把归档文件读入内存，内存中的记录也要删掉
+            self.index.forget(vid)
+            ydl.archive.discard(f"youtube {vid}")
+
+        print(f"正在下载: {video_url}")
+        try:
+            info = ydl.extract_info(video_url, download=True)
+        except self._yt_dlp.utils.DownloadError:
+            print(f"❌ 下载失败")  # 错误详情已由 yt-dlp 输出
+            return None
+
+        # 转码、移动完成后的最终文件
+        for download in (info or {}).get('requested_downloads') or []:
+            file_path = download.get('filepath')
+            if file_path and Path(file_path).exists():
+                entry = self.index.add(info['id'], file_path)
+                print(f"✅ 下载完成: {file_path} ({entry['bytes'] / 1024 / 1024:.2f} MB)")
+                return file_path
+
+        print(f"❌ 下载失败: 未找到下载的文件")
+        return None
 
-def download_video(video_url: str, output_dir: str = "./temp_videos") -> str:
+
+def download_video(video_url: str, output_dir: str = "./temp_videos", downloader: YoutubeDownloader = None) -> str:
     """
     下载YouTube视频
 
     Args:
         video_url: YouTube视频URL
         output_dir: 输出目录
+        downloader: 共用的下载会话（处理多个视频时传入，默认为本次下载新建）
 
     Returns:
         下载的文件路径
     """
-    # 创建输出目录
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-
-    # 获取 cookies.txt 文件路径
-    script_dir = Path(__file__).parent.parent
-    cookies_file = script_dir / "cookies.txt"
-
-    # 检查 cookies 文件是否存在
-    if not cookies_file.exists():
-        print(f"⚠️ 警告: cookies.txt 文件不存在")
-        print(f"   期望路径: {cookies_file}")
-
-    # 下载命令（只下载音频）
-    cmd = [
-        "yt-dlp",
-        "--js-runtimes", "node:/usr/local/bin/node",
-        "--remote-components", "eis:github",
-        "--cookies", str(cookies_file),
-        "--format", "bestaudio/best",
-        "--extract-audio",
-        "--audio-format", "m4a",
-        "--audio-quality", "0",
-        "--no-playlist",
-        "-o", f"{output_dir}/%(title)s.%(ext)s",
-        video_url
-    ]
-
-    print(f"正在下载: {video_url}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode == 0:
-        # 从输出中提取文件名
-        for line in result.stdout.split('\n'):
-            if '[download] Destination:' in line:
-                file_path = line.split('[download] Destination: ')[1]
-                print(f"✅ 下载完成: {file_path}")
-                return file_path
-
-        # 如果没找到，查找最新文件
-        files = (
-            list(Path(output_dir).glob('*.mp4')) +
-            list(Path(output_dir).glob('*.m4a')) +
-            list(Path(output_dir).glob('*.mp3')) +
-            list(Path(output_dir).glob('*.webm'))
-        )
-        if files:
-            latest = max(files, key=lambda f: f.stat().st_mtime)
-            print(f"✅ 下载完成: {latest}")
-            return str(latest)
-
-    print(f"❌ 下载失败")
-    print(result.stderr)
-    return None
+    if downloader:
+        return downloader.download(video_url)
+    with YoutubeDownloader(output_dir) as downloader:
+        return downloader.download(video_url)
 
 
 if __name__ == "__main__":
@@ -6,69 +6,144 @@
 本地运行，无需 API，速度快
 """
 
-from faster_whisper import WhisperModel
 import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+from whisper_profile import load_profile, profile_cpu_threads
+
+# batch_size 为 auto 且没有自动调优档案时的批大小
+DEFAULT_BATCH_SIZE = 8
 
 
 class FasterWhisperTranscriber:
     """faster-whisper 转录器"""
 
-    def __init__(self, model_size: str = "base", device: str = "cpu"):
+    def __init__(self, model_size: str = "base", device: str = "cpu", compute_type: str = None,
+                 cpu_threads: int = None, num_workers: int = None, pcm_cache: bool = True):
         """
         初始化转录器
 
         参数:
             model_size: 模型大小 (tiny/base/small/medium/large)
             device: 运行设备 (cpu/cuda)
+            compute_type: 计算类型 (int8/int8_float32/float32/float16...)
+            cpu_threads: CPU 线程数，0 表示使用默认值
+            num_workers: 允许同时转录的线程数（默认 1，播放列表按顺序转录）
+            pcm_cache: 是否把解码后的 PCM 缓存到 ~/.cache/whisper-pcm，同一音频换模型重跑时免解码
+
+        未指定的 compute_type 取本机自动调优档案中的值，没有档案时为 int8；未指定的 cpu_threads
+        按档案的线程总数平分给 num_workers 路（与 xiaoyuzhou-podcast-transcriber 的 load_model 相同），
+        没有档案时为 0；转录时 batch_size 为 auto 同样取档案中的批大小。
         """
+        profile = load_profile(device) or {}
+        self.auto_batch_size = profile.get('batch_size', DEFAULT_BATCH_SIZE)
+        compute_type = compute_type or profile.get('compute_type', 'int8')
+        num_workers = num_workers or 1
+        cpu_threads = cpu_threads if cpu_threads is not None else profile_cpu_threads(profile, num_workers)
+
+        # 在这里才导入 faster_whisper（连带 ctranslate2、onnxruntime），
+        # 只导入本模块（如 process_playlist 启动、仅下载时）不会加载它们
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+        from pcm_cache import PcmCache
+
+        self.pcm_cache = PcmCache() if pcm_cache else None
+
         print(f"加载 faster-whisper 模型 ({model_size})...")
         self.model = WhisperModel(
             model_size,
             device=device,
-            compute_type="int8"
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers
         )
+        self.batched = BatchedInferencePipeline(self.model)
         print(f"✓ 模型加载完成")
 
-    def transcribe(self, audio_path: str, language: str = "auto") -> str:
+    def transcribe(self, audio_path: str, language: str = "auto", beam_size: int = 5,
+                   vad_filter: bool = True, window_seconds: float = None, audio_hash: str = None,
+                   batch_size=0) -> str:
         """
         转录音频文件
 
         参数:
             audio_path: 音频文件路径
             language: 语言代码 (zh=中文, en=英文, auto=自动检测)
+            beam_size: 束搜索宽度
+            vad_filter: 是否先用 VAD 过滤静音
+            window_seconds: 按该长度的窗口边解码边转录，内存占用与音频时长无关（适合数小时的长视频），
+                None 表示整段交给模型
+            audio_hash: 音频内容哈希，已算过时传入，读取 PCM 缓存时不必再读一遍文件
+            batch_size: 大于 1 时用 faster-whisper 的批量推理：按 VAD 切出的语音片段成批解码
+                （总是启用 VAD，片段之间不传递上文），auto 表示取自动调优档案的批大小；0 表示逐段解码
 
         返回:
             转录文本
         """
+        result = self.transcribe_segments(audio_path, language, beam_size, vad_filter, window_seconds, audio_hash,
+                                          batch_size)
+        if result is None:
+            return None
+        return "".join(seg['text'] for seg in result[0])
+
+    def transcribe_segments(self, audio_path: str, language: str = "auto", beam_size: int = 5,
+                            vad_filter: bool = True, window_seconds: float = None,
+                            audio_hash: str = None, batch_size=0) -> tuple:
+        """
+        转录音频文件，保留时间戳
+
+        参数同 transcribe()
+
+        返回:
+            (片段列表 [{'start', 'end', 'text'}], 音频信息 {'language', 'language_probability', 'duration'})，
+            失败时返回 None
+        """
         print(f"  转录中...")
 
         try:
-            segments, info = self.model.transcribe(
-                audio_path,
-                language=language if language != "auto" else None,
-                beam_size=5,
-                vad_filter=True,
-                vad_parameters={
+            audio = self.pcm_cache.load(audio_path, audio_hash) if self.pcm_cache else audio_path
+            options = {
+                'beam_size': beam_size,
+                'vad_filter': vad_filter,
+                'vad_parameters': {
                     "min_silence_duration_ms": 500,
                     "speech_pad_ms": 300
                 }
-            )
+            }
+            language = language if language != "auto" else None
+            batch_size = self.auto_batch_size if batch_size == 'auto' else int(batch_size or 0)
+            model = self.model
+            if batch_size > 1:
+                model = self.batched
+                options['batch_size'] = batch_size
+                options['vad_filter'] = True  # 批量推理按 VAD 语音片段（每段不超过 30 秒）组批
+            if window_seconds:
+                from windowed_transcribe import transcribe_windowed
+
+                segments, info = transcribe_windowed(model, audio, language, window_seconds,
+                                                     decode_options=options)
+            else:
+                segments, info = model.transcribe(audio, language=language, **options)
 
             # 收集所有段落
-            full_text = []
+            collected = []
             segment_count = 0
 
             for segment in segments:
-                full_text.append(segment.text)
+                collected.append({'start': segment.start, 'end': segment.end, 'text': segment.text})
                 segment_count += 1
 
                 if segment_count % 10 == 0:
                     print(f"    已处理 {segment_count} 个片段...")
 
-            transcript = "".join(full_text)
-
             print(f"  ✓ 转录完成，共 {segment_count} 个片段")
-            return transcript
+            return collected, {
+                'language': info.language,
+                'language_probability': info.language_probability,
+                'duration': info.duration,
+            }
 
         except Exception as e:
             print(f"  ✗ 转录失败: {e}")
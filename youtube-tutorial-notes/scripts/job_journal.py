@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+播放列表处理的逐视频任务日志
+
+tutorial_notes/jobs.jsonl 为只追加的 JSON lines，每行记录一个视频（以 URL 为键）进入的新状态：
+  downloaded   音频已就绪（audio_file、audio_bytes、audio_sha256）
+  transcribed  转录完成（chars）
+  saved        转录文件已原子写入（transcript_file、transcript_bytes、transcript_mtime_ns、transcript_sha256）
+  failed       某个阶段失败（stage、error）
+每行用一次 O_APPEND 的 write 写入并 fsync，多个进程（多进程转录）同时追加也不会交错；
+进程崩溃最多丢掉最后一行不完整的记录，读取时跳过。
+
+重新运行时加载日志得到每个视频的最新状态，已保存且转录文件未变的视频直接跳过（字典查找），
+其余视频从头重试；manifest 也由日志生成。转录文件是否未变默认只比较大小和修改时间，
+修改时间对不上（文件被复制、touch 过）或要求校验时才计算 SHA-256。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 视频的最终状态
+SAVED = 'saved'
+
+
+def file_sha256(path) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_atomic(path, data):
+    """写入临时文件后原子替换，读者只会看到旧内容或完整的新内容"""
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class JobJournal:
+    """逐视频状态日志，可在多个线程中同时使用"""
+
+    def __init__(self, path, load: bool = True):
+        """
+        参数:
+            path: 日志文件路径
+            load: 是否读取已有日志（只追加记录的子进程不需要读取）
+        """
+        self.path = Path(path)
+        self._jobs = {}  # URL -> 合并后的最新状态
+        self._lock = threading.Lock()
+        if load:
+            self.load()
+
+    def load(self) -> dict:
+        """读取日志，按行合并出每个视频的最新状态；记录明显冗余时压缩日志"""
+        jobs = {}
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 崩溃时写了一半的行
+                    lines += 1
+                    job = jobs.setdefault(entry['key'], {})
+                    if entry['state'] != 'failed':
+                        job.pop('stage', None)
+                        job.pop('error', None)
+                    job.update(entry)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self._jobs = jobs
+            if lines > 4 * max(1, len(jobs)):
+                self._compact()
+        return jobs
+
+    def _compact(self):
+        """把每个视频的最新状态重写为一行（调用方持有锁）"""
+        data = ''.join(json.dumps(job, ensure_ascii=False) + '\n' for job in self._jobs.values())
+        write_atomic(self.path, data)
+
+    def get(self, key: str) -> dict:
+        """视频的最新状态，没有记录时返回 None"""
+        return self._jobs.get(key)
+
+    def record(self, key: str, state: str, **fields) -> dict:
+        """追加一条状态记录"""
+        entry = {'key': key, 'state': state, 'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), **fields}
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            job = self._jobs.setdefault(key, {})
+            if state != 'failed':
+                job.pop('stage', None)
+                job.pop('error', None)
+            job.update(entry)
+        return entry
+
+    def is_saved(self, key: str, transcript_dir, verify: bool = False) -> bool:
+        """
+        视频是否已完成：状态为 saved，且转录文件存在、大小与记录一致
+
+        大小和修改时间都与记录一致时直接视为完成；修改时间不一致（或旧记录没有修改时间）时
+        才计算校验和比较。verify 为 True 时总是比较校验和。
+        """
+        job = self._jobs.get(key)
+        if not job or job['state'] != SAVED:
+            return False
+        path = Path(transcript_dir) / job['transcript_file']
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        if stat.st_size != job['transcript_bytes']:
+            return False
+        if not verify and stat.st_mtime_ns == job.get('transcript_mtime_ns'):
+            return True
+        return file_sha256(path) == job['transcript_sha256']
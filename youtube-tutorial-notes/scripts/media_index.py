@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已下载音频的本地索引
+
+以 YouTube 视频 ID 为键，记录音频文件名、大小和 SHA-256，保存在下载目录的 media_index.json；
+同目录的 download_archive.txt 是 yt-dlp 的下载归档（--download-archive），两者由下载器一起维护。
+查找音频只需一次字典查找和一次 stat，不再按标题遍历目录匹配文件名。
+
+转录完成后音频会被删除：查找时发现文件已不存在（或大小不符），就同时从索引和归档中移除该视频，
+这样 yt-dlp 会重新下载它，而不是按归档跳过。
+"""
+
+import json
+import re
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from job_journal import file_sha256, write_atomic
+
+INDEX_FILE = "media_index.json"
+ARCHIVE_FILE = "download_archive.txt"
+
+# YouTube 视频 ID：11 个字符
+_VIDEO_ID = re.compile(r'^[0-9A-Za-z_-]{11}$')
+
+
+def video_id(url: str) -> str:
+    """
+    从 YouTube URL 中解析视频 ID
+
+    支持 watch?v=、youtu.be/、/shorts/、/embed/、/live/ 等形式，也接受裸视频 ID；无法解析时返回 None
+    """
+    if _VIDEO_ID.match(url):
+        return url
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    candidate = None
+    if host.endswith('youtu.be'):
+        candidate = parsed.path.strip('/').split('/')[0]
+    elif 'youtube' in host:
+        candidate = parse_qs(parsed.query).get('v', [None])[0]
+        if not candidate:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                candidate = parts[1]
+    if candidate and _VIDEO_ID.match(candidate):
+        return candidate
+    return None
+
+
+class MediaIndex:
+    """下载目录中音频文件的索引，可在多个下载线程中同时使用"""
+
+    def __init__(self, media_dir):
+        self.media_dir = Path(media_dir)
+        self.path = self.media_dir / INDEX_FILE
+        self.archive_path = self.media_dir / ARCHIVE_FILE
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def lookup(self, vid: str) -> dict:
+        """
+        查找已下载的音频
+
+        Returns:
+            {'file', 'path', 'bytes', 'sha256'}；未下载或文件已不存在时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(vid)
+            if entry is None:
+                return None
+            path = self.media_dir / entry['file']
+            try:
+                if path.stat().st_size == entry['bytes']:
+                    return {**entry, 'path': path}
+            except OSError:
+                pass
+            # 文件已清理或被改动：移出索引和归档，下次重新下载
+            del self._entries[vid]
+            self._save()
+            self._unarchive(vid)
+            return None
+
+    def add(self, vid: str, path) -> dict:
+        """登记下载完成的音频（计算大小和 SHA-256）并写入归档"""
+        path = Path(path)
+        entry = {'file': path.name, 'bytes': path.stat().st_size, 'sha256': file_sha256(path)}
+        with self._lock:
+            self._entries[vid] = entry
+            self._save()
+            if not self._archived(vid):
+                with open(self.archive_path, 'a', encoding='utf-8') as f:
+                    f.write(f"youtube {vid}\n")
+        return {**entry, 'path': path}
+
+    def forget(self, vid: str):
+        """从索引和归档中移除视频（文件本身由调用方处理）"""
+        with self._lock:
+            if self._entries.pop(vid, None) is not None:
+                self._save()
+            self._unarchive(vid)
+
+    def _save(self):
+        """原子写入索引（调用方持有锁）"""
+        self.media_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, json.dumps(self._entries, ensure_ascii=False, indent=2))
+
+    def _archive_lines(self) -> list:
+        try:
+            with open(self.archive_path, 'r', encoding='utf-8') as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def _archived(self, vid: str) -> bool:
+        return f"youtube {vid}" in self._archive_lines()
+
+    def _unarchive(self, vid: str):
+        """从 yt-dlp 归档中删除视频（调用方持有锁）"""
+        lines = self._archive_lines()
+        kept = [line for line in lines if line.strip() != f"youtube {vid}"]
+        if len(kept) != len(lines):
+            write_atomic(self.archive_path, ''.join(line + '\n' for line in kept))
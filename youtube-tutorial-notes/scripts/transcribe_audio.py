@@ -2,10 +2,12 @@
 # -*- coding: utf-8 -*-
 """
 从视频文件转录音频
-原子化功能：只负责转录单个视频
+原子化功能：只负责转录单个视频；批量处理时用 TranscriptionSession 在多个视频间复用同一个模型
 """
 
 import sys
+import threading
+import time
 from pathlib import Path
 
 # 添加脚本路径
@@ -14,7 +16,134 @@ sys.path.insert(0, str(Path(__file__).parent))
 from faster_whisper_transcribe import FasterWhisperTranscriber
 
 
-def transcribe_video(video_path: str, model_size: str = "base", device: str = "cpu", language: str = "auto") -> str:
+class TranscriptionSession:
+    """
+    转录会话：一批视频共用同一个转录器，模型只加载一次
+
+    模型在第一次需要推理时才加载（全部命中指纹索引时不加载）；warm_up() 可以提前加载，
+    background=True 时在后台线程中进行，与下载等工作重叠，转录时若仍在加载则等待其完成。
+    """
+
+    def __init__(self, model_size: str = "base", device: str = "cpu", language: str = "auto",
+                 window_minutes: float = 0, fingerprint: bool = True, beam_size: int = 5,
+                 batch_size=0, cpu_threads: int = None):
+        """
+        参数:
+            model_size: 模型大小 (tiny/base/small/medium/large)
+            device: 设备类型 (cpu/cuda)
+            language: 语言代码 (zh=中文, en=英文, auto=自动检测)
+            window_minutes: 大于 0 时按该长度的窗口边解码边转录，内存占用与视频时长无关
+            fingerprint: 转录前用音频指纹在 ~/.cache/whisper-fingerprints 查找同一内容（如重新编码的播客音频）
+                已有的转录并直接复用，转录后把结果加入索引（与 xiaoyuzhou-podcast-transcriber 共用）
+            beam_size: 束搜索宽度
+            batch_size: 大于 1 时按 VAD 语音片段批量解码，auto 表示取自动调优档案的批大小，0 表示逐段解码
+            cpu_threads: 模型使用的 CPU 线程数，None 表示按自动调优档案（多进程转录时每个进程只用分到的核）
+        """
+        self.model_size = model_size
+        self.device = device
+        self.language = language
+        self.window_minutes = window_minutes
+        self.beam_size = beam_size
+        self.batch_size = batch_size
+        self.cpu_threads = cpu_threads
+        self.index = None
+        if fingerprint:
+            from audio_fingerprint import FingerprintIndex
+
+            self.index = FingerprintIndex()
+        self._transcriber = None
+        self._lock = threading.Lock()
+        self._warm_thread = None
+
+    @property
+    def transcriber(self) -> FasterWhisperTranscriber:
+        """已加载的转录器，第一次访问时加载模型"""
+        with self._lock:
+            if self._transcriber is None:
+                self._transcriber = FasterWhisperTranscriber(model_size=self.model_size, device=self.device,
+                                                             cpu_threads=self.cpu_threads)
+            return self._transcriber
+
+    def warm_up(self, background: bool = False):
+        """
+        加载模型并用一秒静音跑一次推理，完成首次推理才做的初始化
+
+        参数:
+            background: 在后台线程中进行，立即返回
+        """
+        if background:
+            self._warm_thread = threading.Thread(target=self.warm_up, name='whisper-warm-up', daemon=True)
+            self._warm_thread.start()
+            return
+
+        import numpy as np
+
+        started = time.time()
+        try:
+            segments, _ = self.transcriber.model.transcribe(np.zeros(16000, dtype=np.float32), language='en',
+                                                            beam_size=self.beam_size)
+            for _ in segments:
+                pass
+        except Exception as e:
+            print(f"✗ 模型预热失败: {e}")
+            return
+        print(f"✓ 模型预热完成 ({time.time() - started:.1f} 秒)")
+
+    def transcribe(self, video_path: str) -> str:
+        """
+        转录视频音频为文本
+
+        返回:
+            转录文本，失败时为空字符串
+        """
+        # 检查文件是否存在
+        if not Path(video_path).exists():
+            print(f"✗ 视频文件不存在: {video_path}")
+            return ""
+
+        # 查找同一内容已有的转录
+        audio_hash = fingerprint_data = None
+        if self.index is not None:
+            from audio_fingerprint import fingerprint_params, segments_text
+            from audio_hash import hash_audio
+            from pcm_cache import PcmCache
+
+            audio_hash = hash_audio(video_path)
+            fingerprint_data, match = self.index.lookup(PcmCache().load(video_path, audio_hash), audio_hash,
+                                                        self.model_size,
+                                                        fingerprint_params(self.language, {'beam_size': self.beam_size}))
+            if match is not None:
+                transcript = segments_text(match['segments'])
+                print(f"✓ 指纹命中：与已转录的 {match['source']} 为同一内容（BER {match['ber']:.3f}），复用其转录 "
+                      f"(字数: {len(transcript)})")
+                return transcript
+
+        # 转录
+        transcriber = self.transcriber
+        print(f"转录音频: {video_path}")
+        result = transcriber.transcribe_segments(video_path, language=self.language, beam_size=self.beam_size,
+                                                 window_seconds=self.window_minutes * 60 or None,
+                                                 audio_hash=audio_hash, batch_size=self.batch_size)
+        transcript = "".join(seg['text'] for seg in result[0]) if result else None
+
+        if not transcript:
+            print("✗ 转录失败")
+            return ""
+
+        if fingerprint_data is not None:
+            try:
+                self.index.add(audio_hash, fingerprint_data, *result, self.model_size, Path(video_path).name,
+                               fingerprint_params(self.language, {'beam_size': self.beam_size}, result[1]['language']))
+            except OSError as e:
+                print(f"写入指纹索引失败: {e}")
+
+        print(f"✓ 转录完成 (字数: {len(transcript)})")
+        return transcript
+
+
+def transcribe_video(video_path: str, model_size: str = "base", device: str = "cpu", language: str = "auto",
+                     window_minutes: float = 0, fingerprint: bool = True, beam_size: int = 5,
+                     batch_size=0, session: TranscriptionSession = None) -> str:
     """
     转录视频音频为文本
 
@@ -23,30 +152,21 @@ def transcribe_video(video_path: str, model_size: str = "base", device: str = "c
         model_size: 模型大小 (tiny/base/small/medium/large)
         device: 设备类型 (cpu/cuda)
         language: 语言代码 (zh=中文, en=英文, auto=自动检测)
+        window_minutes: 大于 0 时按该长度的窗口边解码边转录，内存占用与视频时长无关
+        fingerprint: 转录前用音频指纹在 ~/.cache/whisper-fingerprints 查找同一内容（如重新编码的播客音频）
+            已有的转录并直接复用，转录后把结果加入索引（与 xiaoyuzhou-podcast-transcriber 共用）
+        beam_size: 束搜索宽度
+        batch_size: 大于 1 时按 VAD 语音片段批量解码，auto 表示取自动调优档案的批大小，0 表示逐段解码
+        session: 已有的 TranscriptionSession，传入时复用其模型，忽略其余转录参数；
+            None 时为这一个文件新建会话
 
     Returns:
         转录文本
     """
-    # 检查文件是否存在
-    if not Path(video_path).exists():
-        print(f"✗ 视频文件不存在: {video_path}")
-        return ""
-
-    # 初始化转录器
-    print(f"加载 faster-whisper 模型 ({model_size}, {device})...")
-    transcriber = FasterWhisperTranscriber(model_size=model_size, device=device)
-    print("✓ 模型加载完成")
-
-    # 转录
-    print(f"转录音频: {video_path}")
-    transcript = transcriber.transcribe(video_path, language=language)
-
-    if not transcript:
-        print("✗ 转录失败")
-        return ""
-
-    print(f"✓ 转录完成 (字数: {len(transcript)})")
-    return transcript
+    if session is None:
+        session = TranscriptionSession(model_size, device, language, window_minutes, fingerprint,
+                                       beam_size, batch_size)
+    return session.transcribe(video_path)
 
 
 def save_transcript(transcript: str, output_file: str) -> bool:
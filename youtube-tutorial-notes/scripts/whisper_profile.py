@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读取本机的 Whisper 自动调优档案
+
+档案由 xiaoyuzhou-podcast-transcriber/scripts/autotune.py 校准生成，
+保存在 ~/.cache/whisper-autotune/<主机名>.json，两个 skill 共用。
+本文件在 xiaoyuzhou-podcast-transcriber/scripts/ 和 youtube-tutorial-notes/scripts/ 中各有一份，
+内容必须完全相同（由仓库根目录的 check_shared_copies.py 检查），保证两个 skill 对同一份档案的失效判断一致。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+PROFILE_DIR = Path.home() / ".cache" / "whisper-autotune"
+
+
+def profile_path() -> Path:
+    """本机档案路径"""
+    return PROFILE_DIR / f"{platform.node() or 'localhost'}.json"
+
+
+def cpu_flags() -> set:
+    """读取 CPU 指令集标志（小写），无法读取时返回空集合"""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/cpuinfo', 'r') as f:
+                for line in f:
+                    if line.startswith('flags'):
+                        return set(line.split(':', 1)[1].split())
+        except OSError:
+            pass
+    elif sys.platform == 'darwin':
+        try:
+            output = subprocess.run(['sysctl', '-n', 'machdep.cpu.features', 'machdep.cpu.leaf7_features'],
+                                    capture_output=True, text=True, timeout=5).stdout
+            return {flag.lower().replace('.', '_') for flag in output.split()}
+        except (OSError, subprocess.SubprocessError):
+            pass
+    return set()
+
+
+def load_profile(device: str = None) -> dict:
+    """
+    读取本机档案
+
+    参数:
+        device: 只接受该设备上校准的档案，None 表示不限
+
+    返回:
+        档案内容；不存在、损坏、设备不符或硬件已变化（核数或 AVX-512 支持不同）时返回 None
+    """
+    try:
+        with open(profile_path(), 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    hardware = profile.get('hardware', {})
+    flags = cpu_flags()
+    if hardware.get('cores') != (os.cpu_count() or 1) or \
+            (flags and hardware.get('avx512') != ('avx512f' in flags)):
+        return None
+    if device is not None and profile.get('device') != device:
+        return None
+    return profile
+
+
+def profile_cpu_threads(profile: dict, num_workers: int = 1) -> int:
+    """
+    按档案计算每路转录的 CPU 线程数
+
+    档案的 cpu_threads 是为 num_workers 路并发校准的，线程总数（cpu_threads × num_workers）
+    平分给实际的并发路数；顺序转录（1 路）时使用全部线程。
+
+    返回:
+        线程数；没有档案或档案未指定线程数（如 CUDA 档案）时返回 0，即 faster-whisper 的默认值
+    """
+    if not profile or not profile.get('cpu_threads'):
+        return 0
+    return max(1, profile['cpu_threads'] * profile.get('num_workers', 1) // max(1, num_workers))